@@ -7,8 +7,14 @@ Creates CSV with JSON arrays for nutrients by category
 import json
 import pandas as pd
 import os
+import sys
 from typing import Dict, List, Any
 
+# Record readers live in the myfcd package at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from myfcd.record_store import RecordReader
+
 def create_csv_row(data: Dict[str, Any]) -> Dict[str, Any]:
     """Create CSV row with JSON arrays for nutrients by category"""
     
@@ -64,39 +70,37 @@ def create_csv_row(data: Dict[str, Any]) -> Dict[str, Any]:
     return row
 
 def convert_all_json_to_csv(datasets_dir: str = "/Users/ooichienzhen/Desktop/myFCD/datasets") -> None:
-    """Convert all JSON files to one comprehensive CSV"""
+    """Convert all saved records (JSON files or records.ndjson) to one comprehensive CSV"""
     
-    print("Creating CSV from JSON files...")
+    print("Creating CSV from saved records...")
     
-    # Get all JSON files
-    json_files = [f for f in os.listdir(datasets_dir) if f.endswith('.json') and not f.startswith('summary')]
+    # Get all saved records, from either layout
+    records = RecordReader(datasets_dir)
+    record_names = records.names()
     
-    if not json_files:
-        print("ERROR: No JSON files found!")
+    if not record_names:
+        print("ERROR: No JSON files or records.ndjson found!")
         return
     
-    print(f"Found {len(json_files)} JSON files")
+    print(f"Found {len(record_names)} records ({records.layout} layout)")
     
     # Process all files
     all_rows = []
     processed = 0
     
-    for json_file in sorted(json_files):
-        json_path = os.path.join(datasets_dir, json_file)
-        
+    for record_name in record_names:
         try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = records.load(record_name)
             
             row = create_csv_row(data)
             all_rows.append(row)
             processed += 1
             
             if processed % 50 == 0:
-                print(f"Processed {processed}/{len(json_files)} files...")
+                print(f"Processed {processed}/{len(record_names)} records...")
         
         except Exception as e:
-            print(f"ERROR processing {json_file}: {e}")
+            print(f"ERROR processing {record_name}: {e}")
     
     # Create DataFrame
     df = pd.DataFrame(all_rows)
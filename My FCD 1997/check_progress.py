@@ -4,7 +4,14 @@ Simple progress monitor for MyFCD scraping
 """
 
 import os
+import sys
 import json
+from collections import Counter
+
+# Record readers live in the myfcd package at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from myfcd.record_store import RecordReader
 
 
 def check_progress():
@@ -16,15 +23,44 @@ def check_progress():
         print(" Datasets folder not found")
         return
     
-    # Count JSON files
-    json_files = [f for f in os.listdir(data_dir) if f.endswith('.json')]
+    # Count saved records, per-food JSON files or records.ndjson
+    records = RecordReader(data_dir)
+    record_names = records.names()
     total_expected = 233
-    completed = len(json_files)
+    completed = len(record_names)
     
     print(f" MyFCD Scraping Progress")
     print(f"=" * 40)
     print(f" Completed: {completed}/{total_expected} ({completed/total_expected*100:.1f}%)")
     
+    # Status from the run manifest written by scrape_all_foods
+    manifest_path = os.path.join(data_dir, 'run_manifest.json')
+    if os.path.exists(manifest_path):
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            statuses = Counter(item['status'] for item in manifest.get('items', {}).values())
+            print(f" Run manifest: {statuses['done']} done, {statuses['failed']} failed, "
+                  f"{statuses['pending']} pending of {len(manifest.get('listing', []))} "
+                  f"(updated {manifest.get('updated', '?')})")
+        except Exception as e:
+            print(f"  ⚠ Error reading run manifest: {e}")
+    
+    # Failures waiting for a deferred retry
+    queue_path = os.path.join(data_dir, 'run_retry_queue.json')
+    if os.path.exists(queue_path):
+        try:
+            with open(queue_path, 'r', encoding='utf-8') as f:
+                retry_queue = json.load(f)
+            kinds = Counter(entry['kind'] for entry in retry_queue.get('pending', {}).values())
+            if kinds:
+                print(f" Retry queue: {sum(kinds.values())} foods ("
+                      + ", ".join(f"{count} {kind}" for kind, count in sorted(kinds.items())) + ")")
+            if retry_queue.get('gave_up'):
+                print(f" Given up: {len(retry_queue['gave_up'])} foods (see run_failures.json)")
+        except Exception as e:
+            print(f"  ⚠ Error reading retry queue: {e}")
+    
     if completed > 0:
         # Progress bar
         bar_length = 30
@@ -34,14 +70,12 @@ def check_progress():
         
         # Quick quality check
         if completed >= 3:
-            recent_files = sorted(json_files)[-3:]
+            recent_files = sorted(record_names)[-3:]
             print(f"\n Recent files check:")
             
             for filename in recent_files:
                 try:
-                    filepath = os.path.join(data_dir, filename)
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
+                    data = records.load(filename)
                     
                     nutrients = data.get('Nutrient', [])
                     categories = len(set([n.get('category') for n in nutrients if n.get('category')]))
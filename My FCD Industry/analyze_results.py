@@ -5,29 +5,36 @@ Analyze the scraped MyFCD Industry data and generate a summary
 
 import json
 import os
+import sys
 import time
 from collections import defaultdict, Counter
 from typing import Dict, List
 
+# Record readers live in the myfcd package at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from myfcd.record_store import RecordReader
+
 
 def analyze_scraped_data(data_dir: str = "/Users/ooichienzhen/Desktop/myFCD_Industry/datasets"):
-    """Analyze the scraped JSON files and generate summary statistics"""
+    """Analyze the scraped records (JSON files or records.ndjson) and generate summary statistics"""
     
     print(" Analyzing scraped MyFCD Industry data...")
     print(f" Directory: {data_dir}")
     
-    # Find all JSON files
-    json_files = [f for f in os.listdir(data_dir) if f.endswith('.json') and not f.startswith('summary')]
+    # Find all saved records, from either layout
+    records = RecordReader(data_dir)
+    record_names = records.names()
     
-    if not json_files:
-        print("No JSON files found!")
+    if not record_names:
+        print("No JSON files or records.ndjson found!")
         return
     
-    print(f" Found {len(json_files)} JSON files")
+    print(f" Found {len(record_names)} records ({records.layout} layout)")
     
     # Statistics
     stats = {
-        'total_files': len(json_files),
+        'total_files': len(record_names),
         'successful_scrapes': 0,
         'with_images': 0,
         'with_source': 0,
@@ -42,13 +49,10 @@ def analyze_scraped_data(data_dir: str = "/Users/ooichienzhen/Desktop/myFCD_Indu
     all_nutrients = set()
     problems = []
     
-    # Process each file
-    for filename in json_files:
-        filepath = os.path.join(data_dir, filename)
-        
+    # Process each record
+    for record_name in record_names:
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = records.load(record_name)
             
             stats['successful_scrapes'] += 1
             
@@ -87,7 +91,7 @@ def analyze_scraped_data(data_dir: str = "/Users/ooichienzhen/Desktop/myFCD_Indu
                 stats['files_with_serving_sizes'] += 1
                 
         except Exception as e:
-            problems.append(f"Error processing {filename}: {e}")
+            problems.append(f"Error processing {record_name}: {e}")
     
     # Generate summary
     print("\n" + "="*60)
@@ -3,6 +3,7 @@
 Production MyFCD Industry Scraper - Scrapes ALL food items from the database
 """
 
+import argparse
 import sys
 import os
 
@@ -10,10 +11,23 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from myfcd_industry_scraper import ProductionSeleniumScraper
+from myfcd.cli import add_scrape_options, build_cache, check_rate_bounds, default_cache_dir, engine_options, run_options
+from myfcd.profiles import SITE_PROFILES
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Scrape ALL food items from MyFCD Industry")
+    add_scrape_options(parser, cache_dir=default_cache_dir(SITE_PROFILES['industry'].output_dir))
+    args = parser.parse_args()
+    check_rate_bounds(parser, args, ceiling=SITE_PROFILES['industry'].max_rate)
+    return args
 
 
 def main():
     """Main function to scrape ALL food data"""
+    args = parse_args()
+    
     print("=== Production MyFCD Industry Food Composition Database Scraper ===")
     print(" Target: https://myfcd.moh.gov.my/myfcdindustri/")
     print(" Output: /Users/ooichienzhen/Desktop/myFCD_Industry/datasets/")
@@ -26,10 +40,11 @@ def main():
         print(" This will scrape ALL industry food items. Press Ctrl+C to interrupt if needed.")
         print()
         
-        scraper = ProductionSeleniumScraper()
+        scraper = ProductionSeleniumScraper(cache=build_cache(args), **engine_options(args))
+        scraper.rate.set_bounds(floor=args.min_rate, ceiling=args.max_rate)
         
-        # Remove the max_items limit to scrape everything
-        scraper.scrape_all_foods(max_items=None)
+        # No --max-items means scrape everything
+        scraper.scrape_all_foods(**run_options(args))
         
         print("\n" + "=" * 70)
         print(" Full scraping completed successfully!")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Merge the shard-i-of-N folders written by --shard runs into one dataset
+Reports shards that are missing, foods saved by more than one shard and listed foods no shard saved
+"""
+
+import argparse
+
+from myfcd.profiles import SITE_PROFILES
+from myfcd.record_store import STORE_FORMATS
+from myfcd.sharding import MERGE_REPORT_FILE, merge_shards
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Merge sharded MyFCD scrape outputs")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('datasets_dir', nargs='?', default=None,
+                        help="datasets folder holding the shard-i-of-N folders")
+    source.add_argument('--edition', choices=sorted(SITE_PROFILES),
+                        help="merge the shards in this edition's datasets folder")
+    parser.add_argument('--dest', default=None,
+                        help="folder for the merged dataset (default: the datasets folder itself)")
+    parser.add_argument('--store', choices=STORE_FORMATS, default='files',
+                        help="record layout of the merged dataset (default: files)")
+    return parser.parse_args()
+
+
+def main():
+    """Merge the shards and print what the merge found"""
+    args = parse_args()
+    datasets_dir = args.datasets_dir or SITE_PROFILES[args.edition].output_dir
+    
+    print(f"=== Merging shards in {datasets_dir} ===")
+    try:
+        report = merge_shards(datasets_dir, dest_dir=args.dest, store=args.store)
+    except (OSError, ValueError) as e:
+        print(f"ERROR: {e}")
+        return 1
+    
+    print(f" Shards: {len(report['shards_found'])}/{report['shard_count']} found")
+    for shard, count in report['records_per_shard'].items():
+        print(f"   shard {shard}: {count} records")
+    print(f" Merged records: {report['records']} of {report['listing_size']} listed foods")
+    print(f" Saved to: {args.dest or datasets_dir}")
+    
+    ok = True
+    if report['shards_missing']:
+        print(f"WARNING: Missing shards: {', '.join(map(str, report['shards_missing']))}")
+        ok = False
+    if report['listing_mismatch']:
+        print(f"WARNING: Shards {', '.join(map(str, report['listing_mismatch']))} listed a different catalogue "
+              f"than shard {report['shards_found'][0]}, their runs may be from different days")
+    if report['overlaps']:
+        print(f"WARNING: {len(report['overlaps'])} foods saved by more than one shard, kept the owning shard's copy")
+    if report['gaps']:
+        print(f"WARNING: {len(report['gaps'])} listed foods have no record in any shard")
+        for ndb_no, gap in list(report['gaps'].items())[:10]:
+            print(f"   {ndb_no}: shard {gap['shard']} ({gap['status']})")
+        if len(report['gaps']) > 10:
+            print(f"   ... and {len(report['gaps']) - 10} more")
+        ok = False
+    if report['unreadable']:
+        print(f"WARNING: {len(report['unreadable'])} unreadable records skipped")
+    print(f" Details in {MERGE_REPORT_FILE}")
+    
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Mirror the product images of a scraped MyFCD edition
+Run again later to pick up new foods; images the server reports unchanged are not downloaded twice
+"""
+
+import argparse
+
+from myfcd.cli import check_rate_bounds, rate_option
+from myfcd.engine import make_session
+from myfcd.image_mirror import IMAGE_MANIFEST_FILE, ImageMirror
+from myfcd.profiles import SITE_PROFILES
+from myfcd.rate_control import DEFAULT_RATE_CEILING, RateController
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Download product images referenced by scraped MyFCD records")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('datasets_dir', nargs='?', default=None,
+                        help="datasets folder with the scraped records")
+    source.add_argument('--edition', choices=sorted(SITE_PROFILES),
+                        help="mirror this edition's datasets folder")
+    parser.add_argument('--concurrency', type=int, default=8,
+                        help="parallel image downloads over one connection pool (default: 8)")
+    parser.add_argument('--thumb-size', type=int, default=256,
+                        help="thumbnail width and height in pixels, 0 for none (default: 256, needs Pillow)")
+    parser.add_argument('--processes', type=int, default=None,
+                        help="thumbnail worker processes (default: one per CPU)")
+    parser.add_argument('--max-rate', type=rate_option, default=None,
+                        help="highest request rate in requests/second")
+    args = parser.parse_args()
+    ceiling = SITE_PROFILES[args.edition].max_rate if args.edition else DEFAULT_RATE_CEILING
+    check_rate_bounds(parser, args, ceiling=ceiling)
+    return args
+
+
+def main():
+    """Mirror every record's image and print the result"""
+    args = parse_args()
+    profile = SITE_PROFILES[args.edition] if args.edition else None
+    datasets_dir = args.datasets_dir or profile.output_dir
+    
+    rate = RateController(initial_rate=profile.initial_rate, ceiling=profile.max_rate) if profile else RateController()
+    rate.set_bounds(ceiling=args.max_rate)
+    mirror = ImageMirror(datasets_dir, concurrency=args.concurrency, thumb_size=args.thumb_size or None,
+                         rate=rate, headers={'User-Agent': make_session().headers['User-Agent']},
+                         processes=args.processes)
+    
+    print(f"=== Mirroring images for {datasets_dir} ===")
+    try:
+        counts = mirror.run()
+    except KeyboardInterrupt:
+        print("\n  Mirror interrupted, run again to continue")
+        return 1
+    
+    print(f" {mirror.summary()}")
+    print(f" {counts['mirrored']}/{counts['foods']} foods with images mapped in {IMAGE_MANIFEST_FILE}")
+    return 0 if not counts['failed'] else 1
+
+
+if __name__ == "__main__":
+    exit(main())
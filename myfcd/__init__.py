@@ -0,0 +1,9 @@
+"""
+Shared MyFCD scraping package
+One engine and its helpers for the current, 1997 and Industry editions
+"""
+
+from .profiles import SiteProfile, SITE_PROFILES
+from .engine import ScraperEngine, FETCH_MODES, scrape_editions
+
+__all__ = ['SiteProfile', 'SITE_PROFILES', 'ScraperEngine', 'FETCH_MODES', 'scrape_editions']
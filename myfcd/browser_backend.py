@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Browser backends for rendering MyFCD detail pages
+PlaywrightBackend renders many pages at once in isolated contexts of one Chromium, driven from one asyncio loop
+"""
+
+import asyncio
+import fnmatch
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .payload_extraction import find_nutrient_data, json_payloads, script_payloads
+from .readiness import PageReadiness
+from .render_profile import TRANSFER_SIZE_SCRIPT, RenderProfile
+
+try:
+    from playwright.async_api import Error as PlaywrightError, TimeoutError as PlaywrightTimeout, async_playwright
+except ImportError:
+    async_playwright = None
+
+
+# 'selenium' is the engine's own WebDriver path (driver pool, watchdog),
+# every other name is a BrowserBackend
+BROWSER_BACKENDS = ('selenium', 'playwright')
+
+
+class BrowserCrashed(Exception):
+    """The browser went away while rendering, the page itself may be fine"""
+
+
+class BrowserBackend:
+    """A browser that renders detail pages for any number of fetch threads
+    
+    render() is called from the pipeline's fetch workers at the same time, a
+    backend decides how the pages share browsers. It raises on failure:
+    BrowserCrashed when the page was lost with the browser, TimeoutError or
+    TimeoutException when it never became ready, anything else otherwise.
+    """
+    
+    name = None
+    
+    def prewarm(self) -> None:
+        """Start the browser in the background, returns immediately"""
+    
+    def render(self, url: str, capture_payloads: bool = False) -> Tuple[str, Optional[List[str]], float]:
+        """(rendered DOM, JSON XHR bodies or None, seconds until ready) for one page"""
+        raise NotImplementedError
+    
+    def close(self) -> None:
+        """Shut the browser down; the next render starts it again"""
+    
+    def summary(self) -> str:
+        """One-line report for the end of a run"""
+        return f"Browser backend: {self.name}"
+
+
+def _page_script(script: str) -> str:
+    """A WebDriver execute_script body as a function for page.evaluate"""
+    return f"() => {{{script}}}"
+
+
+class PlaywrightBackend(BrowserBackend):
+    """Detail pages rendered by one headless Chromium through Playwright's async API
+    
+    The browser and its event loop live on one background thread. Every
+    concurrent render gets its own browser context (separate cookies, storage
+    and cache) with one page, reused for later renders and replaced after
+    recycle_pages pages, so N fetch workers cost N lightweight contexts in one
+    browser process instead of N Chrome instances. Readiness is judged by the
+    same script and conditions as the Selenium path, and the render profile's
+    block patterns are applied through request routing.
+    """
+    
+    name = 'playwright'
+    
+    def __init__(self, readiness: PageReadiness, render_profile: RenderProfile,
+                 chrome_args: Optional[List[str]] = None, window_size: str = '1920,1080',
+                 recycle_pages: int = 500, hang_timeout: float = 90.0):
+        if async_playwright is None:
+            raise RuntimeError("Playwright is not installed "
+                               "(pip install playwright && playwright install chromium)")
+        
+        self.readiness = readiness
+        self.render_profile = render_profile
+        self.chrome_args = ['--disable-dev-shm-usage', '--disable-gpu'] + list(chrome_args or [])
+        width, height = (int(part) for part in window_size.split(','))
+        self.viewport = {'width': width, 'height': height}
+        self.recycle_pages = recycle_pages
+        self.hang_timeout = hang_timeout
+        
+        self.pages = 0
+        self.contexts_created = 0
+        self.contexts_recycled = 0
+        self.restarts = 0
+        self.peak_contexts = 0
+        self._active = 0
+        # (context, page, pages rendered) waiting for the next render, touched only on the loop
+        self._idle = []
+        self._playwright = None
+        self._browser = None
+        self._launch_lock = None
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+    
+    def _start_loop(self) -> asyncio.AbstractEventLoop:
+        """Event loop thread, started on first use"""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name='playwright-loop', daemon=True)
+                self._thread.start()
+            return self._loop
+    
+    async def _ensure_browser(self) -> None:
+        if self._launch_lock is None:
+            self._launch_lock = asyncio.Lock()
+        async with self._launch_lock:
+            if self._browser is not None and self._browser.is_connected():
+                return
+            if self._browser is not None:
+                # Contexts of a crashed browser are gone with it
+                self.restarts += 1
+                self._idle.clear()
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(headless=True, args=self.chrome_args)
+            print("SUCCESS: Playwright Chromium launched")
+    
+    async def _new_context(self) -> Tuple[Any, Any, int]:
+        context = await self._browser.new_context(viewport=self.viewport)
+        patterns = self.render_profile.patterns
+        if patterns:
+            async def block(route):
+                if any(fnmatch.fnmatchcase(route.request.url, pattern) for pattern in patterns):
+                    await route.abort()
+                else:
+                    await route.continue_()
+            await context.route('**/*', block)
+        self.contexts_created += 1
+        return context, await context.new_page(), 0
+    
+    async def _checkout(self) -> Tuple[Any, Any, int]:
+        await self._ensure_browser()
+        slot = self._idle.pop() if self._idle else await self._new_context()
+        self._active += 1
+        self.peak_contexts = max(self.peak_contexts, self._active)
+        return slot
+    
+    async def _checkin(self, slot: Tuple[Any, Any, int], broken: bool) -> None:
+        self._active -= 1
+        context, page, served = slot
+        # A context from before a browser restart died with the old browser
+        alive = context.browser is self._browser and self._browser.is_connected()
+        if not broken and alive and served < (self.recycle_pages or float('inf')):
+            self._idle.append(slot)
+            return
+        if not broken and alive:
+            self.contexts_recycled += 1
+        try:
+            await context.close()
+        except Exception:
+            # Closing a context of a dead browser fails, it is gone anyway
+            pass
+    
+    async def _wait_ready(self, page, started: float, payload_ready=None) -> float:
+        """Poll the readiness condition, or until payload_ready() says the data behind the table arrived"""
+        timeout = self.readiness.timeout.current()
+        condition = self.readiness.condition()
+        script = _page_script(condition.script)
+        deadline = time.time() + timeout
+        while True:
+            if payload_ready is not None and await payload_ready():
+                return time.time() - started
+            if condition.ready(await page.evaluate(script)):
+                return self.readiness.record_ready(started)
+            if time.time() >= deadline:
+                raise self.readiness.record_timeout(timeout)
+            await asyncio.sleep(self.readiness.poll_frequency)
+    
+    async def _render(self, url: str, capture_payloads: bool) -> Tuple[str, Optional[List[str]], float]:
+        try:
+            slot = await self._checkout()
+        except PlaywrightError as e:
+            raise BrowserCrashed(f"Chromium could not open a page ({e})")
+        context, page, served = slot
+        broken = True
+        responses = []
+        bodies = []
+        inline = []
+        
+        def on_response(response) -> None:
+            if response.request.resource_type in ('xhr', 'fetch') and \
+                    ('json' in response.headers.get('content-type', '') or response.url.endswith('.json')):
+                responses.append(asyncio.ensure_future(response.text()))
+        
+        def collect() -> None:
+            # Bodies still downloading are picked up on a later poll
+            for future in [future for future in responses if future.done()]:
+                responses.remove(future)
+                if not future.cancelled() and not future.exception():
+                    bodies.append(future.result())
+        
+        async def payload_ready() -> bool:
+            if not inline:
+                # Inline scripts are in the first HTML, one look is enough
+                inline.append(bool(find_nutrient_data(script_payloads(await page.content()))))
+            collect()
+            return inline[0] or bool(bodies and find_nutrient_data(json_payloads(bodies)))
+        
+        if capture_payloads:
+            page.on('response', on_response)
+        try:
+            started = time.time()
+            await page.goto(url, wait_until='domcontentloaded', timeout=self.hang_timeout * 1000)
+            elapsed = await self._wait_ready(page, started, payload_ready if capture_payloads else None)
+            
+            page_source = await page.content()
+            try:
+                self.render_profile.add_page(int(await page.evaluate(_page_script(TRANSFER_SIZE_SCRIPT)) or 0))
+            except PlaywrightError:
+                pass
+            collect()
+            broken = False
+            slot = (context, page, served + 1)
+            self.pages += 1
+            return page_source, bodies or None, elapsed
+        except PlaywrightTimeout as e:
+            raise TimeoutError(f"page did not load in {self.hang_timeout:.0f}s ({e})")
+        except PlaywrightError as e:
+            if not self._browser.is_connected():
+                raise BrowserCrashed(f"Chromium went away ({e})")
+            raise ConnectionError(str(e))
+        finally:
+            if capture_payloads:
+                page.remove_listener('response', on_response)
+            for future in responses:
+                future.cancel()
+            await self._checkin(slot, broken)
+    
+    def prewarm(self) -> None:
+        """Launch Chromium on the loop thread while the listing is fetched"""
+        def report(future) -> None:
+            if future.exception():
+                print(f"WARNING: Pre-warming Chromium failed ({future.exception()})")
+        
+        asyncio.run_coroutine_threadsafe(self._ensure_browser(), self._start_loop()).add_done_callback(report)
+    
+    def render(self, url: str, capture_payloads: bool = False) -> Tuple[str, Optional[List[str]], float]:
+        """Render url in a free context, blocking the calling thread until the page is ready"""
+        loop = self._start_loop()
+        
+        async def bounded():
+            # A page that hangs is abandoned with its context, not the whole browser
+            try:
+                return await asyncio.wait_for(self._render(url, capture_payloads), timeout=self.hang_timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"page did not finish in {self.hang_timeout:.0f}s")
+        
+        return asyncio.run_coroutine_threadsafe(bounded(), loop).result()
+    
+    async def _shutdown(self) -> None:
+        for context, _, _ in self._idle:
+            try:
+                await context.close()
+            except Exception:
+                pass
+        self._idle.clear()
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+        self._launch_lock = None
+    
+    def close(self) -> None:
+        """Close every context and the browser, and stop the loop thread"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result(timeout=30)
+        except Exception as e:
+            print(f"WARNING: Playwright did not shut down cleanly ({e})")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        loop.close()
+    
+    def stats(self) -> Dict[str, int]:
+        """Pages rendered, contexts created, recycled and at most in use, browser restarts"""
+        return {
+            'pages': self.pages,
+            'contexts': self.contexts_created,
+            'recycled': self.contexts_recycled,
+            'peak': self.peak_contexts,
+            'restarts': self.restarts,
+        }
+    
+    def summary(self) -> str:
+        """One-line report for the end of a run"""
+        stats = self.stats()
+        return (f"Browser backend (playwright): {stats['pages']} pages in {stats['contexts']} contexts "
+                f"of one Chromium, at most {stats['peak']} at once, {stats['recycled']} recycled, "
+                f"{stats['restarts']} browser restarts")
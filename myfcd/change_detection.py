@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Content fingerprints for MyFCD records
+Lets a refresh run skip foods whose listing row and detail page have not changed
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, Mapping, Optional
+
+from .payload_extraction import EXTRACTION_KEY
+
+
+# Key under which every saved record carries its fingerprint
+FINGERPRINT_KEY = 'Fingerprint'
+
+
+def fingerprint(value: Any) -> str:
+    """Stable SHA-256 of any JSON-serialisable value"""
+    payload = json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def listing_fingerprint(food_item: Dict[str, str]) -> str:
+    """Fingerprint of the listing row a food came from"""
+    return fingerprint({key: food_item.get(key, '') for key in ('ndb_no', 'description', 'food_group')})
+
+
+def page_fingerprint(static_data: Dict[str, Any]) -> str:
+    """Fingerprint of the food_data parsed from the static detail page
+    
+    Hashing the parsed content rather than raw HTML keeps session tokens and
+    other markup churn from looking like a data change. How the nutrients were
+    read (EXTRACTION_KEY) is not part of the content.
+    """
+    return fingerprint({key: value for key, value in static_data.items()
+                        if key not in (FINGERPRINT_KEY, EXTRACTION_KEY)})
+
+
+def make_fingerprint(food_item: Dict[str, str], static_data: Optional[Dict[str, Any]] = None,
+                     headers: Optional[Mapping[str, str]] = None) -> Dict[str, Optional[str]]:
+    """Fingerprint block stored in a record
+    
+    page is None when the static page was never fetched (pure Selenium runs),
+    etag/last_modified are kept for conditional requests on the next refresh.
+    """
+    return {
+        'listing': listing_fingerprint(food_item),
+        'page': page_fingerprint(static_data) if static_data is not None else None,
+        'etag': headers.get('ETag') if headers else None,
+        'last_modified': headers.get('Last-Modified') if headers else None
+    }
+
+
+def is_unchanged(old: Optional[Dict[str, Optional[str]]], new: Dict[str, Optional[str]]) -> bool:
+    """True when both the listing row and the static page match the saved fingerprint"""
+    if not old or not old.get('page'):
+        return False
+    return old.get('listing') == new['listing'] and old.get('page') == new['page']
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Command line options shared by the edition scripts and the multi-edition runner
+"""
+
+import argparse
+import os
+from typing import Any, Dict, List, Optional
+
+from .browser_backend import BROWSER_BACKENDS
+from .engine import FETCH_MODES
+from .payload_extraction import EXTRACTION_MODES
+from .readiness import READINESS_STRATEGIES
+from .render_profile import RENDER_PROFILES
+from .http_cache import ResponseCache
+from .rate_control import DEFAULT_RATE_FLOOR
+from .record_store import STORE_FORMATS
+from .driver_provider import DriverProvider
+from .watchdog import DriverWatchdog
+from .sharding import parse_shard
+
+
+def default_cache_dir(output_dir: str) -> str:
+    """Response cache folder next to a datasets folder"""
+    return os.path.join(os.path.dirname(output_dir.rstrip(os.sep)), 'http_cache')
+
+
+def shard_option(text: str) -> str:
+    """argparse type for --shard, checks the I/N form and range"""
+    try:
+        parse_shard(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return text
+
+
+def id_list(text: str) -> List[str]:
+    """argparse type for comma-separated IDs"""
+    ids = [part.strip() for part in text.split(',') if part.strip()]
+    if not ids:
+        raise argparse.ArgumentTypeError("expected one or more comma-separated IDs")
+    return ids
+
+
+def rate_option(text: str) -> float:
+    """argparse type for --min-rate and --max-rate, a positive number of requests/second"""
+    try:
+        rate = float(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected requests/second, got {text!r}")
+    if not 0 < rate < float('inf'):
+        raise argparse.ArgumentTypeError(f"expected a positive request rate, got {text}")
+    return rate
+
+
+def check_rate_bounds(parser: argparse.ArgumentParser, args: argparse.Namespace, ceiling: float) -> None:
+    """Usage error unless the rate floor is at most the ceiling, unset bounds taking their defaults
+    
+    ceiling is the profile's own ceiling, used when --max-rate is not given.
+    """
+    min_rate = getattr(args, 'min_rate', None)
+    floor = DEFAULT_RATE_FLOOR if min_rate is None else min_rate
+    ceiling = ceiling if args.max_rate is None else args.max_rate
+    if floor > ceiling:
+        parser.error(f"the rate floor {floor:g}/s{'' if min_rate is not None else ' (default)'} is above "
+                     f"the ceiling {ceiling:g}/s{'' if args.max_rate is not None else ' (default)'}, "
+                     f"adjust --min-rate or --max-rate")
+
+
+def add_scrape_options(parser: argparse.ArgumentParser, cache_dir: str) -> None:
+    """Add the fetch, run, pacing, retry and cache options"""
+    parser.add_argument('--fetch-mode', choices=FETCH_MODES, default='selenium',
+                        help="detail page backend: selenium, http (static HTML only) "
+                             "or auto (HTTP first, Selenium when a page needs JavaScript)")
+    parser.add_argument('--browser', choices=BROWSER_BACKENDS, default='selenium',
+                        help="browser for rendered pages: selenium (one Chrome per worker) or "
+                             "playwright (one Chromium with an isolated context per worker, driven "
+                             "asynchronously; needs pip install playwright && playwright install chromium)")
+    parser.add_argument('--extraction', choices=EXTRACTION_MODES, default='dom',
+                        help="how nutrients are read: dom (the rendered table) or payload (the data "
+                             "behind it, from inline scripts or XHR responses, without waiting for "
+                             "the table; falls back to dom per page and records which was used)")
+    parser.add_argument('--max-items', type=int, default=None,
+                        help="stop after this many foods (for testing)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="number of parallel Chrome drivers (default: 1)")
+    parser.add_argument('--groups', type=id_list, default=None, metavar='IDS',
+                        help="list only these food group IDs, comma-separated (e.g. 1.01,1.02), "
+                             "for a quick targeted scrape or --refresh")
+    parser.add_argument('--manufacturers', type=id_list, default=None, metavar='IDS',
+                        help="list only these manufacturer IDs, comma-separated (Industry only)")
+    parser.add_argument('--shard', type=shard_option, default=None, metavar='I/N',
+                        help="scrape only shard I of N (1-based), picked by a stable hash of the NDB "
+                             "number, into datasets/shard-I-of-N; combine shards with merge_shards.py")
+    run_mode = parser.add_mutually_exclusive_group()
+    run_mode.add_argument('--resume', action='store_true',
+                          help="continue the last run from its saved listing, skipping foods "
+                               "whose JSON already exists and is valid")
+    run_mode.add_argument('--refresh', action='store_true',
+                          help="re-list, check each static page against the saved fingerprint "
+                               "and only re-scrape foods that changed")
+    parser.add_argument('--readiness', choices=sorted(READINESS_STRATEGIES), default='table',
+                        help="when a rendered page counts as ready: table (serving cells filled "
+                             "and stable) or network (no requests in flight)")
+    parser.add_argument('--render-profile', choices=sorted(RENDER_PROFILES), default='light',
+                        help="resources Chrome skips: full (none), light (images, fonts, media, "
+                             "known analytics and social scripts; other third-party scripts still load) "
+                             "or minimal (light plus stylesheets)")
+    parser.add_argument('--store', choices=STORE_FORMATS, default='files',
+                        help="record layout: files (one JSON file per food) or ndjson "
+                             "(records.ndjson with an offset index, batched and fsynced)")
+    parser.add_argument('--offline-driver', action='store_true',
+                        help="never download ChromeDriver, use the cached or system driver "
+                             "(the cache is refreshed weekly otherwise)")
+    parser.add_argument('--recycle-pages', type=int, default=500,
+                        help="restart each browser after this many pages, 0 never (default: 500)")
+    parser.add_argument('--recycle-rss-mb', type=float, default=1500,
+                        help="restart a browser whose processes use more memory than this, 0 never (default: 1500)")
+    parser.add_argument('--hang-timeout', type=float, default=90,
+                        help="kill and replace a browser that does not finish a page in this many seconds (default: 90)")
+    parser.add_argument('--images', action='store_true',
+                        help="after scraping, mirror product images into datasets/images "
+                             "(content-addressed, revalidated with ETag/Last-Modified, with thumbnails)")
+    parser.add_argument('--session-bridge', action='store_true',
+                        help="open the site once in Chrome and send its cookies, user agent and CSRF "
+                             "token with every HTTP request, renewed when they expire or are rejected "
+                             "(for --fetch-mode http/auto when pages need a browser session)")
+    parser.add_argument('--archive', action='store_true',
+                        help="keep every detail page the records are parsed from, gzip-compressed, "
+                             "so reparse.py can rebuild the records offline after a parser fix")
+    parser.add_argument('--archive-dir', default=None,
+                        help="page archive folder (default: html_archive next to datasets)")
+    parser.add_argument('--retry-attempts', type=int, default=4,
+                        help="attempts per food before it is given up, failures are retried "
+                             "with exponential backoff at the end of the run (default: 4, 1 disables)")
+    parser.add_argument('--retry-wait', type=float, default=600,
+                        help="longest time in seconds to spend retrying at the end of the run, "
+                             "the rest waits in run_retry_queue.json for the next run (default: 600)")
+    parser.add_argument('--min-rate', type=rate_option, default=None,
+                        help="lowest request rate in requests/second the controller backs off to")
+    parser.add_argument('--max-rate', type=rate_option, default=None,
+                        help="highest request rate in requests/second the controller ramps up to")
+    cache_mode = parser.add_mutually_exclusive_group()
+    cache_mode.add_argument('--cache', action='store_true',
+                            help="record listing, static and rendered pages in the on-disk "
+                                 "response cache and serve fresh entries from it")
+    cache_mode.add_argument('--replay', action='store_true',
+                            help="serve everything from the response cache without any network "
+                                 "requests or browser (pages never recorded fail)")
+    parser.add_argument('--cache-dir', default=cache_dir,
+                        help="response cache folder (default: http_cache next to datasets)")
+    parser.add_argument('--cache-ttl', type=float, default=168,
+                        help="hours a cached response stays fresh when recording (default: 168)")
+    parser.add_argument('--cache-max-mb', type=int, default=500,
+                        help="cache size limit, least recently used entries go first (default: 500)")
+
+
+def build_cache(args: argparse.Namespace) -> Optional[ResponseCache]:
+    """Response cache for --cache/--replay, None when neither is given"""
+    if not (args.cache or args.replay):
+        return None
+    return ResponseCache(args.cache_dir, mode='replay' if args.replay else 'record',
+                         ttl=args.cache_ttl * 3600, max_bytes=args.cache_max_mb * 1024 * 1024)
+
+
+def engine_options(args: argparse.Namespace) -> Dict[str, Any]:
+    """Keyword arguments for ScraperEngine and the edition scrapers"""
+    return {
+        'fetch_mode': args.fetch_mode,
+        'readiness': args.readiness,
+        'render_profile': args.render_profile,
+        'store': args.store,
+        'shard': args.shard,
+        'archive': args.archive,
+        'archive_dir': args.archive_dir,
+        'session_bridge': args.session_bridge,
+        'extraction': args.extraction,
+        'browser': args.browser,
+        'driver_provider': DriverProvider(offline=args.offline_driver),
+        'watchdog': DriverWatchdog(max_pages=args.recycle_pages, max_rss_mb=args.recycle_rss_mb,
+                                   hang_timeout=args.hang_timeout),
+    }
+
+
+def run_options(args: argparse.Namespace) -> Dict[str, Any]:
+    """Keyword arguments for scrape_all_foods"""
+    return {
+        'max_items': args.max_items,
+        'workers': args.workers,
+        'resume': args.resume,
+        'refresh': args.refresh,
+        'retry_attempts': args.retry_attempts,
+        'retry_wait': args.retry_wait,
+        'mirror_images': args.images,
+        'groups': args.groups,
+        'manufacturers': args.manufacturers,
+    }
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Shared Chrome driver pool for MyFCD scraping
+Lets engines for several editions borrow drivers one page at a time, and starts them ahead of need
+"""
+
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .watchdog import DriverWatchdog
+
+
+class DriverPool:
+    """Up to size drivers, created on first demand (or pre-warmed) and lent out page by page
+    
+    Drivers are keyed by the configuration they were started with (one key per
+    edition), since Chrome options cannot change after launch. A borrower gets
+    a driver of its own key; when the pool is full and only other keys' drivers
+    are idle, one of them is quit and replaced. Every driver the pool quits is
+    dropped from watchdog, so it keeps no counters for dead browsers.
+    """
+    
+    def __init__(self, factory: Callable[[], Any], size: int, key: Optional[str] = None,
+                 watchdog: Optional[DriverWatchdog] = None):
+        if size < 1:
+            raise ValueError("driver pool size must be at least 1")
+        
+        self.factory = factory
+        self.key = key
+        self.size = size
+        self.watchdog = watchdog
+        self.created = 0
+        self.prewarmed = 0
+        self.swapped = 0
+        self._idle: List[Tuple[Optional[str], Any]] = []
+        # Key of every driver currently lent out, by id
+        self._lent: Dict[int, Optional[str]] = {}
+        self._closed = False
+        self._cond = threading.Condition()
+    
+    def _retire(self, driver) -> None:
+        """Quit a pooled driver and drop its watchdog counters"""
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        if self.watchdog is not None:
+            self.watchdog.forget(driver)
+    
+    def _start_one(self, key: Optional[str], factory: Callable[[], Any]) -> None:
+        """Background thread: start a driver into the idle list"""
+        try:
+            driver = factory()
+        except Exception as e:
+            print(f"WARNING: Pre-warming a driver failed ({e})")
+            with self._cond:
+                self.created -= 1
+                self._cond.notify_all()
+            return
+        
+        with self._cond:
+            if not self._closed:
+                self._idle.append((key, driver))
+                self.prewarmed += 1
+                self._cond.notify_all()
+                return
+            self.created -= 1
+        # Pool closed while Chrome was starting
+        self._retire(driver)
+    
+    def prewarm(self, count: int, key: Optional[str] = None, factory: Optional[Callable[[], Any]] = None) -> None:
+        """Start up to count drivers for key in parallel background threads, returns immediately"""
+        key, factory = (self.key, self.factory) if factory is None else (key, factory)
+        with self._cond:
+            count = min(count, self.size - self.created)
+            self.created += max(count, 0)
+        for n in range(count):
+            threading.Thread(target=self._start_one, args=(key, factory),
+                             name=f"prewarm-{key or 'driver'}-{n + 1}", daemon=True).start()
+    
+    def _take_idle(self, key: Optional[str]) -> Any:
+        """Idle driver of key, caller holds the lock"""
+        for index, (idle_key, driver) in enumerate(self._idle):
+            if idle_key == key:
+                del self._idle[index]
+                return driver
+        return None
+    
+    def acquire(self, key: Optional[str] = None, factory: Optional[Callable[[], Any]] = None):
+        """Borrow a driver of key, starting one with factory while under size, otherwise waiting for one"""
+        key, factory = (self.key, self.factory) if factory is None else (key, factory)
+        replaced = None
+        with self._cond:
+            while True:
+                driver = self._take_idle(key)
+                if driver is not None:
+                    self._lent[id(driver)] = key
+                    return driver
+                if self.created < self.size:
+                    self.created += 1
+                    break
+                if self._idle:
+                    # Full, with only other editions' drivers idle: trade the oldest for one of ours
+                    _, replaced = self._idle.pop(0)
+                    self.swapped += 1
+                    break
+                self._cond.wait()
+        
+        if replaced is not None:
+            self._retire(replaced)
+        try:
+            driver = factory()
+        except Exception:
+            with self._cond:
+                self.created -= 1
+                self._cond.notify_all()
+            raise
+        with self._cond:
+            self._lent[id(driver)] = key
+        return driver
+    
+    def release(self, driver, broken: bool = False) -> None:
+        """Return a driver, broken ones are quit and replaced on the next acquire"""
+        if broken:
+            self._retire(driver)
+            with self._cond:
+                self._lent.pop(id(driver), None)
+                self.created -= 1
+                self._cond.notify_all()
+            return
+        
+        with self._cond:
+            self._idle.append((self._lent.pop(id(driver), self.key), driver))
+            # Waiters for other keys may now trade this driver in
+            self._cond.notify_all()
+    
+    def close(self) -> None:
+        """Quit every idle driver, drivers still starting are quit once they are up"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = [driver for _, driver in self._idle], []
+            self.created -= len(idle)
+        for driver in idle:
+            self._retire(driver)
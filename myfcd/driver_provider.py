@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+ChromeDriver resolution and browser startup for MyFCD scraping
+Resolves the driver once, caches its path and version on disk so later runs start offline, and times every launch
+"""
+
+import json
+import os
+import shutil
+import stat
+import subprocess
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from selenium import webdriver
+
+from .run_manifest import atomic_write_json
+
+
+DRIVER_CACHE_FILE = os.path.join(os.path.expanduser('~'), '.cache', 'myfcd', 'chromedriver.json')
+
+
+def driver_version(driver_path: str) -> Optional[str]:
+    """Version reported by `chromedriver --version`, None if it does not run"""
+    try:
+        output = subprocess.run([driver_path, '--version'], capture_output=True, text=True, timeout=10).stdout
+    except Exception:
+        return None
+    parts = output.split()
+    return parts[1] if len(parts) > 1 else None
+
+
+class DriverProvider:
+    """Finds a ChromeDriver binary and starts Chrome with it
+    
+    Resolution order: the cached driver (if it still exists and is younger
+    than max_age_days), webdriver-manager (network), a stale cached driver,
+    chromedriver on PATH, and finally Selenium's own driver lookup. With
+    offline=True webdriver-manager is never asked. The result is resolved once
+    per process and shared by every engine and thread; a cached driver that
+    no longer starts Chrome (after a browser update) is resolved again.
+    """
+    
+    def __init__(self, cache_path: str = DRIVER_CACHE_FILE, max_age_days: float = 7.0, offline: bool = False):
+        self.cache_path = cache_path
+        self.max_age_days = max_age_days
+        self.offline = offline
+        self.driver_path = None
+        self.version = None
+        self.resolved_from = None
+        self.startup_times: List[float] = []
+        self._resolved = False
+        self._skip_cache = False
+        self._lock = threading.Lock()
+    
+    def _load_cache(self) -> Dict[str, Any]:
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return {}
+    
+    def _save_cache(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            atomic_write_json(self.cache_path, {'path': self.driver_path, 'version': self.version,
+                                                'resolved_at': time.time()})
+        except Exception as e:
+            print(f"WARNING: Could not cache the ChromeDriver location ({e})")
+    
+    def _use(self, driver_path: Optional[str], version: Optional[str], source: str) -> None:
+        self.driver_path = driver_path
+        self.version = version
+        self.resolved_from = source
+    
+    def resolve(self) -> Optional[str]:
+        """Driver binary path, None to let Selenium look one up itself"""
+        with self._lock:
+            if self._resolved:
+                return self.driver_path
+            self._resolved = True
+            
+            cached = self._load_cache()
+            cached_path = cached.get('path')
+            usable = bool(cached_path) and os.path.exists(cached_path)
+            fresh = time.time() - cached.get('resolved_at', 0) < self.max_age_days * 86400
+            if usable and (fresh or self.offline) and not self._skip_cache:
+                self._use(cached_path, cached.get('version'), 'cache')
+                return self.driver_path
+            
+            if not self.offline:
+                try:
+                    from webdriver_manager.chrome import ChromeDriverManager
+                    driver_path = ChromeDriverManager().install()
+                    os.chmod(driver_path, stat.S_IRWXU | stat.S_IRGRP | stat.S_IXGRP | stat.S_IROTH | stat.S_IXOTH)
+                    self._use(driver_path, driver_version(driver_path), 'webdriver-manager')
+                    self._save_cache()
+                    return self.driver_path
+                except Exception as e:
+                    print(f"WARNING: ChromeDriverManager failed ({e}), trying a local driver...")
+            
+            if usable and not self._skip_cache:
+                self._use(cached_path, cached.get('version'), 'stale cache')
+                return self.driver_path
+            
+            system_path = shutil.which('chromedriver')
+            if system_path:
+                self._use(system_path, driver_version(system_path), 'PATH')
+                self._save_cache()
+                return self.driver_path
+            
+            self._use(None, None, 'Selenium Manager')
+            return None
+    
+    @staticmethod
+    def _launch(driver_path: Optional[str], options) -> webdriver.Chrome:
+        if driver_path:
+            return webdriver.Chrome(service=webdriver.chrome.service.Service(driver_path), options=options)
+        return webdriver.Chrome(options=options)
+    
+    def start(self, options) -> webdriver.Chrome:
+        """Launch Chrome with options, timing the startup"""
+        driver_path = self.resolve()
+        started = time.time()
+        try:
+            driver = self._launch(driver_path, options)
+        except Exception as e:
+            if self.resolved_from not in ('cache', 'stale cache'):
+                raise
+            print(f"WARNING: Cached ChromeDriver failed to start Chrome ({e}), resolving it again...")
+            with self._lock:
+                self._resolved = False
+                self._skip_cache = True
+            driver = self._launch(self.resolve(), options)
+        with self._lock:
+            self.startup_times.append(time.time() - started)
+        return driver
+    
+    def summary(self) -> str:
+        """One-line report for the end of a run"""
+        with self._lock:
+            times = list(self.startup_times)
+        source = f"{self.resolved_from}, {self.version or 'unknown version'}" if self._resolved else "not resolved"
+        if not times:
+            return f"Driver startup: no browsers started (ChromeDriver from {source})"
+        return (f"Driver startup: {len(times)} browsers, avg {sum(times) / len(times):.2f}s, "
+                f"max {max(times):.2f}s (ChromeDriver from {source})")
+
+
+# One provider per process, so the driver is resolved once however many engines run
+_default_provider = None
+_default_lock = threading.Lock()
+
+
+def default_provider() -> DriverProvider:
+    """Process-wide DriverProvider"""
+    global _default_provider
+    with _default_lock:
+        if _default_provider is None:
+            _default_provider = DriverProvider()
+        return _default_provider
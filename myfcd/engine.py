@@ -0,0 +1,1989 @@
+#!/usr/bin/env python3
+"""
+MyFCD scraping engine - one Selenium/HTTP scraper for every edition, driven by a SiteProfile
+Several editions can run at once sharing a driver pool, HTTP session and rate controller
+"""
+
+import asyncio
+import json
+import os
+import time
+import re
+import queue
+import threading
+import requests
+import httpx
+from typing import Dict, Iterator, List, Optional, Any, Tuple
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup
+from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import TimeoutException
+
+from .profiles import SiteProfile
+from .readiness import PageReadiness
+from .render_profile import RenderProfile
+from .run_manifest import RunManifest, MANIFEST_FILE
+from .change_detection import FINGERPRINT_KEY, make_fingerprint, listing_fingerprint, is_unchanged
+from .http_cache import ResponseCache, CacheMiss
+from .rate_control import RateController
+from .failures import RETRY_QUEUE_FILE, FAILURE_REPORT_FILE, RetryQueue, classify_exception
+from .driver_pool import DriverPool
+from .driver_provider import DriverProvider, default_provider
+from .watchdog import DriverWatchdog
+from .pipeline import Pipeline, DROP
+from .record_store import RECORDS_FILE, open_record_store, is_valid_record
+from .sharding import parse_shard, shard_of, shard_dir
+from .work_queue import WorkQueue, default_worker_id
+from .image_mirror import IMAGE_MANIFEST_FILE, ImageMirror
+from .html_archive import HtmlArchive, default_archive_dir, reparse_archive
+from .refresh_schedule import SCHEDULE_FILE, RefreshSchedule
+from .session_bridge import SESSION_FILE, SessionBridge
+from .browser_backend import BROWSER_BACKENDS, BrowserCrashed, PlaywrightBackend
+from .payload_extraction import (EXTRACTION_KEY, EXTRACTION_MODES, build_nutrients, find_nutrient_data,
+                                 json_payloads, network_bodies, script_payloads)
+
+
+# Detail page backends: 'selenium' renders every page in Chrome, 'http' parses
+# the static HTML only, 'auto' tries HTTP first and falls back to Chrome for
+# pages whose serving-size values are filled in by JavaScript
+FETCH_MODES = ('selenium', 'http', 'auto')
+
+# Attempts per listing page before the listing is reported as incomplete
+LISTING_ATTEMPTS = 4
+
+# Seconds before the refresh daemon retries a listing when it has none at all
+LISTING_RETRY = 900.0
+
+
+def make_session(pool_size: int = 10) -> requests.Session:
+    """requests session with the browser-like headers the site expects
+    
+    pool_size is the number of keep-alive connections, one session can be
+    shared by every worker and edition.
+    """
+    session = requests.Session()
+    session.headers.update({
+        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
+        'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
+    })
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class ScraperEngine:
+    """Production Selenium-based scraper for one MyFCD edition, described by a SiteProfile"""
+    
+    def __init__(self, profile: SiteProfile, output_dir: Optional[str] = None,
+                 fetch_mode: str = 'selenium', readiness: str = 'table',
+                 render_profile: str = 'light', cache: Optional[ResponseCache] = None,
+                 session: Optional[requests.Session] = None, rate: Optional[RateController] = None,
+                 driver_pool: Optional[DriverPool] = None, store: str = 'files',
+                 driver_provider: Optional[DriverProvider] = None,
+                 watchdog: Optional[DriverWatchdog] = None, shard: Optional[str] = None,
+                 archive: bool = False, archive_dir: Optional[str] = None, session_bridge: bool = False,
+                 extraction: str = 'dom', browser: str = 'selenium'):
+        """Initialize the scraper for profile's edition
+        
+        session, rate, driver_pool, driver_provider and watchdog are passed in when several engines share them.
+        store is the record layout, 'files' (one JSON per food) or 'ndjson'.
+        shard 'i/N' scrapes only the foods whose NDB hashes to shard i, into output_dir/shard-i-of-N.
+        archive keeps every detail page that yields a record in archive_dir (html_archive next to datasets).
+        session_bridge gives HTTP requests the cookies, user agent and CSRF token of one browser visit.
+        extraction 'payload' reads nutrients from the data behind the page (inline scripts, XHR
+        responses) without waiting for the table, falling back to the DOM per page.
+        browser 'playwright' renders pages in isolated contexts of one Chromium instead of a Chrome per worker.
+        """
+        if fetch_mode not in FETCH_MODES:
+            raise ValueError(f"Unknown fetch mode '{fetch_mode}', expected one of {FETCH_MODES}")
+        if extraction not in EXTRACTION_MODES:
+            raise ValueError(f"Unknown extraction mode '{extraction}', expected one of {EXTRACTION_MODES}")
+        if browser not in BROWSER_BACKENDS:
+            raise ValueError(f"Unknown browser '{browser}', expected one of {BROWSER_BACKENDS}")
+        
+        self.profile = profile
+        self.base_url = profile.base_url
+        self.ajax_url = profile.ajax_url
+        self.output_dir = output_dir or profile.output_dir
+        # Raw detail pages for offline re-parsing, shared by every shard of the edition and kept
+        # next to its default datasets folder, so reparse.py --output-dir still finds them
+        self.archive = HtmlArchive(archive_dir or default_archive_dir(profile.output_dir),
+                                   profile.key) if archive else None
+        # (index, count) when this engine scrapes one shard of the catalogue
+        self.shard = parse_shard(shard) if shard else None
+        if self.shard:
+            self.output_dir = shard_dir(self.output_dir, *self.shard)
+        self.fetch_mode = fetch_mode
+        self.driver = None
+        self.driver_pool = driver_pool
+        # Resolves ChromeDriver once per process and times browser startup
+        self.driver_provider = driver_provider or default_provider()
+        # Kills hung browsers and recycles worn ones
+        self.watchdog = watchdog or DriverWatchdog()
+        self.fetch_stats = {'http': 0, 'selenium': 0}
+        self.extraction = extraction
+        # Saved records by how their nutrients were read, in payload extraction runs
+        self.extraction_stats = {'payload': 0, 'dom': 0}
+        # JSON XHR bodies captured with the last rendered page
+        self.last_payloads = None
+        # Rendered pages in a row without a payload; past a few, pages stop waiting for one
+        self.payload_misses = 0
+        self.readiness = PageReadiness(strategy=readiness, initial_timeout=profile.readiness_timeout)
+        self.render_profile = RenderProfile(render_profile)
+        self.manifest = None
+        # Optional on-disk response cache, in replay mode the network is never used
+        self.cache = cache
+        # Renders detail pages in place of Selenium, shared with pool workers; started on first use
+        self.browser = browser
+        self.browser_backend = None
+        if browser == 'playwright' and not self.offline:
+            self.browser_backend = PlaywrightBackend(self.readiness, self.render_profile,
+                                                     chrome_args=profile.chrome_args, window_size=profile.window_size,
+                                                     recycle_pages=self.watchdog.max_pages,
+                                                     hang_timeout=self.watchdog.hang_timeout)
+        # Browser session state for HTTP requests, shared with shards through the datasets folder
+        self.bridge = None
+        if session_bridge and not self.offline:
+            self.bridge = SessionBridge(os.path.join(output_dir or profile.output_dir, SESSION_FILE),
+                                        self.base_url, self.create_driver)
+        # Why the last fetch_food_detail call failed, as (kind, message)
+        self.last_failure = None
+        self.retry_queue = None
+        # Paces every listing, static and rendered request, shared with pool workers
+        self.rate = rate or RateController(initial_rate=profile.initial_rate, ceiling=profile.max_rate)
+        
+        # Listing pages are fetched concurrently once the first page gives recordsTotal;
+        # full listings are split by food group and reconciled with the site total
+        self.listing_concurrency = 8
+        self.listing_http2 = False
+        self.listing_partitioned = True
+        self.listing_total = None
+        self.listing_global_total = None
+        self.listing_counts = {}
+        
+        # Items buffered in front of each pipeline stage, and parser threads
+        self.pipeline_queue_size = 32
+        self.parse_threads = 1
+        
+        # Image mirror connections and thumbnail edge in pixels (None skips thumbnails)
+        self.image_concurrency = 8
+        self.thumb_size = 256
+        
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.store_format = store
+        self.store = None
+        
+        # Set up requests session for AJAX calls
+        self.session = session or make_session()
+    
+    def create_driver(self):
+        """Start a Chrome WebDriver configured for this profile and render profile"""
+        chrome_options = Options()
+        chrome_options.add_argument('--headless')
+        chrome_options.add_argument('--no-sandbox')
+        chrome_options.add_argument('--disable-dev-shm-usage')
+        chrome_options.add_argument('--disable-gpu')
+        for argument in self.profile.chrome_args:
+            chrome_options.add_argument(argument)
+        chrome_options.add_argument(f'--window-size={self.profile.window_size}')
+        chrome_options.add_argument('--disable-web-security')
+        chrome_options.add_argument('--allow-running-insecure-content')
+        
+        # Skip images, fonts, media and trackers the nutrient table does not need
+        self.render_profile.apply_options(chrome_options)
+        if self.extraction == 'payload':
+            # Network events, so XHR responses can be read back through DevTools
+            chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+        
+        try:
+            driver = self.driver_provider.start(chrome_options)
+            driver.implicitly_wait(self.profile.implicit_wait)
+            self.render_profile.attach(driver)
+            print("SUCCESS: Selenium WebDriver initialized")
+            return driver
+        except Exception as e:
+            print(f"ERROR: Failed to initialize WebDriver: {e}")
+            raise
+    
+    def setup_driver(self) -> None:
+        """Set up Selenium WebDriver"""
+        self.driver = self.create_driver()
+    
+    def close_driver(self, broken: bool = False) -> None:
+        """Close the WebDriver, or hand it back when it was borrowed from a shared pool"""
+        if self.driver:
+            if broken or self.driver_pool is None:
+                self.watchdog.forget(self.driver)
+            if self.driver_pool is not None:
+                self.driver_pool.release(self.driver, broken=broken)
+            else:
+                try:
+                    self.driver.quit()
+                except Exception:
+                    # A crashed browser cannot be quit cleanly, drop it anyway
+                    pass
+            self.driver = None
+    
+    def _ensure_driver(self) -> None:
+        """Start the WebDriver on first use (HTTP and auto runs may never need it)"""
+        if self.driver is None:
+            if self.driver_pool is not None:
+                self.driver = self.driver_pool.acquire(key=self.profile.key, factory=self.create_driver)
+            else:
+                self.setup_driver()
+    
+    def _driver_crashed(self) -> bool:
+        """True when the last failure took the browser down with it"""
+        return self.last_failure is not None and self.last_failure[0] == 'driver_crash'
+    
+    def _fail(self, kind: str, error: Any) -> None:
+        """Remember why the current food failed"""
+        self.last_failure = (kind, str(error))
+    
+    @property
+    def offline(self) -> bool:
+        """True when replaying from the cache, so no request or browser may be started"""
+        return self.cache is not None and self.cache.replay
+    
+    @staticmethod
+    def _cached_response(url: str, cached: Dict[str, Any]) -> requests.Response:
+        """Rebuild a requests.Response from a cache entry"""
+        response = requests.Response()
+        response.url = url
+        response.status_code = cached['status']
+        response.headers = requests.structures.CaseInsensitiveDict(cached['headers'])
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response._content = cached['body']
+        return response
+    
+    def _http_get(self, url: str, headers: Optional[Dict[str, str]] = None, timeout: int = 30,
+                  fresh: bool = False) -> requests.Response:
+        """GET url through the response cache when one is configured
+        
+        fresh asks the site even when the cache holds the page (except in replay
+        mode) and records the new response. Raises CacheMiss in replay mode when
+        the page was never recorded.
+        """
+        key = ResponseCache.request_key('GET', url)
+        if self.cache and not (fresh and not self.cache.replay):
+            cached = self.cache.get(key)
+            if cached is not None:
+                return self._cached_response(url, cached)
+        
+        state = self.bridge.ensure(self.session) if self.bridge else None
+        renewed = False
+        while True:
+            request_headers = dict(SessionBridge.headers(state), **(headers or {})) if state else headers
+            self.rate.acquire()
+            started = time.time()
+            try:
+                response = self.session.get(url, headers=request_headers, timeout=timeout)
+            except requests.RequestException as e:
+                self.rate.record_error('http', timeout=isinstance(e, requests.Timeout))
+                raise
+            self.rate.record_response('http', time.time() - started, response.status_code, response.headers)
+            if state is None or renewed or not SessionBridge.rejected(response.status_code):
+                break
+            # The site dropped the session: renew it once and repeat the request
+            print(f"    Session rejected (HTTP {response.status_code}), renewing it...")
+            state = self.bridge.refresh(self.session, state)
+            renewed = True
+        
+        if self.cache and response.status_code == 200:
+            self.cache.put(key, response.content, response.status_code, response.headers)
+        return response
+    
+    def get_food_group_mapping(self) -> Dict[str, str]:
+        """Automatically get food group mapping from website"""
+        try:
+            print(" Getting latest food group names from website...")
+            response = self._http_get(self.base_url, timeout=10)
+            response.raise_for_status()
+            
+            # Find food group options in HTML
+            import re
+            pattern = r'<option value="([^"]+)"[^>]*>([^<]+)</option>'
+            matches = re.findall(pattern, response.text)
+            
+            mapping = {}
+            for value, text in matches:
+                # Only include valid food group IDs (numbers and dots)
+                if re.match(r'^[\d.]+$', value) and value != '0':
+                    mapping[value] = text.strip()
+            
+            if mapping:
+                print(f" SUCCESS: Found {len(mapping)} food groups automatically")
+                return mapping
+            else:
+                raise Exception("No food groups found in HTML")
+        
+        except Exception as e:
+            print(f" WARNING: Auto-mapping failed ({e}), using fallback...")
+            # Fallback mapping for this edition
+            return dict(self.profile.group_fallback)
+    
+    def _parse_listing_rows(self, ajax_data: Dict[str, Any], food_group_mapping: Dict[str, str]) -> List[Dict[str, str]]:
+        """Turn one page of AJAX rows into food item dicts"""
+        food_items = []
+        for row in ajax_data.get('data', []):
+            if len(row) >= 3:
+                ndb_no = str(row[0]).strip()
+                description = str(row[1]).strip()
+                food_group_id = str(row[2]).strip()
+                
+                food_group = food_group_mapping.get(food_group_id, f"Food Group {food_group_id}")
+                detail_url = self.profile.detail_url(ndb_no)
+                
+                food_items.append({
+                    'ndb_no': ndb_no,
+                    'description': description,
+                    'food_group': food_group,
+                    'detail_url': detail_url
+                })
+        return food_items
+    
+    async def _fetch_listing_page(self, client: httpx.AsyncClient, semaphore: asyncio.Semaphore,
+                                  start: int, page_size: int,
+                                  filters: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """POST one listing page, retrying with backoff before giving up
+        
+        filters narrows the listing to one food group or manufacturer.
+        """
+        data = {
+            'my_food_group': 0,  # All food groups
+            'my_manufacturer': 0,  # All manufacturers
+            'start': start,
+            'length': page_size
+        }
+        data.update(filters or {})
+        
+        key = ResponseCache.request_key('POST', self.ajax_url, data)
+        if self.cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return json.loads(cached['body'])
+        
+        last_error = None
+        for attempt in range(1, LISTING_ATTEMPTS + 1):
+            async with semaphore:
+                await self.rate.acquire_async()
+                started = time.time()
+                try:
+                    state = self.bridge.state if self.bridge else None
+                    try:
+                        # The CSRF field is not part of the cache key, it changes with every handshake
+                        response = await client.post(self.ajax_url,
+                                                     data=dict(data, **SessionBridge.form_fields(state)) if state else data)
+                    except httpx.TransportError as e:
+                        self.rate.record_error('listing', timeout=isinstance(e, httpx.TimeoutException))
+                        raise
+                    self.rate.record_response('listing', time.time() - started, response.status_code, response.headers)
+                    if state and SessionBridge.rejected(response.status_code):
+                        state = await asyncio.to_thread(self.bridge.refresh, self.session, state)
+                        self._bridge_client(client, state)
+                    response.raise_for_status()
+                    page = response.json()
+                    if self.cache:
+                        self.cache.put(key, response.content, response.status_code, dict(response.headers))
+                    return page
+                except Exception as e:
+                    last_error = e
+            if attempt < LISTING_ATTEMPTS:
+                print(f"  WARNING: {self._page_label(filters, start // page_size + 1)} failed ({last_error}), retrying...")
+                await asyncio.sleep(0.5 * 2 ** (attempt - 1))
+        
+        raise RuntimeError(f"{self._page_label(filters, start // page_size + 1).lower()} failed after "
+                           f"{LISTING_ATTEMPTS} attempts: {last_error}")
+    
+    def _bridge_client(self, client: httpx.AsyncClient, state: Dict[str, Any]) -> None:
+        """Give the listing client the bridged cookies and headers"""
+        for cookie in self.session.cookies:
+            client.cookies.set(cookie.name, cookie.value, domain=cookie.domain, path=cookie.path)
+        client.headers.update(SessionBridge.headers(state))
+    
+    @staticmethod
+    def _partition_label(filters: Optional[Dict[str, str]]) -> Optional[str]:
+        """'Group 1.01' or 'Manufacturer 12', None for the unfiltered listing"""
+        if filters and 'my_food_group' in filters:
+            return f"Group {filters['my_food_group']}"
+        if filters and 'my_manufacturer' in filters:
+            return f"Manufacturer {filters['my_manufacturer']}"
+        return None
+    
+    def _page_label(self, filters: Optional[Dict[str, str]], page_number: int) -> str:
+        """'Page 3' or 'Group 1.01 page 3' for log lines"""
+        partition = self._partition_label(filters)
+        return f"{partition} page {page_number}" if partition else f"Page {page_number}"
+    
+    @staticmethod
+    def _partition_count(page: Dict[str, Any]) -> int:
+        """Rows matching a listing page's filter (DataTables recordsFiltered, else recordsTotal)"""
+        count = page.get('recordsFiltered', page.get('recordsTotal', 0))
+        return int(count or 0)
+    
+    async def _fetch_listing_pages(self, page_size: int, on_page=None,
+                                   partitions: Optional[List[Dict[str, str]]] = None) -> Dict[Tuple[int, int], Dict[str, Any]]:
+        """Fetch the first page of every partition, then every remaining offset concurrently
+        
+        partitions is a list of filters (one food group or manufacturer each),
+        None for a single unfiltered scan. Partitioned listings also fetch the
+        unfiltered total for reconciliation. Returns the raw AJAX responses keyed
+        by (partition index, start offset). With on_page, each page is instead
+        handed to the coroutine on_page(label, page) as it arrives and nothing is
+        kept. Raises if any page still fails after its retries, rather than
+        returning a truncated list.
+        """
+        http2 = self.listing_http2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                print(" WARNING: h2 is not installed, listing over HTTP/1.1")
+                http2 = False
+        
+        partitioned = partitions is not None
+        partitions = partitions if partitioned else [{}]
+        
+        async def fetch(index: int, start: int, size: int):
+            try:
+                return index, start, await self._fetch_listing_page(client, semaphore, start, size, partitions[index])
+            except Exception as e:
+                return index, start, e
+        
+        async def handle(index: int, start: int, size: int, page: Dict[str, Any]) -> None:
+            if on_page:
+                await on_page(self._page_label(partitions[index], start // size + 1), page)
+            else:
+                pages[(index, start)] = page
+        
+        pages = {}
+        failures = []
+        self.listing_counts = {}
+        limits = httpx.Limits(max_connections=self.listing_concurrency,
+                              max_keepalive_connections=self.listing_concurrency)
+        async with httpx.AsyncClient(headers=dict(self.session.headers), timeout=30,
+                                     limits=limits, http2=http2) as client:
+            if self.bridge:
+                self._bridge_client(client, await asyncio.to_thread(self.bridge.ensure, self.session))
+            semaphore = asyncio.Semaphore(self.listing_concurrency)
+            
+            # First pages give each partition's size (and the site-wide total to reconcile against)
+            first_pages = [self._fetch_listing_page(client, semaphore, 0, page_size, filters) for filters in partitions]
+            if partitioned:
+                first_pages.append(self._fetch_listing_page(client, semaphore, 0, 1))
+            first_pages = await asyncio.gather(*first_pages)
+            if partitioned:
+                self.listing_global_total = int(first_pages.pop().get('recordsTotal', 0) or 0)
+            
+            counts = [self._partition_count(page) for page in first_pages]
+            if partitioned and len(partitions) > 1 and self.listing_global_total and \
+                    all(count == self.listing_global_total for count in counts):
+                # Every partition holds everything, the endpoint ignores the filter
+                print(" WARNING: The listing endpoint ignores the partition filter, listing everything in one scan")
+                self.listing_global_total = None
+                partitioned = False
+                partitions = [{}]
+                first_pages, counts = first_pages[:1], counts[:1]
+            if not partitioned:
+                self.listing_global_total = int(first_pages[0].get('recordsTotal', 0) or 0)
+            self.listing_total = sum(counts)
+            
+            remaining = []
+            sizes = []
+            for index, (page, count) in enumerate(zip(first_pages, counts)):
+                size = page_size
+                first_rows = len(page.get('data', []))
+                if first_rows < size and first_rows < count:
+                    # Server capped the page length, follow its page size instead
+                    size = first_rows
+                sizes.append(size)
+                self.listing_counts[self._partition_label(partitions[index]) or 'All'] = count
+                await handle(index, 0, size, page)
+                if first_rows:
+                    remaining.extend((index, start) for start in range(size, count, size))
+            
+            # Pages are handled in the order they arrive, not in offset order
+            for next_page in asyncio.as_completed([fetch(index, start, sizes[index]) for index, start in remaining]):
+                index, start, result = await next_page
+                size = sizes[index]
+                if isinstance(result, Exception):
+                    failures.append(str(result))
+                else:
+                    await handle(index, start, size, result)
+        
+        if failures:
+            raise RuntimeError(f"Listing incomplete, {len(failures)} page(s) failed: " + "; ".join(failures))
+        
+        return pages
+    
+    def get_manufacturer_mapping(self) -> Dict[str, str]:
+        """Manufacturer IDs and names from the listing page's manufacturer filter"""
+        try:
+            response = self._http_get(self.base_url, timeout=10)
+            response.raise_for_status()
+        except Exception as e:
+            print(f" WARNING: Could not read the manufacturer list ({e})")
+            return {}
+        
+        soup = BeautifulSoup(response.text, 'html.parser')
+        select = soup.find('select', attrs={'name': 'my_manufacturer'}) or soup.find('select', id='my_manufacturer')
+        if select is None:
+            return {}
+        return {option.get('value'): option.get_text(strip=True) for option in select.find_all('option')
+                if option.get('value') not in (None, '', '0')}
+    
+    def listing_partitions(self, food_group_mapping: Dict[str, str], groups: Optional[List[str]] = None,
+                           manufacturers: Optional[List[str]] = None) -> Optional[List[Dict[str, str]]]:
+        """Listing filters: the selected groups or manufacturers, every known group, or None for one scan"""
+        if manufacturers:
+            if not self.profile.manufacturer_filter:
+                raise ValueError(f"{self.profile.name} has no manufacturer filter")
+            known = self.get_manufacturer_mapping()
+            unknown = [m for m in manufacturers if known and m not in known]
+            if unknown:
+                print(f" WARNING: Manufacturer IDs not offered by the site: {', '.join(unknown)}")
+            return [{'my_manufacturer': m} for m in manufacturers]
+        if groups:
+            unknown = [g for g in groups if g not in food_group_mapping]
+            if unknown:
+                print(f" WARNING: Food group IDs not offered by the site: {', '.join(unknown)}")
+            return [{'my_food_group': g} for g in groups]
+        if self.listing_partitioned and len(food_group_mapping) > 1:
+            return [{'my_food_group': g} for g in food_group_mapping]
+        return None
+    
+    def _reconcile_listing(self, seen: set, food_group_mapping: Dict[str, str], targeted: bool,
+                           page_size: int = 100) -> List[Dict[str, str]]:
+        """Foods the partitions missed, from a full scan when they add up to less than recordsTotal
+        
+        Rows whose group is missing from the filter list (or that the filter
+        drops) only show up in the unfiltered listing.
+        """
+        total = self.listing_global_total
+        if targeted or total is None or len(seen) >= total:
+            if not targeted and total is not None and len(self.listing_counts) > 1:
+                print(f"  Partitions reconciled: {len(seen)} unique foods, site total {total}")
+            return []
+        
+        print(f"  WARNING: Partitions returned {len(seen)} of {total} foods, listing the rest from a full scan")
+        partition_counts = self.listing_counts
+        pages = asyncio.run(self._fetch_listing_pages(page_size))
+        self.listing_counts = partition_counts
+        missing = []
+        for key in sorted(pages):
+            for food_item in self._parse_listing_rows(pages[key], food_group_mapping):
+                if food_item['ndb_no'] not in seen:
+                    seen.add(food_item['ndb_no'])
+                    missing.append(food_item)
+        print(f"  Filled in {len(missing)} foods the partitions missed")
+        self.listing_total = len(seen)
+        return missing
+    
+    def iter_food_items(self, groups: Optional[List[str]] = None,
+                        manufacturers: Optional[List[str]] = None) -> Iterator[Dict[str, str]]:
+        """Yield foods from the AJAX endpoint page by page, as the listing arrives
+        
+        The listing runs on its own thread, so detail scraping can start with the
+        first page. It is split by food group (or the selected groups or
+        manufacturers) and the partitions are fetched in parallel. Rows repeated
+        across pages or partitions are dropped. If a page fails, the error is
+        raised after everything that did arrive has been yielded.
+        """
+        print(" Streaming food list from AJAX endpoint...")
+        food_group_mapping = self.get_food_group_mapping()
+        partitions = self.listing_partitions(food_group_mapping, groups, manufacturers)
+        if partitions:
+            print(f" Listing {len(partitions)} partitions in parallel")
+        
+        # Bounded, so a stalled consumer holds the listing back
+        pages = queue.Queue(maxsize=2 * self.listing_concurrency)
+        
+        async def put_page(label: str, page: Dict[str, Any]) -> None:
+            # Block in an executor thread rather than the event loop
+            await asyncio.get_running_loop().run_in_executor(None, pages.put, (label, page))
+        
+        def run_listing() -> None:
+            try:
+                asyncio.run(self._fetch_listing_pages(100, on_page=put_page, partitions=partitions))
+                pages.put((None, None))
+            except Exception as e:
+                pages.put((None, e))
+        
+        threading.Thread(target=run_listing, name=f"listing-{self.profile.key}", daemon=True).start()
+        
+        seen = set()
+        duplicates = 0
+        while True:
+            label, page = pages.get()
+            if label is None:
+                break
+            
+            food_items = self._parse_listing_rows(page, food_group_mapping)
+            print(f"  {label}: {len(food_items)} items")
+            for food_item in food_items:
+                if food_item['ndb_no'] in seen:
+                    duplicates += 1
+                    continue
+                seen.add(food_item['ndb_no'])
+                yield food_item
+        
+        if duplicates:
+            print(f"  Skipped {duplicates} duplicate rows")
+        if page is not None:
+            print(f"ERROR: Error fetching food list: {page}")
+            raise page
+        yield from self._reconcile_listing(seen, food_group_mapping, targeted=bool(groups or manufacturers))
+        print(f"SUCCESS: Retrieved {len(seen)} total food items")
+    
+    def get_all_food_items(self, groups: Optional[List[str]] = None,
+                           manufacturers: Optional[List[str]] = None) -> List[Dict[str, str]]:
+        """Get complete food list from AJAX endpoint, or the selected groups or manufacturers"""
+        print(" Fetching complete food list from AJAX endpoint...")
+        
+        page_size = 100
+        
+        # Get food group mapping automatically from website
+        food_group_mapping = self.get_food_group_mapping()
+        partitions = self.listing_partitions(food_group_mapping, groups, manufacturers)
+        
+        try:
+            pages = asyncio.run(self._fetch_listing_pages(page_size, partitions=partitions))
+        except Exception as e:
+            print(f"ERROR: Error fetching food list: {e}")
+            raise
+        
+        # Reassemble in partition and offset order and drop rows repeated across pages
+        all_foods = []
+        seen = set()
+        duplicates = 0
+        for page_number, key in enumerate(sorted(pages), 1):
+            food_items = self._parse_listing_rows(pages[key], food_group_mapping)
+            print(f"  Page {page_number}: {len(food_items)} items")
+            
+            for food_item in food_items:
+                if food_item['ndb_no'] in seen:
+                    duplicates += 1
+                    continue
+                seen.add(food_item['ndb_no'])
+                all_foods.append(food_item)
+        
+        if duplicates:
+            print(f"  Skipped {duplicates} duplicate rows")
+        all_foods.extend(self._reconcile_listing(seen, food_group_mapping, targeted=bool(groups or manufacturers)))
+        
+        print(f"SUCCESS: Retrieved {len(all_foods)} total food items")
+        return all_foods
+    
+    def render_detail_page(self, detail_url: str) -> Optional[str]:
+        """Rendered DOM of a detail page from the browser (or the cache), None if it could not be loaded"""
+        # The rendered DOM is cached separately from the static page
+        render_key = ResponseCache.request_key('RENDER', detail_url)
+        if self.cache:
+            try:
+                cached = self.cache.get(render_key)
+            except CacheMiss as e:
+                print(f"    ERROR: Error loading page: {e}")
+                self._fail('http_error', e)
+                return None
+            if cached is not None:
+                self.last_payloads = self._cached_payloads(detail_url)
+                return cached['body'].decode('utf-8')
+        
+        self.last_payloads = None
+        render = self._backend_render if self.browser_backend is not None else self._selenium_render
+        page_source = render(detail_url)
+        if page_source is None:
+            return None
+        
+        if self.cache:
+            self.cache.put(render_key, page_source.encode('utf-8'))
+            if self.last_payloads:
+                self.cache.put(ResponseCache.request_key('PAYLOAD', detail_url),
+                               json.dumps(self.last_payloads).encode('utf-8'))
+        return page_source
+    
+    def _selenium_render(self, detail_url: str) -> Optional[str]:
+        """Rendered DOM from this engine's WebDriver, None on failure with last_failure set"""
+        try:
+            self._ensure_driver()
+            driver = self.driver
+            
+            # First page of the run measures what the render profile saves
+            with self.watchdog.guard(driver):
+                self.render_profile.calibrate(driver, detail_url, lambda: self.readiness.wait(driver))
+            
+            # Navigate to the detail page, the watchdog kills the browser if it stops responding
+            self.rate.acquire()
+            started = time.time()
+            with self.watchdog.guard(driver):
+                try:
+                    if self.extraction == 'payload':
+                        # Drop the calibration and previous page events
+                        driver.get_log('performance')
+                    driver.get(detail_url)
+                    
+                    # Wait until the table is rendered and its serving values have settled,
+                    # unless the data behind it has already arrived
+                    elapsed = self._wait_for_payload(driver, started) if self.extraction == 'payload' else None
+                    if elapsed is None:
+                        elapsed = self.readiness.wait(driver, started)
+                except Exception as e:
+                    self.rate.record_error('render', timeout=isinstance(e, TimeoutException))
+                    raise
+                self.rate.record_response('render', elapsed)
+                self.render_profile.record_page(driver)
+                
+                # Snapshot the rendered DOM once and parse it locally, instead of
+                # one WebDriver round trip per row and cell
+                page_source = driver.page_source
+        except Exception as e:
+            print(f"    ERROR: Error loading page: {e}")
+            # Calls into a killed browser fail with connection errors, not WebDriver ones
+            hung = self.driver is not None and self.watchdog.killed(self.driver)
+            self._fail('driver_crash' if hung else classify_exception(e), e)
+            return None
+        return page_source
+    
+    def _backend_render(self, detail_url: str) -> Optional[str]:
+        """Rendered DOM from the shared browser backend, paced and classified like Selenium pages"""
+        self.rate.acquire()
+        try:
+            page_source, self.last_payloads, elapsed = self.browser_backend.render(
+                detail_url, capture_payloads=self.extraction == 'payload')
+        except Exception as e:
+            print(f"    ERROR: Error loading page: {e}")
+            self.rate.record_error('render', timeout=isinstance(e, (TimeoutException, TimeoutError)))
+            # The backend starts a new browser on the next render, so a crash gets the usual retry
+            self._fail('driver_crash' if isinstance(e, BrowserCrashed) else classify_exception(e), e)
+            return None
+        self.rate.record_response('render', elapsed)
+        return page_source
+    
+    def close_backend(self) -> None:
+        """Shut down the browser backend, pool workers only borrow it"""
+        if self.browser_backend is not None:
+            self.browser_backend.close()
+    
+    def _cached_payloads(self, detail_url: str) -> Optional[List[str]]:
+        """XHR bodies recorded with a cached rendered page"""
+        if self.extraction != 'payload':
+            return None
+        try:
+            cached = self.cache.get(ResponseCache.request_key('PAYLOAD', detail_url))
+        except CacheMiss:
+            return None
+        return json.loads(cached['body']) if cached is not None else None
+    
+    def _wait_for_payload(self, driver, started: float, timeout: float = 3.0) -> Optional[float]:
+        """Poll briefly for nutrient data in the XHR responses or inline scripts, returns seconds
+        since started once found, None to fall back to the readiness wait
+        """
+        bodies = []
+        # Inline scripts are in the first HTML, one look is enough; later polls read new XHR bodies
+        inline = script_payloads(driver.page_source)
+        # A site that serves no payload is not waited on for every page
+        deadline = time.time() + (timeout if self.payload_misses < 5 else 0)
+        while True:
+            bodies.extend(network_bodies(driver))
+            if find_nutrient_data(json_payloads(bodies) + inline):
+                self.last_payloads = bodies
+                self.payload_misses = 0
+                return time.time() - started
+            if time.time() >= deadline:
+                self.last_payloads = bodies or None
+                self.payload_misses += 1
+                return None
+            time.sleep(0.25)
+    
+    def scrape_food_detail(self, detail_url: str, basic_info: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        """Scrape detailed food information using Selenium"""
+        page_source = self.render_detail_page(detail_url)
+        if page_source is None:
+            return None
+        
+        try:
+            return self.parse_detail_page(page_source, basic_info)
+        except Exception as e:
+            print(f"    ERROR: Error extracting nutrient table: {e}")
+            self._fail('parse_error', e)
+            return None
+    
+    def fetch_detail_response(self, detail_url: str, validators: Optional[Dict[str, Optional[str]]] = None,
+                              fresh: bool = False) -> Optional[requests.Response]:
+        """GET the static detail page, conditionally when validators carry an ETag/Last-Modified
+        
+        fresh bypasses the response cache. Returns the response (status 200 or
+        304), or None if the request failed.
+        """
+        headers = {}
+        if validators:
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+        
+        try:
+            response = self._http_get(detail_url, headers=headers, timeout=30, fresh=fresh)
+            if response.status_code != 304:
+                response.raise_for_status()
+            return response
+        except Exception as e:
+            print(f"    WARNING: HTTP fetch failed ({e})")
+            self._fail(classify_exception(e), e)
+            return None
+    
+    def fetch_detail_page(self, detail_url: str) -> Optional[str]:
+        """Download the static detail page HTML without a browser"""
+        response = self.fetch_detail_response(detail_url)
+        return response.text if response is not None else None
+    
+    @staticmethod
+    def _element_text(element) -> str:
+        """Visible text of an element, normalised the way Selenium's .text is"""
+        lines = []
+        for line in element.get_text('').split('\n'):
+            line = ' '.join(line.split())
+            if line:
+                lines.append(line)
+        return '\n'.join(lines)
+    
+    def _extract_metadata(self, soup: BeautifulSoup, page_source: str, page_url: str,
+                          food_data: Dict[str, Any]) -> None:
+        """Fill in the image, source and published date fields the profile has"""
+        fields = self.profile.fields
+        
+        # Extract image
+        if 'Image' in fields:
+            for img in soup.find_all('img'):
+                src = img.get('src')
+                if not src:
+                    continue
+                src = urljoin(page_url, src)
+                if 'uploads' in src and any(ext in src.lower() for ext in ['.jpg', '.jpeg', '.png', '.gif']):
+                    food_data['Image'] = src
+                    break
+        
+        # Extract source, from the Source row of the table or the IMR credit
+        if 'Source' in fields:
+            if self.profile.source_from == 'table_row':
+                for row in soup.find_all('tr'):
+                    cells = row.find_all('td')
+                    if len(cells) >= 3:
+                        header = self._element_text(cells[0]).strip()
+                        if header.lower() == 'source':
+                            source_text = self._element_text(cells[2]).strip()
+                            if source_text:
+                                food_data['Source'] = source_text
+                            break
+            elif 'Institute for Medical Research' in page_source:
+                food_data['Source'] = 'Institute for Medical Research, Malaysia'
+        
+        # Extract published date
+        if 'Published Date' in fields:
+            date_match = re.search(r'(\d{4}-\d{2}-\d{2})', page_source)
+            if date_match:
+                food_data['Published Date'] = date_match.group(1)
+    
+    def _new_food_data(self, soup: BeautifulSoup, page_source: str, basic_info: Dict[str, str]) -> Dict[str, Any]:
+        """Record with the listing fields and page metadata filled in and no nutrients yet"""
+        # Only the metadata fields this edition has
+        food_data = {
+            'NDB No': basic_info['ndb_no'],
+            'Description': basic_info['description'],
+            'Food Group': basic_info['food_group'],
+        }
+        food_data.update((field, '') for field in self.profile.fields)
+        food_data['Nutrient'] = []
+        self._extract_metadata(soup, page_source, basic_info.get('detail_url') or self.base_url, food_data)
+        return food_data
+    
+    @staticmethod
+    def _serving_key(header: str) -> str:
+        """Nutrient entry key for a serving-size column header"""
+        clean_header = re.sub(r'[^\w\s\[\]().]', '_', header)
+        return re.sub(r'\s+', '_', clean_header).strip()
+    
+    def _parse_detail_html(self, page_source: str, basic_info: Dict[str, str]) -> Tuple[Dict[str, Any], Dict[str, int]]:
+        """Parse a detail page into food_data plus counters describing how complete the table was"""
+        soup = BeautifulSoup(page_source, 'html.parser')
+        for br in soup.find_all('br'):
+            br.replace_with('\n')
+        
+        render_stats = {'table': 0, 'rows': 0, 'serving_headers': 0, 'serving_values': 0, 'row_errors': 0}
+        food_data = self._new_food_data(soup, page_source, basic_info)
+        
+        table = soup.find(id='tableDetailNutrient')
+        if table is None:
+            print("    ERROR: Error extracting nutrient table: tableDetailNutrient not found")
+            return food_data, render_stats
+        render_stats['table'] = 1
+        
+        # Get headers for serving sizes
+        headers = []
+        for cell in table.select('thead th'):
+            header_text = self._element_text(cell).strip()
+            header_text = re.sub(r'\n', ' ', header_text)
+            headers.append(header_text)
+        render_stats['serving_headers'] = len([h for h in headers[3:] if h.strip()])
+        
+        # Browsers insert <tbody> themselves, static markup may not have one
+        rows = table.select('tbody tr') or [
+            tr for tr in table.find_all('tr') if tr.find_parent('thead') is None
+        ]
+        
+        for row in rows:
+            try:
+                # Check if this is a category header row
+                row_style = row.get('style') or ''
+                row_html = row.decode_contents()
+                
+                if ('background-color:#f2f2f2' in row_style or 
+                    'background-color: rgb(242, 242, 242)' in row_style or
+                    'colspan' in row_html):
+                    
+                    # Extract category name
+                    category_cell = row.find('td')
+                    category_text = self._element_text(category_cell).strip() if category_cell else ''
+                    
+                    if category_text:
+                        food_data['Nutrient'].append({
+                            'category': category_text
+                        })
+                    continue
+                
+                # Process nutrient data rows
+                cells = row.find_all('td')
+                if len(cells) < 3:
+                    continue
+                
+                nutrient_name = self._element_text(cells[0]).strip()
+                if not nutrient_name:
+                    continue
+                
+                unit = self._element_text(cells[1]).strip()
+                value_100g = self._element_text(cells[2]).strip()
+                render_stats['rows'] += 1
+                
+                nutrient_entry = {
+                    'name': nutrient_name
+                }
+                
+                if unit and unit != '-':
+                    nutrient_entry['unit'] = unit
+                
+                if value_100g and value_100g != '-':
+                    # Check if this is per 100ml or per 100g
+                    if len(headers) > 2 and '100ml' in headers[2]:
+                        nutrient_entry['value_per_100ml'] = value_100g
+                    else:
+                        nutrient_entry['value_per_100g'] = value_100g
+                
+                # Extract serving size values
+                for i, cell in enumerate(cells[3:], 3):
+                    serving_value = self._element_text(cell).strip()
+                    if serving_value:
+                        render_stats['serving_values'] += 1
+                    if serving_value and serving_value != '-' and i < len(headers):
+                        header = headers[i].strip()
+                        if header:
+                            nutrient_entry[self._serving_key(header)] = serving_value
+                
+                food_data['Nutrient'].append(nutrient_entry)
+            
+            except Exception as e:
+                print(f"    WARNING: Error processing row: {e}")
+                render_stats['row_errors'] += 1
+                continue
+        
+        # A record with silently missing rows is worse than a retried one
+        if render_stats['row_errors']:
+            raise ValueError(f"{render_stats['row_errors']} nutrient row(s) could not be parsed")
+        
+        return food_data, render_stats
+    
+    def _parse_payload(self, page_source: str, basic_info: Dict[str, str],
+                       payloads: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """Build food_data from the nutrient data in XHR bodies or inline scripts, None when there is none"""
+        found = find_nutrient_data(json_payloads(payloads or []) + script_payloads(page_source))
+        if not found:
+            return None
+        soup = BeautifulSoup(page_source, 'html.parser')
+        food_data = self._new_food_data(soup, page_source, basic_info)
+        food_data['Nutrient'] = build_nutrients(*found, serving_key=self._serving_key)
+        food_data[EXTRACTION_KEY] = 'payload'
+        return food_data
+    
+    def parse_detail_page(self, page_source: str, basic_info: Dict[str, str],
+                          payloads: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Build the food_data dict from detail page HTML
+        
+        In payload extraction mode the page's data payload is tried first and the
+        record says which way it was read; payloads are captured XHR bodies.
+        """
+        if self.extraction == 'payload':
+            food_data = self._parse_payload(page_source, basic_info, payloads)
+            if food_data is not None:
+                return food_data
+        food_data, _ = self._parse_detail_html(page_source, basic_info)
+        if self.extraction == 'payload':
+            food_data[EXTRACTION_KEY] = 'dom'
+        return food_data
+    
+    @staticmethod
+    def _needs_browser(render_stats: Dict[str, int]) -> bool:
+        """True when the static HTML is missing values that only the page JavaScript fills in"""
+        if not render_stats['table'] or not render_stats['rows']:
+            return True
+        # Serving columns announced but left empty, or values present without their headers
+        if render_stats['serving_headers'] and not render_stats['serving_values']:
+            return True
+        if render_stats['serving_values'] and not render_stats['serving_headers']:
+            return True
+        return False
+    
+    def _parse_static(self, page_source: str, basic_info: Dict[str, str]) -> Tuple[Dict[str, Any], Dict[str, int]]:
+        """Parse a static page the way the configured extraction mode reads it, returns (food_data, render_stats)
+        
+        Fetching and change checks both go through here, so their fingerprints agree.
+        """
+        food_data = self._parse_payload(page_source, basic_info) if self.extraction == 'payload' else None
+        if food_data is not None:
+            # The data behind the table is complete without JavaScript running
+            return food_data, {'table': 1, 'rows': 1, 'serving_headers': 0, 'serving_values': 0}
+        food_data, render_stats = self._parse_detail_html(page_source, basic_info)
+        if self.extraction == 'payload':
+            food_data[EXTRACTION_KEY] = 'dom'
+        return food_data, render_stats
+    
+    def _scrape_static(self, detail_url: str,
+                       basic_info: Dict[str, str]) -> Tuple[Optional[Dict[str, Any]], bool, Optional[str]]:
+        """Fetch and parse the static page, returns (food_data with its fingerprint, needs_browser, page HTML)"""
+        response = self.fetch_detail_response(detail_url)
+        if response is None:
+            return None, True, None
+        
+        try:
+            food_data, render_stats = self._parse_static(response.text, basic_info)
+        except Exception as e:
+            print(f"    ERROR: Error parsing page: {e}")
+            self._fail('parse_error', e)
+            return None, True, None
+        
+        food_data[FINGERPRINT_KEY] = make_fingerprint(basic_info, food_data, response.headers)
+        return food_data, self._needs_browser(render_stats), response.text
+    
+    def scrape_food_detail_http(self, detail_url: str, basic_info: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        """Scrape detailed food information from the static HTML, without Selenium
+        
+        In 'auto' mode returns None when the page needs JavaScript so the caller
+        can fall back to the browser.
+        """
+        food_data, needs_browser, _ = self._scrape_static(detail_url, basic_info)
+        if food_data is not None and needs_browser:
+            if self.fetch_mode == 'auto':
+                return None
+            print(f"    WARNING: {basic_info['ndb_no']} has JavaScript-only values, static HTML may be incomplete")
+        return food_data
+    
+    def fetch_food_page(self, food_item: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        """Fetch stage: load one food with the configured backend, falling back to Selenium per item in 'auto' mode
+        
+        Static pages come back parsed as {'food_data': ..., 'page_source': ...}, since
+        parsing is what decides whether they need the browser. Rendered pages come back unparsed as
+        {'page_source': ..., 'fingerprint': ...}, so the browser can move on while
+        another thread parses. Returns None on failure, with last_failure set.
+        """
+        detail_url = food_item['detail_url']
+        self.last_failure = None
+        # Refresh runs hand over the fingerprint they already computed
+        fingerprint_block = food_item.get('fingerprint')
+        
+        if self.fetch_mode in ('http', 'auto'):
+            food_data, needs_browser, static_source = self._scrape_static(detail_url, food_item)
+            if food_data is not None:
+                if not needs_browser or self.fetch_mode == 'http':
+                    if needs_browser:
+                        print(f"    WARNING: {food_item['ndb_no']} has JavaScript-only values, static HTML may be incomplete")
+                    self.fetch_stats['http'] += 1
+                    return {'food_data': food_data, 'page_source': static_source}
+                # The Selenium record still carries the static page fingerprint
+                fingerprint_block = food_data[FINGERPRINT_KEY]
+            elif self.fetch_mode == 'http':
+                return None
+        
+        page_source = self.render_detail_page(detail_url)
+        if page_source is None and self._driver_crashed():
+            # The page was lost with the browser, not because of the page itself,
+            # so it gets one more go on a fresh driver before counting as failed
+            self.close_driver(broken=True)
+            self.watchdog.note_requeue()
+            self.last_failure = None
+            page_source = self.render_detail_page(detail_url)
+        
+        crashed = page_source is None and self._driver_crashed()
+        recycle = None
+        if page_source is not None and self.driver is not None:
+            recycle = self.watchdog.after_page(self.driver)
+            if recycle:
+                print(f"    Recycling browser ({recycle})")
+        if crashed or recycle or self.driver_pool is not None:
+            # Shared drivers go back to the pool after every page, crashed and worn ones are replaced
+            self.close_driver(broken=bool(crashed or recycle))
+        if page_source is None:
+            return None
+        
+        self.fetch_stats['selenium'] += 1
+        return {'page_source': page_source, 'fingerprint': fingerprint_block or make_fingerprint(food_item),
+                'payloads': self.last_payloads}
+    
+    def parse_food_page(self, food_item: Dict[str, str],
+                        fetched: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[Tuple[str, str]]]:
+        """Parse stage: turn fetch_food_page output into food_data, returns (food_data, failure)
+        
+        With an archive the page is kept before parsing, so pages the parser
+        gets wrong can be re-parsed once it is fixed.
+        """
+        if 'food_data' in fetched:
+            self._archive_page(food_item, fetched['page_source'], 'static', fetched['food_data'][FINGERPRINT_KEY])
+            return fetched['food_data'], None
+        
+        self._archive_page(food_item, fetched['page_source'], 'rendered', fetched['fingerprint'],
+                           fetched.get('payloads'))
+        
+        try:
+            food_data = self.parse_detail_page(fetched['page_source'], food_item, fetched.get('payloads'))
+        except Exception as e:
+            print(f"    ERROR: Error extracting nutrient table: {e}")
+            return None, ('parse_error', str(e))
+        food_data[FINGERPRINT_KEY] = fetched['fingerprint']
+        return food_data, None
+    
+    def _archive_page(self, food_item: Dict[str, str], page_source: Optional[str], kind: str,
+                      fingerprint: Optional[Dict[str, Any]], payloads: Optional[List[str]] = None) -> None:
+        """Keep one fetched page in the archive, a full disk only costs the archive copy"""
+        if self.archive is None or page_source is None:
+            return
+        try:
+            self.archive.put(food_item, page_source, kind, fingerprint, payloads, self.extraction)
+        except OSError as e:
+            print(f"    WARNING: Could not archive {food_item['ndb_no']}: {e}")
+    
+    @staticmethod
+    def validate_food_data(food_item: Dict[str, str], food_data: Dict[str, Any]) -> Optional[str]:
+        """Validate stage: why food_data should not be saved, None when it is a usable record"""
+        if food_data.get('NDB No') != food_item['ndb_no']:
+            return f"record is for {food_data.get('NDB No')!r}, not {food_item['ndb_no']!r}"
+        nutrients = food_data.get('Nutrient')
+        if not isinstance(nutrients, list):
+            return "Nutrient is not a list"
+        if not any(n.get('name') for n in nutrients):
+            return "no nutrient rows"
+        return None
+    
+    def fetch_food_detail(self, food_item: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        """Fetch, parse and validate one food on the calling thread"""
+        fetched = self.fetch_food_page(food_item)
+        if fetched is None:
+            return None
+        
+        food_data, failure = self.parse_food_page(food_item, fetched)
+        if food_data is not None:
+            problem = self.validate_food_data(food_item, food_data)
+            if problem:
+                print(f"    ERROR: Invalid record for {food_item['ndb_no']}: {problem}")
+                food_data, failure = None, ('parse_error', problem)
+        if failure:
+            self.last_failure = failure
+        return food_data
+    
+    def check_food_changed(self, food_item: Dict[str, str]) -> Optional[Dict[str, str]]:
+        """Cheap HTTP check of one food, returns it (with its new fingerprint) if new or changed, None if unchanged
+        
+        Uses a conditional GET when the saved record has an ETag/Last-Modified,
+        otherwise compares the listing row and static page fingerprints.
+        """
+        saved = self.record_store.load(food_item['ndb_no'])
+        old = saved.get(FINGERPRINT_KEY) if isinstance(saved, dict) else None
+        if not old:
+            # New food, or saved before records carried fingerprints
+            return food_item
+        
+        # A cached copy would answer "unchanged" for the whole cache TTL
+        response = self.fetch_detail_response(food_item['detail_url'], old, fresh=True)
+        if response is None:
+            return food_item
+        
+        if response.status_code == 304 and old.get('listing') == listing_fingerprint(food_item):
+            return None
+        
+        try:
+            static_data, _ = self._parse_static(response.text, food_item)
+        except Exception as e:
+            print(f"    WARNING: Could not parse {food_item['ndb_no']} for change check ({e})")
+            return food_item
+        
+        new = make_fingerprint(food_item, static_data, response.headers)
+        if is_unchanged(old, new):
+            return None
+        return dict(food_item, fingerprint=new)
+    
+    def find_changed_foods(self, food_list: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """Cheap HTTP pass over food_list, returns the foods that are new or changed since saved"""
+        changed = []
+        for i, food_item in enumerate(food_list, 1):
+            if i % 100 == 0:
+                print(f"  Checked {i}/{len(food_list)}...")
+            food_item = self.check_food_changed(food_item)
+            if food_item is not None:
+                changed.append(food_item)
+        
+        print(f" Refresh check: {len(changed)} new or changed, {len(food_list) - len(changed)} unchanged")
+        return changed
+    
+    @property
+    def record_store(self):
+        """Where records are saved, opened on first use so pool workers never open one"""
+        if self.store is None:
+            self.store = open_record_store(self.store_format, self.output_dir)
+        return self.store
+    
+    def save_food_data(self, food_data: Dict[str, Any]) -> bool:
+        """Save food data to the record store, returns True when it was written"""
+        try:
+            self.record_store.write(food_data)
+            return True
+        
+        except Exception as e:
+            print(f"    ERROR: Error saving data: {e}")
+            return False
+    
+    def has_valid_record(self, ndb_no: str) -> bool:
+        """True when the food's record is saved, parses and belongs to this NDB"""
+        return is_valid_record(self.record_store.load(ndb_no), ndb_no)
+    
+    def _show_progress(self, i: int, total: Optional[int], food_item: Dict[str, str]) -> None:
+        """Print the progress line for item i of total (None while the listing is still streaming)"""
+        # Show progress
+        if i <= self.profile.progress_first or i % self.profile.progress_every == 0 or i == total:
+            print(f"\nProcessing {i}/{total or '?'}: {food_item['ndb_no']} - {food_item['description']}")
+            if total:
+                print(f"   Progress: {min(i/total, 1)*100:.1f}% complete")
+    
+    def _handle_result(self, i: int, food_item: Dict[str, str], food_data: Optional[Dict[str, Any]],
+                       failure: Optional[Tuple[str, str]] = None) -> bool:
+        """Save one scraped food and report it, returns True on success
+        
+        Failures are classified and queued for a deferred retry.
+        """
+        if not food_data:
+            kind, error = failure or ('parse_error', 'no data extracted')
+            if self.profile.report_all_failures or i <= self.profile.progress_first:
+                print(f"    ERROR: Failed to process {food_item['ndb_no']} ({kind})")
+            if self.manifest:
+                self.manifest.record(food_item['ndb_no'], 'failed', error=f"{kind}: {error}")
+            if self.retry_queue is not None and not self.retry_queue.add(food_item, kind, error):
+                print(f"    ERROR: Giving up on {food_item['ndb_no']} after {self.retry_queue.max_attempts} attempts")
+            return False
+        
+        if not self.save_food_data(food_data):
+            if self.manifest:
+                self.manifest.record(food_item['ndb_no'], 'failed', error='save failed')
+            return False
+        if self.manifest:
+            self.manifest.record(food_item['ndb_no'], 'done')
+        if self.retry_queue is not None:
+            self.retry_queue.resolve(food_item['ndb_no'])
+        
+        # Show category/nutrient count for first few items
+        if i <= self.profile.progress_first:
+            categories = [n.get('category') for n in food_data['Nutrient'] if n.get('category')]
+            nutrient_count = len([n for n in food_data['Nutrient'] if n.get('name')])
+            print(f"    SUCCESS: Categories: {len(set(categories))}, Nutrients: {nutrient_count}")
+        return True
+    
+    def _spawn_worker(self) -> 'ScraperEngine':
+        """A fetch worker of this engine's own class, so subclass overrides apply to every page
+        
+        Edition subclasses bind the profile in their __init__, so the worker is
+        set up by ScraperEngine.__init__ directly; a subclass with state of its
+        own overrides this method. Workers share the session, cache, rate
+        controller, drivers and per-site trackers.
+        """
+        worker = type(self).__new__(type(self))
+        ScraperEngine.__init__(worker, self.profile, output_dir=self.output_dir, fetch_mode=self.fetch_mode,
+                               cache=self.cache, session=self.session, rate=self.rate,
+                               driver_pool=self.driver_pool, driver_provider=self.driver_provider,
+                               watchdog=self.watchdog, extraction=self.extraction)
+        # Shared trackers, so timeouts and byte counts cover every worker's pages
+        worker.readiness = self.readiness
+        worker.render_profile = self.render_profile
+        worker.bridge = self.bridge
+        worker.browser_backend = self.browser_backend
+        return worker
+    
+    def _scrape_pipeline(self, food_source: Iterator[Dict[str, str]], workers: int,
+                         expected_total=lambda: None, on_result=None) -> int:
+        """Stream food_source through the fetch, parse, validate and write stages, returns the success count
+        
+        Each fetch worker owns a driver (or borrows one from the shared pool) and
+        only loads pages; parsing, validation and saving run on their own threads
+        so the browsers never wait on BeautifulSoup or the disk. Saving stays on a
+        single thread, so output is the same as a serial run. on_result(food_item,
+        saved, failure) is called from the write stage after each food.
+        """
+        pool = [self._spawn_worker() for _ in range(workers)]
+        self.rate.set_max_workers(len(pool))
+        written = {'done': 0, 'successful': 0}
+        
+        def fetcher(worker: 'ScraperEngine'):
+            def fetch(food_item):
+                fetched = worker.fetch_food_page(food_item)
+                return food_item, fetched, worker.last_failure
+            return fetch
+        
+        def parse(item):
+            food_item, fetched, failure = item
+            if fetched is None:
+                return item
+            food_data, failure = self.parse_food_page(food_item, fetched)
+            return food_item, food_data, failure
+        
+        def validate(item):
+            food_item, food_data, failure = item
+            if food_data is not None:
+                problem = self.validate_food_data(food_item, food_data)
+                if problem:
+                    print(f"    ERROR: Invalid record for {food_item['ndb_no']}: {problem}")
+                    return food_item, None, ('parse_error', problem)
+            return item
+        
+        def write(item):
+            food_item, food_data, failure = item
+            written['done'] += 1
+            self._show_progress(written['done'], expected_total(), food_item)
+            saved = self._handle_result(written['done'], food_item, food_data, failure)
+            if saved:
+                written['successful'] += 1
+                if food_data.get(EXTRACTION_KEY):
+                    self.extraction_stats[food_data[EXTRACTION_KEY]] += 1
+            if on_result is not None:
+                on_result(food_item, saved, failure)
+            return DROP
+        
+        def recover(stage: str, item, error: Exception):
+            # A stage that raises must not lose the food: it is written out as a failure,
+            # so it reaches the manifest and the retry queue like any other
+            food_item = item if stage == 'fetch' else item[0]
+            failure = (classify_exception(error) if stage == 'fetch' else 'parse_error', str(error))
+            if stage != 'write':
+                return food_item, None, failure
+            self._handle_result(written['done'], food_item, None, failure)
+            if on_result is not None:
+                on_result(food_item, False, failure)
+            return DROP
+        
+        size = self.pipeline_queue_size
+        pipeline = (Pipeline(name=self.profile.key, on_error=recover)
+                    # Workers above the controller's target take no new foods while the site is slow
+                    .add_stage('fetch', [fetcher(worker) for worker in pool], maxsize=size,
+                               gate=self.rate.worker_active)
+                    .add_stage('parse', [parse] * self.parse_threads, maxsize=size)
+                    .add_stage('validate', [validate], maxsize=size)
+                    .add_stage('write', [write], maxsize=size))
+        try:
+            pipeline.run(food_source)
+        finally:
+            for worker in pool:
+                worker.close_driver()
+                for backend, count in worker.fetch_stats.items():
+                    self.fetch_stats[backend] += count
+            print(f" {pipeline.summary()}")
+        
+        return written['successful']
+    
+    def _select_foods(self, source, streamed: bool, max_items: Optional[int], resume: bool,
+                      refresh: bool, counts: Dict[str, int]) -> Iterator[Dict[str, str]]:
+        """Listing stage: filter foods as they are listed and yield the ones to scrape
+        
+        A streamed listing is saved to the manifest once it is complete. A shard
+        keeps the whole listing there too, so a merge can find gaps.
+        """
+        listing = []
+        for food_item in source:
+            listing.append(food_item)
+            counts['listed'] += 1
+            if max_items and counts['listed'] > max_items:
+                # Keep reading, so the manifest still gets the whole listing
+                continue
+            
+            ndb_no = food_item['ndb_no']
+            if self.shard and shard_of(ndb_no, self.shard[1]) != self.shard[0]:
+                # Another shard owns this food
+                counts['other_shards'] += 1
+                continue
+            
+            if resume and self.has_valid_record(ndb_no):
+                # Skip foods whose JSON is already on disk and valid
+                if self.manifest.status(ndb_no) != 'done':
+                    self.manifest.record(ndb_no, 'done', attempted=False)
+                counts['skipped'] += 1
+                continue
+            
+            if refresh:
+                # Only foods whose fingerprint changed go through the full scrape
+                changed = self.check_food_changed(food_item)
+                if changed is None:
+                    self.manifest.record(ndb_no, 'done', attempted=False)
+                    counts['unchanged'] += 1
+                    continue
+                food_item = changed
+            
+            counts['queued'] += 1
+            yield food_item
+        
+        if streamed:
+            self.manifest.set_listing(listing, self.base_url)
+            self.manifest.save()
+    
+    def _drain_retry_queue(self, max_wait: float) -> int:
+        """Retry queued failures as their backoff elapses, returns how many were recovered
+        
+        Stops when the queue is empty or the next retry would start after max_wait;
+        whatever is left stays in the queue file for the next run.
+        """
+        deadline = time.time() + max_wait
+        recovered = 0
+        
+        while len(self.retry_queue):
+            wait = self.retry_queue.next_due_in()
+            if time.time() + wait > deadline:
+                print(f" {len(self.retry_queue)} foods left in {RETRY_QUEUE_FILE} for the next run")
+                break
+            if wait > 0:
+                print(f"\n Waiting {wait:.0f}s before retrying {len(self.retry_queue)} failed foods...")
+                time.sleep(wait)
+            
+            for entry in self.retry_queue.due():
+                food_item = entry['food_item']
+                print(f"\n Retry {entry['attempts']}: {food_item['ndb_no']} - {food_item['description']} "
+                      f"(last failure: {entry['kind']})")
+                food_data = self.fetch_food_detail(food_item)
+                if self._handle_result(entry['attempts'] + 1, food_item, food_data, self.last_failure):
+                    recovered += 1
+        
+        return recovered
+    
+    def scrape_all_foods(self, max_items: Optional[int] = None, workers: int = 1, resume: bool = False,
+                         refresh: bool = False, retry_attempts: int = 4, retry_wait: float = 600.0,
+                         mirror_images: bool = False, groups: Optional[List[str]] = None,
+                         manufacturers: Optional[List[str]] = None) -> None:
+        """Scrape all food data with improved structure
+        
+        mirror_images downloads the records' product images once the scrape is done.
+        groups or manufacturers limit a new listing to those food group or manufacturer IDs.
+        """
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        if manufacturers and not self.profile.manufacturer_filter:
+            raise ValueError(f"{self.profile.name} has no manufacturer filter")
+        
+        own_pool = None
+        try:
+            print(f" Starting production Selenium scraper for {self.profile.name}...")
+            print(" Extracting categories and actual calculated values")
+            print(f" Fetch mode: {self.fetch_mode}")
+            if self.offline:
+                print(" Replaying from the response cache, no network requests")
+            
+            if self.browser_backend is not None and self.fetch_mode == 'selenium':
+                print(f" Browser: {self.browser}, {workers} isolated contexts in one browser")
+                self.browser_backend.prewarm()
+            elif self.driver_pool is None and self.fetch_mode == 'selenium' and not self.offline:
+                # Start the browsers in the background while the listing is fetched
+                own_pool = self.driver_pool = DriverPool(self.create_driver, size=workers, key=self.profile.key,
+                                                             watchdog=self.watchdog)
+                own_pool.prewarm(workers)
+            
+            # Resume from the saved listing, or stream the listing and start a new manifest
+            manifest_path = os.path.join(self.output_dir, MANIFEST_FILE)
+            self.manifest = RunManifest.load(manifest_path) if resume else None
+            
+            if self.manifest and self.manifest.listing:
+                source = self.manifest.listing
+                streamed = False
+                print(f" Resuming from {MANIFEST_FILE}: {len(source)} foods in saved listing")
+                if groups or manufacturers:
+                    print(" The saved listing is used as is, group and manufacturer filters apply to new listings")
+            else:
+                if resume:
+                    print(f" No usable {MANIFEST_FILE} found, starting a new run")
+                # Detail scraping starts as soon as the first listing page arrives
+                source = self.iter_food_items(groups=groups, manufacturers=manufacturers)
+                streamed = True
+                self.manifest = RunManifest(manifest_path)
+            
+            # Failures from earlier runs are retried along with this run's
+            self.retry_queue = RetryQueue.load(os.path.join(self.output_dir, RETRY_QUEUE_FILE),
+                                               max_attempts=retry_attempts)
+            if len(self.retry_queue):
+                print(f" {len(self.retry_queue)} foods queued for retry from an earlier run")
+            
+            if self.shard:
+                print(f" Shard {self.shard[0]}/{self.shard[1]}: scraping the foods whose NDB hashes to this shard")
+                self.manifest.data['shard'] = f"{self.shard[0]}/{self.shard[1]}"
+            if max_items:
+                print(f" Limiting to {max_items} items for testing")
+            if refresh:
+                print(" Refresh: checking static pages for changes as foods are listed...")
+            if workers > 1:
+                # Each worker owns a driver and pulls foods from the fetch queue
+                print(f" Using {workers} parallel workers")
+            
+            counts = {'listed': 0, 'other_shards': 0, 'skipped': 0, 'unchanged': 0, 'queued': 0}
+            
+            def expected_total() -> Optional[int]:
+                # Shrinks towards the real count as skipped foods are found
+                total = self.listing_total if streamed else len(source)
+                if total is None:
+                    return None
+                if max_items:
+                    total = min(total, max_items)
+                if self.shard:
+                    # Shards get an even share, the estimate firms up as the listing is read
+                    seen = min(counts['listed'], max_items or counts['listed'])
+                    total = seen - counts['other_shards'] + (total - seen) // self.shard[1]
+                return total - counts['skipped'] - counts['unchanged']
+            
+            foods = self._select_foods(source, streamed, max_items, resume, refresh, counts)
+            successful_count = self._scrape_pipeline(foods, workers, expected_total)
+            
+            if not counts['listed']:
+                print("ERROR: No food items found")
+                return
+            if self.shard:
+                owned = counts['queued'] + counts['skipped'] + counts['unchanged']
+                print(f" Shard {self.shard[0]}/{self.shard[1]}: {owned} foods, {counts['other_shards']} left to other shards")
+            if resume:
+                print(f" Already scraped: {counts['skipped']} foods")
+            if refresh:
+                print(f" Refresh check: {counts['queued']} new or changed, {counts['unchanged']} unchanged")
+            if not counts['queued']:
+                print(" Nothing changed since the last run" if refresh else " Nothing left to scrape")
+            
+            # Second chance for transient failures, with exponential backoff
+            recovered = self._drain_retry_queue(retry_wait) if len(self.retry_queue) else 0
+            
+            print(f"\n Production scraping completed for {self.profile.name}!")
+            print(f" Successfully processed: {successful_count}/{counts['queued']} foods")
+            if recovered:
+                print(f" Recovered on retry: {recovered} foods")
+            print(f" Backends used: {self.fetch_stats['http']} via HTTP, "
+                  f"{self.fetch_stats['selenium']} via {'Playwright' if self.browser_backend else 'Selenium'}")
+            if self.extraction == 'payload':
+                print(f" Extraction: {self.extraction_stats['payload']} from the page data payload, "
+                      f"{self.extraction_stats['dom']} from the DOM table")
+            print(f" {self.readiness.summary()}")
+            if self.fetch_stats['selenium']:
+                print(f" {self.render_profile.summary()}")
+            if self.browser_backend is not None:
+                print(f" {self.browser_backend.summary()}")
+            elif self.fetch_stats['selenium'] or self.watchdog.hangs:
+                print(f" {self.watchdog.summary()}")
+            if self.driver_provider.startup_times:
+                print(f" {self.driver_provider.summary()}")
+                if own_pool is not None and own_pool.prewarmed:
+                    print(f" {own_pool.prewarmed} browsers pre-warmed while listing")
+            print(f" {self.rate.summary()}")
+            if self.cache:
+                print(f" {self.cache.summary()}")
+            if self.archive:
+                print(f" {self.archive.summary()}")
+            if self.bridge:
+                print(f" {self.bridge.summary()}")
+            if self.store_format == 'ndjson':
+                print(f" Records saved to: {os.path.join(self.output_dir, RECORDS_FILE)}")
+            else:
+                print(f" Files saved to: {self.output_dir}")
+            
+            if mirror_images:
+                self.mirror_images()
+        
+        except Exception as e:
+            print(f" Fatal error: {e}")
+            raise
+        finally:
+            self.close_driver()
+            self.close_backend()
+            if own_pool is not None:
+                own_pool.close()
+                self.driver_pool = None
+            # Records are on disk before the manifest says they are done
+            if self.store is not None:
+                self.store.close()
+            if self.manifest:
+                self.manifest.save()
+            if self.retry_queue is not None:
+                self.retry_queue.save()
+                counts = self.retry_queue.write_report(os.path.join(self.output_dir, FAILURE_REPORT_FILE))
+                if counts:
+                    summary = ", ".join(f"{count} {kind}" for kind, count in sorted(counts.items()))
+                    print(f" Failures: {summary} (see {FAILURE_REPORT_FILE})")
+    
+    def mirror_images(self) -> Optional[Dict[str, int]]:
+        """Asset stage: mirror every saved record's image, returns the mirror counts"""
+        if 'Image' not in self.profile.fields:
+            print(f" {self.profile.name} pages have no product images, nothing to mirror")
+            return None
+        if self.offline:
+            print(" Replay mode, skipping the image mirror")
+            return None
+        if self.store is not None:
+            # The mirror reads records back from disk
+            self.store.flush()
+        
+        print(f"\n Mirroring product images ({self.image_concurrency} connections)...")
+        mirror = ImageMirror(self.output_dir, concurrency=self.image_concurrency, thumb_size=self.thumb_size,
+                             rate=self.rate, headers={'User-Agent': self.session.headers['User-Agent']})
+        counts = mirror.run()
+        print(f" {mirror.summary()}")
+        print(f" {counts['mirrored']}/{counts['foods']} foods mapped in {IMAGE_MANIFEST_FILE}")
+        return counts
+    
+    def reparse_archive(self, processes: Optional[int] = None, extraction: Optional[str] = None) -> Dict[str, Any]:
+        """Rebuild the records from the newest archived page of each food, without network or browser
+        
+        Parsing is spread over processes (one per CPU by default); foods with no
+        archived page keep their saved record. Pages are read with the extraction
+        mode they were scraped with, or extraction for all. Returns the reparse counts.
+        """
+        if self.archive is None:
+            raise ValueError("No archive configured, create the engine with archive=True")
+        
+        print(f" Re-parsing {self.archive.dir} into {self.output_dir} ({processes or os.cpu_count()} processes)...")
+        counts = reparse_archive(self.archive, self.record_store, self.output_dir, processes=processes,
+                                 extraction=extraction)
+        self.store = None
+        print(f" Rebuilt {counts['written']}/{counts['pages']} records in {counts['seconds']:.1f}s, "
+              f"{counts['failed']} failed")
+        for ndb_no, error in sorted(counts['errors'].items())[:10]:
+            print(f"   {ndb_no}: {error}")
+        return counts
+    
+    def scrape_from_queue(self, work_queue: WorkQueue, workers: int = 1, max_items: Optional[int] = None,
+                          worker_id: Optional[str] = None, visibility: float = 300.0, prefetch: int = 2) -> int:
+        """Scrape foods leased from a shared work queue until it is drained, returns the success count
+        
+        Any number of processes can work the same queue and join or leave
+        mid-run. This one holds at most workers + prefetch leases, kept alive by
+        a heartbeat thread while pages load; saved foods are acked and failures
+        nacked, so another worker (or this one, after the backoff) retries them.
+        The queue takes the place of the run manifest and retry queue.
+        """
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        if self.store_format == 'ndjson':
+            raise ValueError("records.ndjson has a single writer, use the files store with a work queue")
+        worker_id = worker_id or default_worker_id()
+        
+        held = set()
+        held_lock = threading.Lock()
+        slots = threading.Semaphore(workers + prefetch)
+        stop = threading.Event()
+        stats = {'leased': 0, 'acked': 0, 'requeued': 0, 'failed': 0, 'lost': 0}
+        
+        def leased_foods() -> Iterator[Dict[str, str]]:
+            # Lease one food per free slot, wait while other workers still hold the rest
+            while not stop.is_set():
+                if max_items and stats['leased'] >= max_items:
+                    return
+                slots.acquire()
+                leased = work_queue.lease(worker_id, 1, visibility)
+                if not leased:
+                    slots.release()
+                    counts = work_queue.status()
+                    if not counts['pending'] and not counts['leased']:
+                        return
+                    stop.wait(min(work_queue.next_due_in() or 1.0, 5.0))
+                    continue
+                with held_lock:
+                    held.add(leased[0]['ndb_no'])
+                stats['leased'] += 1
+                yield leased[0]
+        
+        def heartbeat() -> None:
+            while not stop.wait(visibility / 3):
+                with held_lock:
+                    current = list(held)
+                work_queue.heartbeat(worker_id, current, visibility)
+        
+        def settle(food_item: Dict[str, str], saved: bool, failure: Optional[Tuple[str, str]]) -> None:
+            ndb_no = food_item['ndb_no']
+            with held_lock:
+                held.discard(ndb_no)
+            slots.release()
+            if saved:
+                stats['acked'] += 1
+                if not work_queue.ack(worker_id, ndb_no):
+                    # The lease expired mid-page; the record is saved, another worker may redo it
+                    stats['lost'] += 1
+                return
+            kind, error = failure or ('parse_error', 'no data extracted')
+            status = work_queue.nack(worker_id, ndb_no, f"{kind}: {error}")
+            if status == 'pending':
+                stats['requeued'] += 1
+            elif status == 'failed':
+                stats['failed'] += 1
+                print(f"    ERROR: Giving up on {ndb_no} after {work_queue.max_attempts} attempts")
+            else:
+                stats['lost'] += 1
+        
+        own_pool = None
+        beat = threading.Thread(target=heartbeat, name=f"{self.profile.key}-heartbeat", daemon=True)
+        try:
+            print(f" Working queue {work_queue.path} as {worker_id}")
+            print(f" Fetch mode: {self.fetch_mode}")
+            counts = work_queue.status()
+            print(f" Queue: {counts['pending']} pending, {counts['leased']} leased, "
+                  f"{counts['done']} done, {counts['failed']} failed")
+            
+            if self.browser_backend is not None and self.fetch_mode == 'selenium':
+                self.browser_backend.prewarm()
+            elif self.driver_pool is None and self.fetch_mode == 'selenium' and not self.offline:
+                own_pool = self.driver_pool = DriverPool(self.create_driver, size=workers, key=self.profile.key,
+                                                             watchdog=self.watchdog)
+                own_pool.prewarm(workers)
+            
+            beat.start()
+            successful_count = self._scrape_pipeline(leased_foods(), workers, on_result=settle)
+            
+            counts = work_queue.status()
+            print(f"\n Queue worker {worker_id} finished for {self.profile.name}!")
+            print(f" This worker: {stats['leased']} leased, {successful_count} saved, {stats['requeued']} requeued, "
+                  f"{stats['failed']} given up, {stats['lost']} leases lost to expiry")
+            print(f" Queue: {counts['pending']} pending, {counts['leased']} leased, "
+                  f"{counts['done']} done, {counts['failed']} failed")
+            print(f" Backends used: {self.fetch_stats['http']} via HTTP, "
+                  f"{self.fetch_stats['selenium']} via {'Playwright' if self.browser_backend else 'Selenium'}")
+            if self.browser_backend is not None:
+                print(f" {self.browser_backend.summary()}")
+            elif self.fetch_stats['selenium'] or self.watchdog.hangs:
+                print(f" {self.watchdog.summary()}")
+            print(f" {self.rate.summary()}")
+            return successful_count
+        
+        finally:
+            stop.set()
+            self.close_driver()
+            self.close_backend()
+            if own_pool is not None:
+                own_pool.close()
+                self.driver_pool = None
+            if self.store is not None:
+                self.store.close()
+            # Leases still in the pipeline after Ctrl+C go straight back to pending
+            with held_lock:
+                unfinished = list(held)
+            if unfinished:
+                work_queue.release(worker_id, unfinished)
+    
+    def refresh_daemon(self, budget: float = 120.0, deadline: Optional[float] = None,
+                       relist_every: float = 24 * 3600, min_interval: float = 6 * 3600,
+                       max_checks: Optional[int] = None,
+                       groups: Optional[List[str]] = None, manufacturers: Optional[List[str]] = None,
+                       stop: Optional[threading.Event] = None) -> Dict[str, int]:
+        """Keep the records fresh for as long as it runs, returns the check counts
+        
+        Instead of sweeping the listing in order, each step takes the food most
+        likely to have changed according to run_refresh_schedule.json (new foods
+        first, then by change history and Published Date), checks it with the
+        cheap static request and re-scrapes it only when it changed. Requests are
+        spread evenly at budget per hour, counting only those actually sent (a
+        new food needs no check request, a re-scrape is one more).
+        deadline is an epoch time after which no new check starts; the listing is
+        re-read every relist_every seconds to pick up new and removed foods, and
+        no food is checked twice within min_interval seconds.
+        """
+        if budget <= 0:
+            raise ValueError("budget must be a positive number of requests per hour")
+        if manufacturers and not self.profile.manufacturer_filter:
+            raise ValueError(f"{self.profile.name} has no manufacturer filter")
+        stop = stop or threading.Event()
+        spacing = 3600.0 / budget
+        schedule = RefreshSchedule.load(os.path.join(self.output_dir, SCHEDULE_FILE), min_interval=min_interval)
+        stats = {'checked': 0, 'changed': 0, 'unchanged': 0, 'saved': 0, 'failed': 0, 'requests': 0}
+        food_items = {}
+        next_listing = 0.0
+        next_slot = time.time()
+        
+        def time_left() -> float:
+            return deadline - time.time() if deadline else float('inf')
+        
+        try:
+            print(f" Refresh daemon for {self.profile.name}: {budget:g} requests/hour "
+                  f"(one every {spacing:.1f}s), fetch mode {self.fetch_mode}")
+            if deadline:
+                print(f" Deadline: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(deadline))}")
+            
+            while not stop.is_set() and time_left() > 0:
+                if max_checks and stats['checked'] >= max_checks:
+                    break
+                
+                if time.time() >= next_listing:
+                    requests_before = self.rate.requests
+                    try:
+                        listing = self.get_all_food_items(groups=groups, manufacturers=manufacturers)
+                    except Exception as e:
+                        # A failed relist keeps the previous listing, the daemon carries on
+                        listing = None
+                        print(f" WARNING: Listing failed ({e}), keeping the previous listing")
+                    # Listing pages come out of the same hourly budget as checks
+                    listing_requests = self.rate.requests - requests_before
+                    stats['requests'] += listing_requests
+                    next_slot = max(next_slot, time.time()) + listing_requests * spacing
+                    
+                    if listing is not None:
+                        if listing or not food_items:
+                            food_items = {food_item['ndb_no']: food_item for food_item in listing}
+                        for ndb_no in schedule.sync(list(food_items)):
+                            # Saved records tell new schedules when each food was published
+                            saved = self.record_store.load(ndb_no)
+                            if isinstance(saved, dict) and saved.get('Published Date'):
+                                schedule.foods[ndb_no]['published'] = saved['Published Date']
+                        counts = schedule.counts()
+                        print(f" Schedule: {counts['listed']} listed, {counts['unchecked']} never checked, "
+                              f"{counts['due']} due")
+                    # Without any listing yet, try again sooner than a full relist interval
+                    next_listing = time.time() + (relist_every if food_items else min(relist_every, LISTING_RETRY))
+                
+                if not food_items:
+                    stop.wait(max(min(next_listing - time.time(), time_left()), 1.0))
+                    continue
+                
+                plan = schedule.plan(limit=1)
+                if not plan:
+                    # Everything was checked recently, free the browser while waiting
+                    self.close_driver()
+                    self.close_backend()
+                    wait = min(schedule.next_due() or relist_every, next_listing - time.time(), time_left())
+                    print(f" Nothing due, sleeping {wait / 60:.0f} minutes")
+                    stop.wait(max(wait, 1.0))
+                    continue
+                
+                # Even spacing under the hourly budget
+                if next_slot - time.time() >= time_left() or stop.wait(max(0.0, next_slot - time.time())):
+                    break
+                
+                ndb_no = plan[0]
+                food_item = food_items[ndb_no]
+                stats['checked'] += 1
+                requests_before = self.rate.requests
+                changed_item = self.check_food_changed(food_item)
+                if changed_item is None:
+                    stats['unchanged'] += 1
+                    schedule.record(ndb_no, False)
+                    check_requests = self.rate.requests - requests_before
+                    stats['requests'] += check_requests
+                    next_slot = max(next_slot, time.time()) + check_requests * spacing
+                    continue
+                
+                stats['changed'] += 1
+                food_data = self.fetch_food_detail(changed_item)
+                if food_data is not None and self.save_food_data(food_data):
+                    stats['saved'] += 1
+                    schedule.record(ndb_no, True, published=food_data.get('Published Date'))
+                    print(f"  Updated {ndb_no} ({food_item['description'][:50]})")
+                else:
+                    stats['failed'] += 1
+                    schedule.record(ndb_no, None)
+                    kind, error = self.last_failure or ('parse_error', 'no data extracted')
+                    print(f"  WARNING: {ndb_no} changed but could not be scraped ({kind}: {error})")
+                # The check (when one was sent) and the re-scrape with any retries
+                step_requests = self.rate.requests - requests_before
+                stats['requests'] += step_requests
+                next_slot = max(next_slot, time.time()) + step_requests * spacing
+                
+                if stats['checked'] % 50 == 0:
+                    print(f"  {stats['checked']} checked, {stats['saved']} updated, {stats['failed']} failed")
+            
+            print(f"\n Refresh daemon stopped for {self.profile.name}: {stats['checked']} checked, "
+                  f"{stats['unchanged']} unchanged, {stats['saved']} updated, {stats['failed']} failed, "
+                  f"{stats['requests']} requests")
+            counts = schedule.counts()
+            print(f" Schedule: {counts['due']} of {counts['listed']} foods still due")
+            print(f" {self.rate.summary()}")
+            return stats
+        
+        finally:
+            self.close_driver()
+            self.close_backend()
+            if self.store is not None:
+                self.store.close()
+            schedule.save()
+
+
+def scrape_editions(profiles: List[SiteProfile], output_root: Optional[str] = None,
+                    drivers: Optional[int] = None, cache: Optional[ResponseCache] = None,
+                    min_rate: Optional[float] = None, max_rate: Optional[float] = None,
+                    engine_options: Optional[Dict[str, Any]] = None,
+                    run_options: Optional[Dict[str, Any]] = None,
+                    engine_class: Optional[type] = None) -> Dict[str, bool]:
+    """Scrape several editions concurrently, returns {profile key: finished without a fatal error}
+    
+    All editions live on the same host, so they share one HTTP session, one
+    rate controller (starting from the most conservative profile budget), one
+    response cache and one pool of Chrome drivers that are lent out per page.
+    output_root puts each edition in output_root/<key> instead of its default folder.
+    engine_class builds each edition's engine from its profile (default ScraperEngine),
+    so a subclass's overrides apply to the editions and their pool workers.
+    """
+    engine_class = engine_class or ScraperEngine
+    # One watchdog for every edition, so the pool can forget any driver it retires
+    engine_options = dict(engine_options or {})
+    engine_options.setdefault('watchdog', DriverWatchdog())
+    run_options = run_options or {}
+    workers = run_options.get('workers', 1)
+    
+    rate = RateController(initial_rate=min(profile.initial_rate for profile in profiles),
+                          ceiling=min(profile.max_rate for profile in profiles))
+    rate.set_bounds(floor=min_rate, ceiling=max_rate)
+    session = make_session(pool_size=2 * workers * len(profiles))
+    
+    engines = [
+        engine_class(profile, output_dir=os.path.join(output_root, profile.key) if output_root else None,
+                     cache=cache, session=session, rate=rate, **engine_options)
+        for profile in profiles
+    ]
+    # Drivers are keyed by edition, each started with its own profile's Chrome options
+    driver_pool = DriverPool(engines[0].create_driver, size=drivers or workers * len(profiles),
+                             key=engines[0].profile.key, watchdog=engines[0].watchdog)
+    for engine in engines:
+        engine.driver_pool = driver_pool
+    if engine_options.get('fetch_mode', 'selenium') == 'selenium' and \
+            engine_options.get('browser', 'selenium') == 'selenium' and not (cache and cache.replay):
+        # Browsers start while the editions fetch their listings, an even share for each
+        for n, engine in enumerate(engines):
+            share = driver_pool.size // len(engines) + (n < driver_pool.size % len(engines))
+            driver_pool.prewarm(share, key=engine.profile.key, factory=engine.create_driver)
+    
+    results = {}
+    
+    def run(engine: ScraperEngine) -> None:
+        try:
+            engine.scrape_all_foods(**run_options)
+            results[engine.profile.key] = True
+        except Exception as e:
+            print(f" ERROR: {engine.profile.name} run stopped: {e}")
+            results[engine.profile.key] = False
+    
+    threads = [threading.Thread(target=run, args=(engine,), name=f"edition-{engine.profile.key}")
+               for engine in engines]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        driver_pool.close()
+    
+    return results
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Failure classification and deferred retries for MyFCD detail scraping
+Failed foods are queued with exponential backoff and retried at the end of the run or in the next one
+"""
+
+import json
+import os
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import httpx
+import requests
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from .http_cache import CacheMiss
+from .run_manifest import atomic_write_json
+
+
+RETRY_QUEUE_FILE = "run_retry_queue.json"
+FAILURE_REPORT_FILE = "run_failures.json"
+
+FAILURE_KINDS = ('timeout', 'driver_crash', 'http_error', 'parse_error')
+
+
+def classify_exception(error: BaseException) -> str:
+    """Failure kind for an exception raised while loading a detail page"""
+    if isinstance(error, (TimeoutException, requests.Timeout, httpx.TimeoutException, TimeoutError)):
+        return 'timeout'
+    if isinstance(error, WebDriverException):
+        # Anything else from WebDriver means the browser or its session is gone
+        return 'driver_crash'
+    if isinstance(error, (requests.RequestException, httpx.HTTPError, CacheMiss, ConnectionError)):
+        return 'http_error'
+    return 'parse_error'
+
+
+class RetryQueue:
+    """Failed foods waiting for another attempt, persisted between runs
+    
+    An entry's wait doubles with every failed attempt (base_delay, 2x, 4x...
+    capped at max_delay). After max_attempts it is moved to gave_up and only
+    shows up in the failure report.
+    """
+    
+    def __init__(self, path: str, max_attempts: int = 4, base_delay: float = 10.0, max_delay: float = 300.0):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.pending = {}
+        self.gave_up = {}
+        self.recovered = {}
+    
+    @classmethod
+    def load(cls, path: str, **kwargs) -> 'RetryQueue':
+        """Queue saved by an earlier run, or an empty one"""
+        retry_queue = cls(path, **kwargs)
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                retry_queue.pending = data.get('pending', {})
+                retry_queue.gave_up = data.get('gave_up', {})
+            except Exception as e:
+                print(f"WARNING: Ignoring unreadable retry queue ({e})")
+        return retry_queue
+    
+    def __len__(self) -> int:
+        return len(self.pending)
+    
+    def add(self, food_item: Dict[str, str], kind: str, error: str) -> bool:
+        """Record a failed attempt, returns False once the food has used up its attempts"""
+        ndb_no = food_item['ndb_no']
+        entry = self.pending.pop(ndb_no, None) or self.gave_up.pop(ndb_no, None) or {'attempts': 0, 'history': []}
+        entry['attempts'] += 1
+        entry['food_item'] = {key: value for key, value in food_item.items() if key != 'fingerprint'}
+        entry['kind'] = kind
+        entry['error'] = error
+        entry['last_attempt'] = time.strftime('%Y-%m-%d %H:%M:%S')
+        entry['history'] = (entry['history'] + [kind])[-self.max_attempts:]
+        
+        if entry['attempts'] >= self.max_attempts:
+            self.gave_up[ndb_no] = entry
+            return False
+        
+        delay = min(self.max_delay, self.base_delay * 2 ** (entry['attempts'] - 1))
+        entry['next_attempt'] = time.time() + delay
+        self.pending[ndb_no] = entry
+        return True
+    
+    def resolve(self, ndb_no: str) -> None:
+        """Forget a food that has now been scraped successfully"""
+        entry = self.pending.pop(ndb_no, None) or self.gave_up.pop(ndb_no, None)
+        if entry:
+            self.recovered[ndb_no] = entry
+    
+    def next_due_in(self) -> Optional[float]:
+        """Seconds until the next pending entry is due, None when the queue is empty"""
+        if not self.pending:
+            return None
+        return max(0.0, min(entry['next_attempt'] for entry in self.pending.values()) - time.time())
+    
+    def due(self) -> List[Dict[str, Any]]:
+        """Pending entries whose backoff has elapsed, oldest due first"""
+        now = time.time()
+        entries = [entry for entry in self.pending.values() if entry['next_attempt'] <= now]
+        return sorted(entries, key=lambda entry: entry['next_attempt'])
+    
+    def save(self) -> None:
+        """Persist pending and abandoned entries atomically"""
+        atomic_write_json(self.path, {
+            'updated': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'pending': self.pending,
+            'gave_up': self.gave_up
+        })
+    
+    def write_report(self, path: str) -> Dict[str, int]:
+        """Write the failure report next to the datasets, returns failures per kind"""
+        failures = []
+        for status, entries in (('pending', self.pending), ('gave_up', self.gave_up), ('recovered', self.recovered)):
+            for ndb_no, entry in sorted(entries.items()):
+                failures.append({
+                    'ndb_no': ndb_no,
+                    'description': entry['food_item'].get('description', ''),
+                    'status': status,
+                    'kind': entry['kind'],
+                    'error': entry['error'],
+                    'attempts': entry['attempts'],
+                    'history': entry['history'],
+                    'last_attempt': entry['last_attempt']
+                })
+        
+        by_kind = Counter(failure['kind'] for failure in failures if failure['status'] != 'recovered')
+        atomic_write_json(path, {
+            'generated': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'counts': {kind: by_kind.get(kind, 0) for kind in FAILURE_KINDS},
+            'pending': len(self.pending),
+            'gave_up': len(self.gave_up),
+            'recovered': len(self.recovered),
+            'failures': failures
+        })
+        return dict(by_kind)
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Raw detail page archive for MyFCD scraping
+Keeps every fetched detail page gzip-compressed, by edition, NDB and fetch time, so records can be re-parsed offline
+"""
+
+import gzip
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+ARCHIVE_SUFFIX = '.json.gz'
+
+
+def default_archive_dir(output_dir: str) -> str:
+    """Archive folder next to a datasets folder"""
+    return os.path.join(os.path.dirname(output_dir.rstrip(os.sep)), 'html_archive')
+
+
+class HtmlArchive:
+    """Detail pages under <root>/<edition>/<NDB>/<UTC fetch time>-<kind>.json.gz
+    
+    Each file holds the page HTML together with the food item it was fetched
+    for, the URL, the kind ('rendered' by Chrome or 'static' HTML), the
+    extraction mode and captured XHR bodies the record was read with, and the
+    fingerprint it was saved with, so re-parsing needs nothing else.
+    Writes go to a temp file and are renamed into place, so fetch workers can
+    share one archive. Older fetches of a food are kept unless keep is set.
+    """
+    
+    def __init__(self, root: str, edition: str, keep: Optional[int] = None, level: int = 6):
+        self.root = root
+        self.edition = edition
+        self.keep = keep
+        self.level = level
+        self.dir = os.path.join(root, edition)
+        self.pages = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.dir, exist_ok=True)
+    
+    def _food_dir(self, ndb_no: str) -> str:
+        return os.path.join(self.dir, re.sub(r'[^\w\-.]', '_', ndb_no))
+    
+    def put(self, food_item: Dict[str, str], page_source: str, kind: str,
+            fingerprint: Optional[Dict[str, Any]] = None, payloads: Optional[List[str]] = None,
+            extraction: str = 'dom') -> str:
+        """Archive one fetched page with any XHR bodies captured alongside it, returns its path"""
+        now = time.time()
+        stamp = time.strftime('%Y%m%dT%H%M%S', time.gmtime(now)) + f"{now % 1:.3f}"[1:]
+        food_dir = self._food_dir(food_item['ndb_no'])
+        os.makedirs(food_dir, exist_ok=True)
+        path = os.path.join(food_dir, f"{stamp}Z-{kind}{ARCHIVE_SUFFIX}")
+        
+        entry = {
+            'edition': self.edition,
+            'food_item': {key: value for key, value in food_item.items() if key != 'fingerprint'},
+            'url': food_item.get('detail_url'),
+            'kind': kind,
+            'fetched': time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(now)) + 'Z',
+            'fingerprint': fingerprint,
+            'html': page_source,
+            'payloads': payloads,
+            'extraction': extraction
+        }
+        data = gzip.compress(json.dumps(entry, ensure_ascii=False).encode('utf-8'), compresslevel=self.level)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self.pages += 1
+            self.bytes += len(data)
+        
+        if self.keep:
+            for old in self.versions(food_item['ndb_no'])[:-self.keep]:
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+        return path
+    
+    def versions(self, ndb_no: str) -> List[str]:
+        """Archived pages of one food, oldest first"""
+        food_dir = self._food_dir(ndb_no)
+        if not os.path.isdir(food_dir):
+            return []
+        return [os.path.join(food_dir, name) for name in sorted(os.listdir(food_dir)) if name.endswith(ARCHIVE_SUFFIX)]
+    
+    def latest(self) -> Iterator[str]:
+        """Newest archived page of every food"""
+        for entry in sorted(os.scandir(self.dir), key=lambda entry: entry.name):
+            if not entry.is_dir():
+                continue
+            names = sorted(name for name in os.listdir(entry.path) if name.endswith(ARCHIVE_SUFFIX))
+            if names:
+                yield os.path.join(entry.path, names[-1])
+    
+    @staticmethod
+    def load(path: str) -> Dict[str, Any]:
+        """One archived page with its metadata"""
+        with gzip.open(path, 'rb') as f:
+            return json.loads(f.read())
+    
+    def summary(self) -> str:
+        """One-line report for the end of a run"""
+        return f"HTML archive: {self.pages} pages, {self.bytes / 1024 / 1024:.1f} MB compressed in {self.dir}"
+
+
+# Parser for the worker processes of reparse_archive, built once per process,
+# and the extraction mode forced on every page (None: each page's own)
+_parser = None
+_extraction = None
+
+
+def _init_parser(profile_key: str, output_dir: str, extraction: Optional[str] = None) -> None:
+    global _parser, _extraction
+    from .engine import ScraperEngine
+    from .profiles import SITE_PROFILES
+    # Only its parser is used, it never fetches or starts a browser
+    _parser = ScraperEngine(SITE_PROFILES[profile_key], output_dir=output_dir, fetch_mode='http')
+    _extraction = extraction
+
+
+def _reparse_paths(paths: List[str]) -> List[Tuple[str, Optional[Dict[str, Any]], Optional[str]]]:
+    """Parse a batch of archived pages, returns (path, food_data, error) for each"""
+    from .change_detection import FINGERPRINT_KEY
+    results = []
+    for path in paths:
+        try:
+            entry = HtmlArchive.load(path)
+            food_item = entry['food_item']
+            # Payload-mode pages skip the readiness wait, their DOM table may be half rendered
+            _parser.extraction = _extraction or entry.get('extraction', 'dom')
+            food_data = _parser.parse_detail_page(entry['html'], food_item, entry.get('payloads'))
+            problem = _parser.validate_food_data(food_item, food_data)
+            if problem:
+                results.append((path, None, problem))
+                continue
+            if entry.get('fingerprint'):
+                food_data[FINGERPRINT_KEY] = entry['fingerprint']
+            results.append((path, food_data, None))
+        except Exception as e:
+            results.append((path, None, str(e)))
+    return results
+
+
+def reparse_archive(archive: HtmlArchive, record_store, output_dir: str, processes: Optional[int] = None,
+                    batch_size: int = 64, extraction: Optional[str] = None) -> Dict[str, Any]:
+    """Rebuild every food's record from its newest archived page, spread over processes
+    
+    Parsing runs in a process pool with no browser or network; records are
+    written by this process through record_store, which is closed at the
+    end. Each page is read with the extraction mode it was scraped with,
+    unless extraction overrides it. Returns counts and the errors by NDB.
+    """
+    paths = list(archive.latest())
+    batches = [paths[i:i + batch_size] for i in range(0, len(paths), batch_size)]
+    counts = {'pages': len(paths), 'written': 0, 'failed': 0}
+    errors = {}
+    started = time.time()
+    
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_parser,
+                             initargs=(archive.edition, output_dir, extraction)) as executor:
+        for results in executor.map(_reparse_paths, batches):
+            for path, food_data, error in results:
+                if food_data is None:
+                    counts['failed'] += 1
+                    errors[os.path.basename(os.path.dirname(path))] = error
+                    continue
+                record_store.write(food_data)
+                counts['written'] += 1
+    
+    record_store.close()
+    counts['seconds'] = round(time.time() - started, 2)
+    counts['errors'] = errors
+    return counts
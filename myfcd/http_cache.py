@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+On-disk response cache for MyFCD scraping
+Content-addressed bodies plus a SQLite index, with TTL, LRU size eviction and offline replay
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+CACHE_MODES = ('record', 'replay')
+
+
+class CacheMiss(Exception):
+    """Raised in replay mode when a request has no cached response"""
+
+
+class ResponseCache:
+    """Listing responses, group-mapping page, static and rendered detail pages on disk
+    
+    Bodies are stored once per SHA-256 under objects/, so identical pages share
+    a file. The index maps request keys to bodies and tracks freshness and use.
+    In 'record' mode fresh entries are served and misses are fetched and stored;
+    in 'replay' mode everything is served from disk, stale or not, and a miss
+    raises CacheMiss instead of touching the network.
+    """
+    
+    def __init__(self, cache_dir: str, mode: str = 'record', ttl: float = 7 * 24 * 3600,
+                 max_bytes: int = 500 * 1024 * 1024):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode '{mode}', expected one of {CACHE_MODES}")
+        
+        self.cache_dir = cache_dir
+        self.mode = mode
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        
+        os.makedirs(os.path.join(cache_dir, 'objects'), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(cache_dir, 'index.sqlite'), check_same_thread=False)
+        self._db.execute('''
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        ''')
+        self._db.execute('CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS entries_digest ON entries (digest)')
+        self._db.commit()
+        
+        # Replay serves stale entries, so only a recording run expires them
+        if mode == 'record':
+            self.evict()
+    
+    @property
+    def replay(self) -> bool:
+        """True when the network must not be used"""
+        return self.mode == 'replay'
+    
+    @staticmethod
+    def request_key(method: str, url: str, data: Optional[Dict[str, Any]] = None) -> str:
+        """Key for one request: method, URL and sorted form data
+        
+        method 'RENDER' is used for the Selenium-rendered DOM of a URL.
+        """
+        payload = json.dumps([method.upper(), url, sorted((str(k), str(v)) for k, v in (data or {}).items())])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, 'objects', digest[:2], digest)
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached response {'status', 'headers', 'body'} for key, None on a miss
+        
+        Expired entries count as misses except in replay mode; replay misses raise CacheMiss.
+        """
+        with self._lock:
+            row = self._db.execute(
+                'SELECT digest, status, headers, stored_at FROM entries WHERE key = ?', (key,)
+            ).fetchone()
+            
+            fresh = row is not None and (self.replay or time.time() - row[3] <= self.ttl)
+            body = None
+            if fresh:
+                try:
+                    with open(self._object_path(row[0]), 'rb') as f:
+                        body = f.read()
+                except OSError:
+                    body = None
+            
+            if body is None:
+                self.misses += 1
+                if self.replay:
+                    raise CacheMiss(f"no cached response for request {key[:12]}")
+                return None
+            
+            self._db.execute('UPDATE entries SET accessed_at = ? WHERE key = ?', (time.time(), key))
+            self._db.commit()
+            self.hits += 1
+            return {'status': row[1], 'headers': json.loads(row[2]), 'body': body}
+    
+    def put(self, key: str, body: bytes, status: int = 200, headers: Optional[Dict[str, str]] = None) -> None:
+        """Store a response body under key, evicting if the cache grows past max_bytes"""
+        if self.replay:
+            return
+        
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest)
+        now = time.time()
+        with self._lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(body)
+                os.replace(tmp_path, path)
+            
+            self._db.execute(
+                'INSERT OR REPLACE INTO entries (key, digest, size, status, headers, stored_at, accessed_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (key, digest, len(body), status, json.dumps(dict(headers or {})), now, now)
+            )
+            self._db.commit()
+            over_limit = self._disk_bytes() > self.max_bytes
+        
+        if over_limit:
+            self.evict()
+    
+    def _disk_bytes(self) -> int:
+        """Bytes used by bodies, counting shared bodies once"""
+        row = self._db.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM entries)'
+        ).fetchone()
+        return row[0]
+    
+    def evict(self) -> None:
+        """Drop expired entries, then the least recently used ones until under max_bytes"""
+        with self._lock:
+            cutoff = time.time() - self.ttl
+            removed = self._db.execute('SELECT key, digest FROM entries WHERE stored_at < ?', (cutoff,)).fetchall()
+            self._db.execute('DELETE FROM entries WHERE stored_at < ?', (cutoff,))
+            
+            excess = self._disk_bytes() - self.max_bytes
+            if excess > 0:
+                lru = self._db.execute('SELECT key, digest, size FROM entries ORDER BY accessed_at').fetchall()
+                for key, digest, size in lru:
+                    if excess <= 0:
+                        break
+                    self._db.execute('DELETE FROM entries WHERE key = ?', (key,))
+                    removed.append((key, digest))
+                    # A shared body only frees space once its last entry is gone
+                    if not self._db.execute('SELECT 1 FROM entries WHERE digest = ? LIMIT 1', (digest,)).fetchone():
+                        excess -= size
+            self._db.commit()
+            
+            # Delete bodies no remaining entry points at
+            for digest in {digest for _, digest in removed}:
+                if self._db.execute('SELECT 1 FROM entries WHERE digest = ? LIMIT 1', (digest,)).fetchone():
+                    continue
+                try:
+                    os.remove(self._object_path(digest))
+                except OSError:
+                    pass
+    
+    def summary(self) -> str:
+        """One-line report for the end of a run"""
+        with self._lock:
+            entries = self._db.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+            size = self._disk_bytes()
+        return (f"HTTP cache ({self.mode}): {self.hits} hits, {self.misses} misses, "
+                f"{entries} entries, {size / 1024 / 1024:.1f} MB")
+    
+    def close(self) -> None:
+        """Close the index database"""
+        with self._lock:
+            self._db.close()
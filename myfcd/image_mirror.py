@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Product image mirror for MyFCD datasets
+Downloads every record's Image concurrently into a content-addressed folder, revalidates with ETag/Last-Modified and makes thumbnails
+"""
+
+import asyncio
+import hashlib
+import json
+import mimetypes
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from .rate_control import RateController
+from .record_store import RecordReader
+from .run_manifest import atomic_write_json
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+
+IMAGES_DIR = "images"
+IMAGE_MANIFEST_FILE = "run_images.json"
+
+# Attempts per image before it is reported as failed
+IMAGE_ATTEMPTS = 3
+
+
+def make_thumbnail(src_path: str, dest_path: str, size: int) -> str:
+    """Write a size x size JPEG of src_path, letterboxed on white; runs in a worker process"""
+    with Image.open(src_path) as image:
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        thumb = ImageOps.pad(image, (size, size), color=(255, 255, 255))
+    tmp_path = f"{dest_path}.tmp"
+    thumb.save(tmp_path, 'JPEG', quality=85, optimize=True)
+    os.replace(tmp_path, dest_path)
+    return dest_path
+
+
+def _extension(url: str, content_type: Optional[str]) -> str:
+    """File extension from the URL, or from the content type when the URL has none"""
+    ext = os.path.splitext(urlparse(url).path)[1].lower()
+    if ext in ('.jpg', '.jpeg', '.png', '.gif', '.webp'):
+        return '.jpg' if ext == '.jpeg' else ext
+    guessed = mimetypes.guess_extension((content_type or '').split(';')[0].strip()) if content_type else None
+    return guessed or '.img'
+
+
+class ImageMirror:
+    """Local copy of the images referenced by a datasets folder's records
+    
+    Images are stored once per SHA-256 under images/<aa>/<digest><ext>, so the
+    same picture used by several foods (or served from several URLs) takes
+    one file. Downloads share one httpx client with at most concurrency
+    connections and are paced by the rate controller. A URL mirrored before
+    is requested with If-None-Match / If-Modified-Since and a 304 keeps the
+    file. run_images.json maps each NDB to its image and thumbnail paths
+    (relative to the datasets folder) and keeps the validators per URL.
+    Thumbnails are made in a process pool when Pillow is installed.
+    """
+    
+    def __init__(self, output_dir: str, concurrency: int = 8, thumb_size: Optional[int] = 256,
+                 rate: Optional[RateController] = None, headers: Optional[Dict[str, str]] = None,
+                 processes: Optional[int] = None):
+        self.output_dir = output_dir
+        self.images_dir = os.path.join(output_dir, IMAGES_DIR)
+        self.manifest_path = os.path.join(output_dir, IMAGE_MANIFEST_FILE)
+        self.concurrency = concurrency
+        self.thumb_size = thumb_size
+        self.rate = rate
+        self.headers = headers or {}
+        self.processes = processes
+        self.counts = {'downloaded': 0, 'unchanged': 0, 'duplicate': 0, 'failed': 0, 'thumbnails': 0}
+        self.manifest = self._load_manifest()
+    
+    def _load_manifest(self) -> Dict[str, Any]:
+        if os.path.exists(self.manifest_path):
+            try:
+                with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"WARNING: Ignoring unreadable image manifest ({e})")
+        return {'updated': None, 'images': {}, 'urls': {}}
+    
+    def collect(self) -> Dict[str, str]:
+        """NDB -> image URL for every saved record that has one"""
+        records = RecordReader(self.output_dir)
+        images = {}
+        for name in records.names():
+            try:
+                data = records.load(name)
+            except Exception:
+                continue
+            if data.get('Image') and data.get('NDB No'):
+                images[data['NDB No']] = data['Image']
+        return images
+    
+    def _object_path(self, digest: str, ext: str) -> str:
+        return os.path.join(self.images_dir, digest[:2], digest + ext)
+    
+    def _relative(self, path: str) -> str:
+        return os.path.relpath(path, self.output_dir).replace(os.sep, '/')
+    
+    def _store(self, body: bytes, url: str, content_type: Optional[str]) -> str:
+        """Write body under its digest unless an identical image is already stored, returns the path"""
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest, _extension(url, content_type))
+        if os.path.exists(path):
+            self.counts['duplicate'] += 1
+            return path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+        return path
+    
+    async def _fetch(self, client: httpx.AsyncClient, semaphore: asyncio.Semaphore, url: str) -> None:
+        """Download or revalidate one URL and update its manifest entry"""
+        previous = self.manifest['urls'].get(url)
+        headers = {}
+        if previous and os.path.exists(os.path.join(self.output_dir, previous['path'])):
+            if previous.get('etag'):
+                headers['If-None-Match'] = previous['etag']
+            if previous.get('last_modified'):
+                headers['If-Modified-Since'] = previous['last_modified']
+        
+        last_error = None
+        for attempt in range(1, IMAGE_ATTEMPTS + 1):
+            async with semaphore:
+                if self.rate:
+                    await self.rate.acquire_async()
+                started = time.time()
+                try:
+                    response = await client.get(url, headers=headers)
+                    if self.rate:
+                        self.rate.record_response('image', time.time() - started, response.status_code,
+                                                  response.headers)
+                    # Not modified only answers the validators sent, a bare 304 has nothing to keep
+                    if response.status_code == 304 and headers:
+                        previous['checked'] = time.strftime('%Y-%m-%d %H:%M:%S')
+                        self.counts['unchanged'] += 1
+                        return
+                    response.raise_for_status()
+                    path = self._store(response.content, url, response.headers.get('content-type'))
+                    self.manifest['urls'][url] = {
+                        'path': self._relative(path),
+                        'sha256': os.path.splitext(os.path.basename(path))[0],
+                        'bytes': len(response.content),
+                        'content_type': response.headers.get('content-type'),
+                        'etag': response.headers.get('etag'),
+                        'last_modified': response.headers.get('last-modified'),
+                        'checked': time.strftime('%Y-%m-%d %H:%M:%S')
+                    }
+                    self.counts['downloaded'] += 1
+                    return
+                except httpx.HTTPError as e:
+                    last_error = e
+                    if isinstance(e, httpx.HTTPStatusError):
+                        last_error = f"HTTP {e.response.status_code}"
+                        # A missing image stays missing, only throttling and server errors are retried
+                        if e.response.status_code < 500 and e.response.status_code != 429:
+                            break
+                    elif self.rate:
+                        self.rate.record_error('image', timeout=isinstance(e, httpx.TimeoutException))
+                except Exception as e:
+                    # A full disk or unwritable folder fails this image, not the whole mirror
+                    last_error = e
+                    break
+            if attempt < IMAGE_ATTEMPTS:
+                await asyncio.sleep(0.5 * 2 ** (attempt - 1))
+        
+        print(f"  WARNING: Image {url} failed: {last_error}")
+        self.counts['failed'] += 1
+    
+    async def _fetch_all(self, urls) -> None:
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        async with httpx.AsyncClient(headers=self.headers, timeout=30, limits=limits,
+                                     follow_redirects=True) as client:
+            semaphore = asyncio.Semaphore(self.concurrency)
+            results = await asyncio.gather(*(self._fetch(client, semaphore, url) for url in urls),
+                                           return_exceptions=True)
+        for url, result in zip(urls, results):
+            if isinstance(result, Exception):
+                print(f"  WARNING: Image {url} failed: {result}")
+                self.counts['failed'] += 1
+    
+    def _thumbnails(self) -> None:
+        """Make the thumbnails that do not exist yet, one process per core"""
+        if not self.thumb_size:
+            return
+        if Image is None:
+            print(" WARNING: Pillow is not installed, skipping thumbnails")
+            return
+        
+        jobs = {}
+        for url, entry in self.manifest['urls'].items():
+            src_path = os.path.join(self.output_dir, entry['path'])
+            dest_path = os.path.join(self.images_dir, 'thumbs', f"{entry['sha256']}_{self.thumb_size}.jpg")
+            if os.path.exists(dest_path):
+                entry['thumbnail'] = self._relative(dest_path)
+            elif os.path.exists(src_path):
+                jobs[url] = (src_path, dest_path)
+        if not jobs:
+            return
+        
+        os.makedirs(os.path.join(self.images_dir, 'thumbs'), exist_ok=True)
+        with ProcessPoolExecutor(max_workers=self.processes) as executor:
+            futures = {url: executor.submit(make_thumbnail, src_path, dest_path, self.thumb_size)
+                       for url, (src_path, dest_path) in jobs.items()}
+            for url, future in futures.items():
+                try:
+                    self.manifest['urls'][url]['thumbnail'] = self._relative(future.result())
+                    self.counts['thumbnails'] += 1
+                except Exception as e:
+                    print(f"  WARNING: Thumbnail for {url} failed: {e}")
+    
+    def run(self) -> Dict[str, int]:
+        """Mirror every record's image and write run_images.json, returns the counts"""
+        images = self.collect()
+        urls = sorted(set(images.values()))
+        try:
+            if urls:
+                asyncio.run(self._fetch_all(urls))
+            self._thumbnails()
+        finally:
+            # Images mirrored before an interruption are kept for the next run
+            self._save(images)
+        return dict(self.counts, foods=len(images), urls=len(urls), mirrored=len(self.manifest['images']))
+    
+    def _save(self, images: Dict[str, str]) -> None:
+        """Map each NDB to its mirrored image and write run_images.json"""
+        self.manifest['images'] = {}
+        for ndb_no, url in sorted(images.items()):
+            entry = self.manifest['urls'].get(url)
+            if entry:
+                self.manifest['images'][ndb_no] = {'url': url, 'path': entry['path'],
+                                                   'thumbnail': entry.get('thumbnail')}
+        self.manifest['updated'] = time.strftime('%Y-%m-%d %H:%M:%S')
+        atomic_write_json(self.manifest_path, self.manifest)
+    
+    def summary(self) -> str:
+        """One-line report for the end of a run"""
+        return (f"Images: {self.counts['downloaded']} downloaded, {self.counts['unchanged']} unchanged, "
+                f"{self.counts['duplicate']} duplicates stored once, {self.counts['failed']} failed, "
+                f"{self.counts['thumbnails']} thumbnails")
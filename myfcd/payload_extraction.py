@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Structured payload extraction for MyFCD detail pages
+Finds the nutrient data the page JavaScript renders from, in inline scripts or XHR responses, so the table need not be read
+"""
+
+import json
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import json5
+from bs4 import BeautifulSoup
+
+
+# Key under which a record says how its nutrients were read: 'payload' or 'dom'
+EXTRACTION_KEY = 'Extraction'
+
+EXTRACTION_MODES = ('dom', 'payload')
+
+# Field names a nutrient row or serving definition may use, compared lower-cased without _ or -
+NAME_KEYS = ('name', 'nutrient', 'nutrientname', 'component', 'componentname', 'label')
+UNIT_KEYS = ('unit', 'units', 'uom')
+VALUE_KEYS = ('valueper100g', 'per100g', 'value100g', 'valueper100ml', 'per100ml', 'value100ml',
+              'value', 'amount', 'val', 'qty')
+CATEGORY_KEYS = ('category', 'group', 'nutrientgroup', 'categoryname')
+SERVING_LABEL_KEYS = ('measure', 'serving', 'servingname', 'portion', 'description', 'name', 'label')
+SERVING_WEIGHT_KEYS = ('weight', 'weightg', 'gram', 'grams', 'gm', 'g', 'servingsize', 'size')
+
+# Literal after an assignment, call or property: var x = {...}, init([...]), data: {...}
+LITERAL_START = re.compile(r'[=(:,]\s*([\[{])')
+JSON_PARSE = re.compile(r'JSON\.parse\(\s*(\'(?:[^\'\\]|\\.)*\'|"(?:[^"\\]|\\.)*")\s*\)')
+
+# String literals, and characters that outside them only occur in code (calls, statements, regex literals, comments)
+STRING_LITERAL = re.compile(r'"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\'')
+CODE_CHARS = re.compile(r'[();=`/]')
+# A bare name as a value (a variable, not data): [x, ...] or {key: x}
+NAME_VALUE = re.compile(r'[\[,:]\s*(?!(?:true|false|null|Infinity|NaN)\b)[A-Za-z_$][\w$]*\s*[,\]}]')
+
+# Literals this large are bundled libraries, not page data
+MAX_LITERAL = 2_000_000
+
+NUMBER = re.compile(r'^-?\d+(?:\.\d+)?$')
+
+
+def _norm(key: Any) -> str:
+    return re.sub(r'[_\-\s]', '', str(key)).lower()
+
+
+def _field(item: Dict[str, Any], names) -> Tuple[Optional[str], Any]:
+    """First key of item matching one of names (normalized), as (key, value)"""
+    normalized = {_norm(key): key for key in item}
+    for name in names:
+        if name in normalized:
+            key = normalized[name]
+            return key, item[key]
+    return None, None
+
+
+def _is_number(value: Any) -> bool:
+    if isinstance(value, bool):
+        return False
+    return isinstance(value, (int, float)) or (isinstance(value, str) and bool(NUMBER.match(value.strip())))
+
+
+def _literal_ends(text: str, start: int) -> Dict[int, Optional[int]]:
+    """Index after the matching bracket (None when unmatched) for text[start] and every
+    bracket opened inside it, skipping strings and comments
+    
+    One scan answers all the literals nested in a candidate, so a candidate that
+    fails to parse does not cost a rescan per nested bracket.
+    """
+    ends = {}
+    opened = []
+    quote = None
+    i = start
+    end = min(len(text), start + MAX_LITERAL)
+    while i < end:
+        char = text[i]
+        if quote:
+            if char == '\\':
+                i += 1
+            elif char == quote:
+                quote = None
+        elif char in '"\'`':
+            quote = char
+        elif char == '/' and text[i + 1:i + 2] == '/':
+            newline = text.find('\n', i)
+            i = newline if newline != -1 else end
+            continue
+        elif char in '[{':
+            opened.append(i)
+            ends[i] = None
+        elif char in ']}':
+            ends[opened.pop()] = i + 1
+            if not opened:
+                return ends
+        i += 1
+    if end < len(text):
+        # Cut off by the size limit: nested brackets may still close further on
+        ends = {key: value for key, value in ends.items() if value is not None}
+        ends[start] = None
+    return ends
+
+
+def _load_literal(text: str) -> Any:
+    """JSON first, json5 for JavaScript object literals (unquoted keys, single quotes, trailing commas)"""
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    # json5 is slow to reject code, so literals holding any are turned down before it sees them
+    bare = STRING_LITERAL.sub('""', text)
+    if CODE_CHARS.search(bare) or NAME_VALUE.search(bare):
+        raise ValueError("literal contains code")
+    return json5.loads(text)
+
+
+def script_payloads(page_source: str) -> List[Any]:
+    """Object and array literals in the page's inline scripts"""
+    payloads = []
+    soup = BeautifulSoup(page_source, 'html.parser')
+    for script in soup.find_all('script'):
+        if script.get('src') or script.get('type', 'text/javascript') not in (
+                'text/javascript', 'application/javascript', 'application/json', 'module'):
+            continue
+        text = script.string or script.get_text()
+        if not text or ('{' not in text and '[' not in text):
+            continue
+        payloads.extend(_script_literals(text, script.get('type') == 'application/json'))
+    return payloads
+
+
+@lru_cache(maxsize=64)
+def _script_literals(text: str, is_json: bool) -> Tuple[Any, ...]:
+    """Literals of one script, cached by its text since the same scripts come back on
+    every payload poll of a page and scanning a large one is slow
+    """
+    if is_json:
+        try:
+            return (json.loads(text),)
+        except ValueError:
+            return ()
+    
+    payloads = []
+    for match in JSON_PARSE.finditer(text):
+        try:
+            payloads.append(json.loads(json5.loads(match.group(1))))
+        except ValueError:
+            pass
+    ends = {}
+    position = 0
+    while True:
+        match = LITERAL_START.search(text, position)
+        if not match:
+            break
+        start = match.start(1)
+        if start not in ends:
+            for key, value in _literal_ends(text, start).items():
+                ends.setdefault(key, value)
+        end = ends[start]
+        if end is None:
+            position = start + 1
+            continue
+        try:
+            payloads.append(_load_literal(text[start:end]))
+            # Nested literals are reached through the outer one
+            position = end
+        except Exception:
+            # Not data: code, regex literals or a syntax json5 does not cover
+            position = start + 1
+    return tuple(payloads)
+
+
+def json_payloads(bodies: List[str]) -> List[Any]:
+    """Parsed JSON response bodies, unparseable ones skipped"""
+    payloads = []
+    for body in bodies:
+        try:
+            payloads.append(json.loads(body))
+        except ValueError:
+            continue
+    return payloads
+
+
+def network_bodies(driver) -> List[str]:
+    """Bodies of the JSON XHR/fetch responses in the driver's performance log since it was last read
+    
+    Needs a driver started with the goog:loggingPrefs performance capability;
+    responses whose body Chrome no longer holds are skipped.
+    """
+    responses = {}
+    finished = set()
+    for entry in driver.get_log('performance'):
+        try:
+            message = json.loads(entry['message'])['message']
+        except (KeyError, ValueError):
+            continue
+        params = message.get('params', {})
+        if message.get('method') == 'Network.responseReceived' and params.get('type') in ('XHR', 'Fetch'):
+            if 'json' in params.get('response', {}).get('mimeType', '') or \
+                    params.get('response', {}).get('url', '').endswith('.json'):
+                responses[params['requestId']] = params['response']['url']
+        elif message.get('method') == 'Network.loadingFinished':
+            finished.add(params.get('requestId'))
+    
+    bodies = []
+    for request_id in responses:
+        if request_id not in finished:
+            continue
+        try:
+            body = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+        except Exception:
+            continue
+        if not body.get('base64Encoded'):
+            bodies.append(body.get('body', ''))
+    return bodies
+
+
+def _lists(value: Any, depth: int = 0) -> Iterator[list]:
+    """Every list inside a parsed payload"""
+    if depth > 12:
+        return
+    if isinstance(value, list):
+        yield value
+        for item in value:
+            yield from _lists(item, depth + 1)
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _lists(item, depth + 1)
+
+
+def _nutrient_row(item: Any) -> Optional[Dict[str, Any]]:
+    """One nutrient as {'name', 'unit', 'value', 'per', 'category'}, None when item is not one"""
+    if isinstance(item, list):
+        # DataTables-style [name, unit, per 100g, ...], with a unit short enough not to be a description
+        if len(item) >= 3 and isinstance(item[0], str) and not _is_number(item[0]) and \
+                isinstance(item[1], str) and len(item[1]) <= 12 and \
+                (_is_number(item[2]) or item[2] in ('', '-', None)):
+            return {'name': item[0], 'unit': item[1], 'value': item[2], 'per': '100g', 'category': None}
+        return None
+    if not isinstance(item, dict):
+        return None
+    _, name = _field(item, NAME_KEYS)
+    value_key, value = _field(item, VALUE_KEYS)
+    if not isinstance(name, str) or not name.strip() or value_key is None:
+        return None
+    if not (_is_number(value) or value in ('', '-', None)):
+        return None
+    _, unit = _field(item, UNIT_KEYS)
+    _, category = _field(item, CATEGORY_KEYS)
+    return {'name': name, 'unit': unit, 'value': value,
+            'per': '100ml' if '100ml' in _norm(value_key) else '100g',
+            'category': category if isinstance(category, str) else None}
+
+
+def _serving(item: Any) -> Optional[Tuple[str, float]]:
+    """One serving definition as (label, grams), None when item is not one"""
+    if not isinstance(item, dict):
+        return None
+    _, weight = _field(item, SERVING_WEIGHT_KEYS)
+    _, label = _field(item, SERVING_LABEL_KEYS)
+    if not _is_number(weight) or not isinstance(label, str) or not label.strip():
+        return None
+    return label.strip(), float(weight)
+
+
+def find_nutrient_data(payloads: List[Any]) -> Optional[Tuple[List[Dict[str, Any]], List[Tuple[str, float]]]]:
+    """(nutrient rows, serving definitions) from the payloads, None when no list looks like nutrient data
+    
+    The longest list whose items are nearly all nutrient rows wins; servings
+    are the longest list of (label, weight) items that is not the nutrient list.
+    """
+    best_rows = None
+    best_servings = []
+    for payload in payloads:
+        for candidate in _lists(payload):
+            if len(candidate) >= 3:
+                found = [row for row in map(_nutrient_row, candidate) if row]
+                if len(found) >= 0.8 * len(candidate):
+                    if best_rows is None or len(found) > len(best_rows):
+                        best_rows = found
+                    continue
+            servings = [serving for serving in map(_serving, candidate) if serving]
+            if servings and len(servings) == len(candidate) and len(servings) > len(best_servings):
+                best_servings = servings
+    if not best_rows:
+        return None
+    return best_rows, best_servings
+
+
+def _scaled(value: Any, grams: float) -> str:
+    """value per 100 scaled to grams, with the per-100 value's decimal places"""
+    text = str(value).strip()
+    decimals = len(text.split('.')[1]) if '.' in text else 0
+    return f"{float(text) * grams / 100:.{max(decimals, 1)}f}"
+
+
+def build_nutrients(rows: List[Dict[str, Any]], servings: List[Tuple[str, float]],
+                    serving_key) -> List[Dict[str, Any]]:
+    """Nutrient entries in the record layout the DOM parser produces
+    
+    Category headers are emitted when a row's category changes; serving values
+    are the per-100 value scaled to each serving's weight, keyed like the
+    table's serving columns (serving_key turns a header into the key).
+    """
+    nutrients = []
+    category = None
+    headers = [(serving_key(f"{label} ({grams:g}g)" if 'g)' not in label else label), grams)
+               for label, grams in servings]
+    for row in rows:
+        if row['category'] and row['category'] != category:
+            category = row['category']
+            nutrients.append({'category': category})
+        entry = {'name': row['name'].strip()}
+        unit = str(row['unit']).strip() if row['unit'] is not None else ''
+        if unit and unit != '-':
+            entry['unit'] = unit
+        value = str(row['value']).strip() if row['value'] is not None else ''
+        if value and value != '-':
+            entry[f"value_per_{row['per']}"] = value
+            for key, grams in headers:
+                if key:
+                    entry[key] = _scaled(value, grams)
+        nutrients.append(entry)
+    return nutrients
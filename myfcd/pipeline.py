@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Staged streaming pipeline for MyFCD scraping
+Stages run in their own threads and hand items on through bounded queues, so a slow stage holds back the ones before it
+"""
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+# Returned by a handler to drop an item instead of passing it to the next stage
+DROP = object()
+
+# Tells a stage thread that its input is finished
+_DONE = object()
+
+
+class Stage:
+    """One stage: a bounded input queue and one thread per handler
+    
+    gate(n) returning False pauses handler n (1-based) before it takes its
+    next item, so a paused handler never sits on an item. Once the input is
+    finished the gate is ignored, so every handler drains and exits.
+    """
+    
+    def __init__(self, name: str, handlers: List[Callable[[Any], Any]], maxsize: int,
+                 gate: Optional[Callable[[int], bool]] = None):
+        if not handlers:
+            raise ValueError(f"stage {name} needs at least one handler")
+        
+        self.name = name
+        self.handlers = handlers
+        self.gate = gate
+        # Set once the stage's input is finished
+        self.closed = False
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.maxsize = maxsize
+        self.processed = 0
+        self.busy_time = 0.0
+        self.depth_samples = 0
+        self.depth_total = 0
+        self.full_samples = 0
+        self._running = len(handlers)
+        self._lock = threading.Lock()
+    
+    def sample(self) -> int:
+        """Record the current queue depth for the summary and return it"""
+        depth = self.queue.qsize()
+        self.depth_samples += 1
+        self.depth_total += depth
+        if depth >= self.maxsize:
+            self.full_samples += 1
+        return depth
+
+
+class Pipeline:
+    """Source -> stage -> stage ... with bounded queues in between
+    
+    The source is iterated on its own thread and every stage gets one thread
+    per handler. A handler takes an item and returns the item for the next
+    stage (or DROP); the last stage's return value is discarded. Queue depths
+    are sampled, printed every report_every seconds and summarised at the end;
+    a stage whose input queue stays full is the bottleneck. When a handler
+    raises, on_error(stage name, item, exception) decides what happens to the
+    item: its return value goes on to the next stage like a handler's (or DROP).
+    """
+    
+    def __init__(self, name: str = 'pipeline', report_every: float = 30.0,
+                 on_error: Optional[Callable[[str, Any, Exception], Any]] = None):
+        self.name = name
+        self.report_every = report_every
+        self.on_error = on_error
+        self.stages: List[Stage] = []
+        self.source_error: Optional[BaseException] = None
+        self.stop_event = threading.Event()
+        self.started = None
+        self.finished = None
+    
+    def add_stage(self, name: str, handlers: List[Callable[[Any], Any]], maxsize: int = 32,
+                  gate: Optional[Callable[[int], bool]] = None) -> 'Pipeline':
+        """Append a stage with one thread per handler and an input queue of maxsize items
+        
+        gate(n) is asked before handler n (1-based) takes each item, see Stage.
+        """
+        self.stages.append(Stage(name, handlers, maxsize, gate))
+        return self
+    
+    def _put(self, stage: Stage, item: Any) -> bool:
+        """Blocking put that gives up when the pipeline is stopped"""
+        while not self.stop_event.is_set():
+            try:
+                stage.queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def _close(self, stage: Stage) -> None:
+        """Tell every thread of stage that no more input is coming"""
+        stage.closed = True
+        for _ in stage.handlers:
+            self._put(stage, _DONE)
+    
+    def _run_source(self, source: Iterable[Any]) -> None:
+        first = self.stages[0]
+        try:
+            for item in source:
+                if not self._put(first, item):
+                    break
+        except BaseException as e:
+            # Items already queued still go through, the error is raised by run()
+            self.source_error = e
+        finally:
+            self._close(first)
+    
+    def _run_stage(self, index: int, handler: Callable[[Any], Any], number: int = 1) -> None:
+        stage = self.stages[index]
+        downstream = self.stages[index + 1] if index + 1 < len(self.stages) else None
+        
+        try:
+            while not self.stop_event.is_set():
+                if stage.gate is not None and not stage.closed and not stage.gate(number):
+                    time.sleep(0.5)
+                    continue
+                try:
+                    item = stage.queue.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if item is _DONE:
+                    break
+                
+                started = time.time()
+                try:
+                    result = handler(item)
+                except Exception as e:
+                    print(f"    ERROR: {stage.name} stage failed: {e}")
+                    result = self._recover(stage, item, e)
+                with stage._lock:
+                    stage.processed += 1
+                    stage.busy_time += time.time() - started
+                
+                if downstream is not None and result is not DROP:
+                    if not self._put(downstream, result):
+                        break
+        finally:
+            with stage._lock:
+                stage._running -= 1
+                last = stage._running == 0
+            # The last thread out closes the next stage
+            if last and downstream is not None:
+                self._close(downstream)
+    
+    def _recover(self, stage: Stage, item: Any, error: Exception) -> Any:
+        """What a failed item becomes, DROP without an on_error hook or when the hook fails too"""
+        if self.on_error is None:
+            return DROP
+        try:
+            return self.on_error(stage.name, item, error)
+        except Exception as e:
+            print(f"    ERROR: {stage.name} stage could not record a failed item: {e}")
+            return DROP
+    
+    def depths(self) -> Dict[str, int]:
+        """Items waiting in front of each stage"""
+        return {stage.name: stage.queue.qsize() for stage in self.stages}
+    
+    def report(self) -> str:
+        """One line with every stage's queue depth"""
+        return " Queues: " + " | ".join(f"{stage.name} {stage.queue.qsize()}/{stage.maxsize}"
+                                        for stage in self.stages)
+    
+    def run(self, source: Iterable[Any]) -> None:
+        """Feed source through every stage and wait until all of them are done
+        
+        Re-raises an exception from the source once the items it did produce
+        have been processed. Ctrl+C stops every stage and is re-raised.
+        """
+        if not self.stages:
+            raise ValueError("pipeline has no stages")
+        
+        self.started = time.time()
+        threads = [threading.Thread(target=self._run_source, args=(source,), name=f"{self.name}-source", daemon=True)]
+        for index, stage in enumerate(self.stages):
+            for n, handler in enumerate(stage.handlers, 1):
+                threads.append(threading.Thread(target=self._run_stage, args=(index, handler, n),
+                                                name=f"{self.name}-{stage.name}-{n}", daemon=True))
+        for thread in threads:
+            thread.start()
+        
+        last_report = time.time()
+        try:
+            while any(thread.is_alive() for thread in threads):
+                threads[-1].join(timeout=1.0)
+                for stage in self.stages:
+                    stage.sample()
+                if self.report_every and time.time() - last_report >= self.report_every:
+                    print(self.report())
+                    last_report = time.time()
+        except KeyboardInterrupt:
+            self.stop_event.set()
+            for thread in threads:
+                thread.join(timeout=5)
+            raise
+        finally:
+            self.finished = time.time()
+        
+        if self.source_error is not None:
+            raise self.source_error
+    
+    def summary(self) -> str:
+        """Per-stage throughput, busy share and average queue depth"""
+        elapsed = max((self.finished or time.time()) - (self.started or time.time()), 1e-9)
+        parts = []
+        bottleneck = None
+        for stage in self.stages:
+            busy = stage.busy_time / (elapsed * len(stage.handlers))
+            average = stage.depth_total / stage.depth_samples if stage.depth_samples else 0.0
+            full = stage.full_samples / stage.depth_samples if stage.depth_samples else 0.0
+            parts.append(f"{stage.name} {stage.processed} items x{len(stage.handlers)} "
+                         f"{busy:.0%} busy, queue avg {average:.1f}/{stage.maxsize}")
+            if bottleneck is None or full > bottleneck[1]:
+                bottleneck = (stage.name, full)
+        line = "Pipeline: " + "; ".join(parts)
+        if bottleneck and bottleneck[1] >= 0.25:
+            line += f" (bottleneck: {bottleneck[0]}, queue full {bottleneck[1]:.0%} of the time)"
+        return line
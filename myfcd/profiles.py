@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Site profiles for the MyFCD editions
+Everything that differs between the current, 1997 and Industry databases lives here
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+
+# Metadata fields a record can carry besides NDB No, Description, Food Group and Nutrient
+METADATA_FIELDS = ('Image', 'Source', 'Published Date')
+
+
+class SiteProfile:
+    """URLs, fallback food groups, record fields, waits and politeness for one edition"""
+    
+    def __init__(self, key: str, name: str, base_url: str, ajax_url: str, output_dir: str,
+                 group_fallback: Dict[str, str], fields: Sequence[str] = METADATA_FIELDS,
+                 source_from: str = 'page_text', readiness_timeout: float = 20.0,
+                 initial_rate: float = 1.25, max_rate: float = 5.0,
+                 chrome_args: Optional[List[str]] = None, window_size: str = '1920,1080',
+                 implicit_wait: float = 10, progress_first: int = 5, progress_every: int = 10,
+                 report_all_failures: bool = True, manufacturer_filter: bool = False):
+        self.key = key
+        self.name = name
+        self.base_url = base_url
+        self.ajax_url = ajax_url
+        self.output_dir = output_dir
+        self.group_fallback = group_fallback
+        # Subset of METADATA_FIELDS the detail pages provide
+        self.fields = tuple(fields)
+        # 'page_text' finds the IMR credit anywhere on the page, 'table_row' reads the Source row
+        self.source_from = source_from
+        self.readiness_timeout = readiness_timeout
+        self.initial_rate = initial_rate
+        self.max_rate = max_rate
+        self.chrome_args = list(chrome_args or [])
+        self.window_size = window_size
+        self.implicit_wait = implicit_wait
+        self.progress_first = progress_first
+        self.progress_every = progress_every
+        self.report_all_failures = report_all_failures
+        # True when the listing can be filtered by manufacturer as well as food group
+        self.manufacturer_filter = manufacturer_filter
+    
+    def detail_url(self, ndb_no: str) -> str:
+        """Detail page URL for one food"""
+        return f"{self.base_url}index.php/site/detail_product/{ndb_no}/1/10/-1/0/0/"
+    
+    def __repr__(self) -> str:
+        return f"SiteProfile({self.key!r})"
+
+
+CURRENT = SiteProfile(
+    key='current',
+    name='MyFCD',
+    base_url="https://myfcd.moh.gov.my/myfcdcurrent/",
+    ajax_url="https://myfcd.moh.gov.my/myfcdcurrent/index.php/ajax/datatable_data",
+    output_dir="/Users/ooichienzhen/Desktop/myFCD/datasets",
+    group_fallback={
+        '1': 'RAW AND PROCESSED FOODS',
+        '1.01': 'Cereals and grain products',
+        '1.02': 'Starchy roots, tubers and products',
+        '1.03': 'Legumes and legume products',
+        '1.04': 'Nuts, seeds and products',
+        '1.05': 'Vegetables and vegetable products',
+        '1.06': 'Fruits and fruit products',
+        '1.07': 'Sugars and syrups',
+        '1.08': 'Meat and meat products',
+        '1.09': 'Eggs',
+        '1.10': 'Fish, shellfish and products',
+        '1.11': 'Milk and milk products',
+        '1.12': 'Oils and fats',
+        '1.13': 'Beverages',
+        '1.14': 'Miscellaneous',
+        '2': 'PREPARED FOODS',
+        '2.1': 'Traditional Malaysian Kuih',
+        '2.1.1': 'Rice and rice flour based',
+        '2.1.2': 'Wheat flour based',
+        '2.1.3': 'Legume based',
+        '2.1.4': 'Glutinous rice based',
+        '2.1.5': 'Tuber based',
+        '2.1.6': 'Vegetables and fruits based',
+        '2.1.7': 'Porridge and pengat',
+        '2.1.8': 'Miscellaneous',
+        '2.2': 'Cooked Dishes and Meals',
+        '2.2.1': 'Cereal based',
+        '2.2.2': 'Meat dishes',
+        '2.2.3': 'Fish and sea-food dishes',
+        '2.2.4': 'Vegetable dishes',
+        '2.2.5': 'Miscellaneous',
+        '2.3': 'Franchised "fast foods"',
+        '2.3.1': 'Chicken',
+        '2.3.2': 'Burger',
+        '2.3.3': 'Pizza',
+        '2.3.4': 'Spaghetti',
+        '2.3.5': 'Sandwiches',
+        '2.3.6': 'Satay',
+        '2.3.7': 'Miscellaneous',
+        '2.4': 'Prepared Beverages'
+    },
+)
+
+MYFCD97 = SiteProfile(
+    key='1997',
+    name='MyFCD97',
+    base_url="https://myfcd.moh.gov.my/myfcd97/",
+    ajax_url="https://myfcd.moh.gov.my/myfcd97/index.php/ajax/datatable_data",
+    output_dir="/Users/ooichienzhen/Desktop/myFCD1997/datasets",
+    group_fallback={
+        '1': 'Cereals and grain products',
+        '2': 'Nuts and oil seeds',
+        '3': 'Pulses and products',
+        '4': 'Vegetables and products',
+        '5': 'Fruits and products',
+        '6': 'Sugar and products',
+        '7': 'Meat and products',
+        '8': 'Eggs and products',
+        '9': 'Milk and products',
+        '10': 'Fish and products',
+        '11': 'Fats and oils',
+        '12': 'Beverages',
+        '13': 'Other foods',
+        '14': 'Starchy roots, tubers and products',
+        '23': 'Traditional kuih (rice-based)',
+        '24': 'Traditional kuih (cakes)',
+        '25': 'Traditional kuih (fried)',
+        '28': 'Indian dishes',
+        '29': 'Prepared meat dishes',
+        '30': 'Prepared fish dishes',
+        '31': 'Traditional desserts',
+        '37': 'Canned/processed meat',
+        '38': 'Raw ingredients (mixed)',
+        '39': 'Mixed rice dishes',
+        '40': 'Mixed rice dishes (alt)',
+        '44': 'Fast food items',
+        '45': 'Burgers',
+        '46': 'Pizza',
+        '47': 'Pasta dishes',
+        '48': 'Sandwiches',
+        '49': 'Satay',
+        '50': 'Local main dishes',
+        '51': 'Pork products',
+        '52': 'Duck eggs and products',
+        '53': 'Seafood',
+        '54': 'Processed meat',
+        '55': 'Dairy products',
+        '56': 'Cooking fats',
+        '57': 'Breakfast cereals',
+        '58': 'Starchy foods',
+        '59': 'Legumes',
+        '60': 'Local fruits'
+    },
+    # The 1997 pages carry no image, source or published date
+    fields=(),
+)
+
+INDUSTRY = SiteProfile(
+    key='industry',
+    name='MyFCD Industry',
+    base_url="https://myfcd.moh.gov.my/myfcdindustri/",
+    ajax_url="https://myfcd.moh.gov.my/myfcdindustri/static/DataTables-1.10.12/examples/server_side/scripts/server_processing.php",
+    output_dir="/Users/ooichienzhen/Desktop/myFCD_Industry/datasets",
+    group_fallback={
+        '-1': 'Ungrouped',
+        '1': 'Cereals and grain products',
+        '2': 'Nuts, seeds and products',
+        '3': 'Legumes and legume products',
+        '4': 'Vegetables and vegetable products',
+        '5': 'Fruits and fruit products',
+        '6': 'Sugars and syrups',
+        '7': 'Meat and meat products',
+        '8': 'Eggs',
+        '9': 'Milk and milk products',
+        '10': 'Fish, shellfish and products',
+        '11': 'Oils and fats',
+        '12': 'Beverages',
+        '13': 'Miscellaneous',
+        '14': 'Starchy roots, tubers and products',
+        '15': 'Ice cream and ice confection',
+        '16': 'Chocolate and chocolate confectionery products',
+        '17': 'Seasoning',
+        '18': 'Sweets',
+        '19': 'Snacks',
+        '20': 'Franchised Food and Beverages',
+        '21': 'Fast Foods'
+    },
+    # Manufacturer products name their own source in the detail table
+    source_from='table_row',
+    readiness_timeout=10.0,
+    initial_rate=10.0,
+    max_rate=20.0,
+    chrome_args=['--disable-plugins', '--disable-extensions', '--no-first-run', '--disable-default-apps'],
+    window_size='1280,720',
+    implicit_wait=5,
+    # Industry runs are large, keep the log short
+    progress_first=3,
+    progress_every=50,
+    report_all_failures=False,
+    manufacturer_filter=True,
+)
+
+SITE_PROFILES = {profile.key: profile for profile in (CURRENT, MYFCD97, INDUSTRY)}
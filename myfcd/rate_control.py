@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Adaptive request pacing for MyFCD scraping
+Additive-increase / multiplicative-decrease rate control instead of fixed sleeps
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Mapping, Optional
+
+
+# Bounds in requests/second when neither the profile nor the command line sets them
+DEFAULT_RATE_FLOOR = 0.2
+DEFAULT_RATE_CEILING = 5.0
+
+
+def is_throttle_status(status: int) -> bool:
+    """True for responses that mean the server wants us to slow down"""
+    return status == 429 or status >= 500
+
+
+def retry_after_seconds(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """Seconds from a Retry-After header, None when absent or given as a date"""
+    value = headers.get('Retry-After') if headers else None
+    try:
+        return max(float(value), 0.0) if value is not None else None
+    except ValueError:
+        return None
+
+
+class RateController:
+    """Shared request rate for every thread and the async listing
+    
+    Each healthy response adds `increase` requests/second up to the ceiling.
+    A 429, 5xx, timeout, a latency spike or a high error rate multiplies the
+    rate by `decrease`, at most once per cooldown so one burst of failures
+    counts once. With a worker pool the number of active workers follows the
+    rate times the recent latency (Little's law), so surplus drivers sit idle
+    instead of queueing for request slots.
+    """
+    
+    def __init__(self, initial_rate: float = 1.0, floor: float = DEFAULT_RATE_FLOOR, ceiling: float = DEFAULT_RATE_CEILING,
+                 increase: float = 0.1, decrease: float = 0.5, slow_factor: float = 3.0,
+                 max_error_rate: float = 0.05, error_window: int = 50, cooldown: float = 2.0):
+        if not 0 < floor <= ceiling:
+            raise ValueError("rate floor must be positive and not above the ceiling")
+        
+        self.floor = floor
+        self.ceiling = ceiling
+        self.rate = min(max(initial_rate, floor), ceiling)
+        self.increase = increase
+        self.decrease = decrease
+        self.slow_factor = slow_factor
+        self.max_error_rate = max_error_rate
+        self.cooldown = cooldown
+        
+        self.max_workers = 1
+        self.active_workers = 1
+        self.requests = 0
+        self.backoffs = 0
+        self.peak_rate = self.rate
+        
+        self._outcomes = deque(maxlen=error_window)
+        self._baseline = {}
+        self._latency = None
+        self._next_slot = time.monotonic()
+        self._last_backoff = 0.0
+        self._lock = threading.Lock()
+    
+    def set_bounds(self, floor: Optional[float] = None, ceiling: Optional[float] = None) -> None:
+        """Change the floor and/or ceiling, clamping the current rate into them"""
+        with self._lock:
+            floor = self.floor if floor is None else floor
+            ceiling = self.ceiling if ceiling is None else ceiling
+            if not 0 < floor <= ceiling:
+                raise ValueError("rate floor must be positive and not above the ceiling")
+            self.floor, self.ceiling = floor, ceiling
+            self.rate = min(max(self.rate, floor), ceiling)
+    
+    def set_max_workers(self, workers: int) -> None:
+        """Size of the worker pool the controller may scale within"""
+        with self._lock:
+            self.max_workers = max(1, workers)
+            self._update_workers()
+    
+    def _reserve(self) -> float:
+        """Claim the next request slot, returns how long to wait for it"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + 1.0 / self.rate
+            self.requests += 1
+            return slot - now
+    
+    def acquire(self) -> None:
+        """Block until this thread may send its next request"""
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+    
+    async def acquire_async(self) -> None:
+        """Await the next request slot without blocking the event loop"""
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+    
+    def _error_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+    
+    def _back_off(self, pause: Optional[float] = None) -> None:
+        """Multiplicative decrease, caller holds the lock"""
+        now = time.monotonic()
+        if pause:
+            self._next_slot = max(self._next_slot, now + pause)
+        if now - self._last_backoff < self.cooldown:
+            return
+        self._last_backoff = now
+        self.rate = max(self.floor, self.rate * self.decrease)
+        self.backoffs += 1
+        self._update_workers()
+    
+    def _update_workers(self) -> None:
+        """Workers needed to keep up with the rate, caller holds the lock"""
+        if self._latency is None:
+            self.active_workers = self.max_workers
+            return
+        needed = math.ceil(self.rate * self._latency)
+        self.active_workers = max(1, min(self.max_workers, needed))
+    
+    def record_response(self, kind: str, latency: float, status: int = 200,
+                        headers: Optional[Mapping[str, str]] = None) -> None:
+        """Feed back one completed request
+        
+        kind separates request types with different normal latencies
+        ('listing', 'http', 'render'), so a slow render is not taken as a
+        slowdown of static pages.
+        """
+        with self._lock:
+            if is_throttle_status(status):
+                self._outcomes.append(False)
+                self._back_off(retry_after_seconds(headers))
+                return
+            
+            self._outcomes.append(True)
+            self._latency = latency if self._latency is None else 0.8 * self._latency + 0.2 * latency
+            
+            baseline = self._baseline.get(kind)
+            if baseline is not None and latency > self.slow_factor * baseline:
+                # Server is slowing down, a spike does not move the baseline much
+                self._baseline[kind] = 0.95 * baseline + 0.05 * latency
+                self._back_off()
+                return
+            self._baseline[kind] = latency if baseline is None else 0.9 * baseline + 0.1 * latency
+            
+            if self._error_rate() <= self.max_error_rate:
+                self.rate = min(self.ceiling, self.rate + self.increase)
+                self.peak_rate = max(self.peak_rate, self.rate)
+            self._update_workers()
+    
+    def record_error(self, kind: str, timeout: bool = False) -> None:
+        """Feed back a request that failed without a usable response
+        
+        Timeouts always back off, other errors only once the recent error
+        rate is above max_error_rate.
+        """
+        with self._lock:
+            self._outcomes.append(False)
+            if timeout or self._error_rate() > self.max_error_rate:
+                self._back_off()
+    
+    def worker_active(self, index: int) -> bool:
+        """True when pool worker number index (1-based) should keep working"""
+        return index <= self.active_workers
+    
+    def stats(self) -> Dict[str, Any]:
+        """Current and peak rate, backoffs and active workers"""
+        with self._lock:
+            return {
+                'rate': self.rate,
+                'peak_rate': self.peak_rate,
+                'floor': self.floor,
+                'ceiling': self.ceiling,
+                'requests': self.requests,
+                'backoffs': self.backoffs,
+                'error_rate': self._error_rate(),
+                'active_workers': self.active_workers,
+                'max_workers': self.max_workers,
+            }
+    
+    def summary(self) -> str:
+        """One-line report for the end of a run"""
+        stats = self.stats()
+        line = (f"Request rate: {stats['requests']} requests, now {stats['rate']:.2f}/s "
+                f"(peak {stats['peak_rate']:.2f}/s, range {stats['floor']:g}-{stats['ceiling']:g}/s), "
+                f"{stats['backoffs']} backoffs")
+        if stats['max_workers'] > 1:
+            line += f", {stats['active_workers']}/{stats['max_workers']} workers active"
+        return line
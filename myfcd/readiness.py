@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Page readiness detection for MyFCD detail pages
+Waits until the nutrient table is actually rendered instead of sleeping a fixed time
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+
+
+# One script call per poll returns everything needed to judge the table
+TABLE_STATE_SCRIPT = """
+var table = document.getElementById('tableDetailNutrient');
+var state = {readyState: document.readyState, table: !!table, rows: 0,
+             servingCells: 0, servingFilled: 0, textLength: 0};
+if (!table) { return state; }
+var rows = table.querySelectorAll('tbody tr');
+state.rows = rows.length;
+for (var r = 0; r < rows.length; r++) {
+    var cells = rows[r].querySelectorAll('td');
+    for (var c = 3; c < cells.length; c++) {
+        state.servingCells++;
+        if (cells[c].textContent.trim()) { state.servingFilled++; }
+    }
+}
+state.textLength = table.textContent.length;
+return state;
+"""
+
+NETWORK_STATE_SCRIPT = """
+return {readyState: document.readyState,
+        table: !!document.getElementById('tableDetailNutrient'),
+        resources: performance.getEntriesByType('resource').length,
+        pending: (window.jQuery && window.jQuery.active) || 0};
+"""
+
+
+class TableStableCondition:
+    """Ready when the serving-size cells are populated and unchanged for several polls"""
+    
+    script = TABLE_STATE_SCRIPT
+    
+    def __init__(self, stable_polls: int = 3):
+        self.stable_polls = stable_polls
+        self._signature = None
+        self._same = 0
+    
+    def __call__(self, driver) -> bool:
+        return self.ready(driver.execute_script(self.script))
+    
+    def ready(self, state: Optional[Dict[str, Any]]) -> bool:
+        """Judge one poll's script result, for backends that run the script themselves"""
+        if not state or not state['table'] or state['readyState'] != 'complete' or not state['rows']:
+            self._signature = None
+            return False
+        
+        # Serving columns exist but the page JavaScript has not filled them yet
+        if state['servingCells'] and not state['servingFilled']:
+            self._signature = None
+            return False
+        
+        signature = (state['rows'], state['servingCells'], state['servingFilled'], state['textLength'])
+        if signature == self._signature:
+            self._same += 1
+        else:
+            self._signature = signature
+            self._same = 1
+        return self._same >= self.stable_polls
+
+
+class NetworkIdleCondition:
+    """Ready when the table exists and no requests started or stayed pending for several polls"""
+    
+    script = NETWORK_STATE_SCRIPT
+    
+    def __init__(self, stable_polls: int = 5):
+        self.stable_polls = stable_polls
+        self._resources = None
+        self._same = 0
+    
+    def __call__(self, driver) -> bool:
+        return self.ready(driver.execute_script(self.script))
+    
+    def ready(self, state: Optional[Dict[str, Any]]) -> bool:
+        """Judge one poll's script result, for backends that run the script themselves"""
+        if not state or not state['table'] or state['readyState'] != 'complete' or state['pending']:
+            self._resources = None
+            return False
+        
+        if state['resources'] == self._resources:
+            self._same += 1
+        else:
+            self._resources = state['resources']
+            self._same = 1
+        return self._same >= self.stable_polls
+
+
+READINESS_STRATEGIES = {
+    'table': TableStableCondition,
+    'network': NetworkIdleCondition,
+}
+
+
+class AdaptiveTimeout:
+    """Wait timeout derived from the ready times observed on this site
+    
+    Until enough pages have been seen the initial timeout is used, afterwards
+    the timeout is a margin over the chosen percentile, clamped to floor/ceiling.
+    """
+    
+    def __init__(self, initial: float = 20.0, floor: float = 3.0, ceiling: float = 30.0,
+                 percentile: float = 95.0, margin: float = 3.0, window: int = 200, min_samples: int = 10):
+        self.initial = initial
+        self.floor = floor
+        self.ceiling = ceiling
+        self.pct = percentile
+        self.margin = margin
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+    
+    def record(self, seconds: float) -> None:
+        """Add one observed ready time"""
+        with self._lock:
+            self._samples.append(seconds)
+    
+    def percentile(self, pct: float) -> Optional[float]:
+        """Nearest-rank percentile of the recent ready times, None before any sample"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = max(0, min(len(samples) - 1, int(round(pct / 100 * len(samples))) - 1))
+        return samples[rank]
+    
+    def current(self) -> float:
+        """Timeout to use for the next page"""
+        with self._lock:
+            count = len(self._samples)
+        if count < self.min_samples:
+            return self.initial
+        return max(self.floor, min(self.ceiling, self.percentile(self.pct) * self.margin))
+
+
+class PageReadiness:
+    """Waits for a detail page to be ready and records how long each page took"""
+    
+    def __init__(self, strategy: str = 'table', initial_timeout: float = 20.0, poll_frequency: float = 0.1):
+        if strategy not in READINESS_STRATEGIES:
+            raise ValueError(f"Unknown readiness strategy '{strategy}', expected one of {tuple(READINESS_STRATEGIES)}")
+        
+        self.strategy = strategy
+        self.poll_frequency = poll_frequency
+        self.timeout = AdaptiveTimeout(initial=initial_timeout)
+        self.ready_times = deque(maxlen=1000)
+        self.pages_ready = 0
+        self.timeouts = 0
+        self._lock = threading.Lock()
+    
+    def wait(self, driver, started: Optional[float] = None) -> float:
+        """Block until the page in driver is ready, returns seconds since started
+        
+        started is when navigation began, so the recorded time covers the whole
+        page load. Raises TimeoutException if the page never becomes ready.
+        """
+        started = started if started is not None else time.time()
+        timeout = self.timeout.current()
+        
+        try:
+            WebDriverWait(driver, timeout, poll_frequency=self.poll_frequency).until(self.condition())
+        except TimeoutException:
+            raise self.record_timeout(timeout)
+        return self.record_ready(started)
+    
+    def condition(self):
+        """New readiness condition for one page"""
+        return READINESS_STRATEGIES[self.strategy]()
+    
+    def record_ready(self, started: float) -> float:
+        """Count a page that became ready, returns seconds since started"""
+        elapsed = time.time() - started
+        self.timeout.record(elapsed)
+        with self._lock:
+            self.ready_times.append(elapsed)
+            self.pages_ready += 1
+        return elapsed
+    
+    def record_timeout(self, timeout: float) -> TimeoutException:
+        """Count a page that never became ready, returns the exception to raise"""
+        with self._lock:
+            self.timeouts += 1
+        return TimeoutException(f"page not ready after {timeout:.1f}s ({self.strategy} strategy)")
+    
+    def stats(self) -> Dict[str, Any]:
+        """Ready time percentiles, timeout count and the current adaptive timeout"""
+        return {
+            'strategy': self.strategy,
+            'pages': self.pages_ready,
+            'p50': self.timeout.percentile(50),
+            'p95': self.timeout.percentile(95),
+            'timeouts': self.timeouts,
+            'current_timeout': self.timeout.current(),
+        }
+    
+    def summary(self) -> str:
+        """One-line report for the end of a run"""
+        stats = self.stats()
+        if not stats['pages']:
+            return f"Page readiness ({stats['strategy']}): no pages rendered"
+        return (f"Page readiness ({stats['strategy']}): {stats['pages']} pages, "
+                f"p50 {stats['p50']:.2f}s, p95 {stats['p95']:.2f}s, "
+                f"{stats['timeouts']} timeouts, timeout now {stats['current_timeout']:.1f}s")
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Record stores for scraped MyFCD foods
+'files' keeps one pretty-printed JSON file per food, 'ndjson' appends compact lines to one file with an offset index
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .run_manifest import atomic_write_json
+
+
+STORE_FORMATS = ('files', 'ndjson')
+
+RECORDS_FILE = "records.ndjson"
+RECORDS_INDEX_FILE = "run_records_index.json"
+
+
+def record_filename(ndb_no: str) -> str:
+    """File name of one food in the per-file layout"""
+    return re.sub(r'[^\w\-.]', '_', ndb_no) + '.json'
+
+
+def is_valid_record(data: Any, ndb_no: Optional[str] = None) -> bool:
+    """True for a parsed record with a Nutrient list, belonging to ndb_no when given"""
+    if not isinstance(data, dict) or not isinstance(data.get('Nutrient'), list):
+        return False
+    return ndb_no is None or data.get('NDB No') == ndb_no
+
+
+class FileRecordStore:
+    """One <NDB>.json per food, each written to a temp file and renamed into place"""
+    
+    format = 'files'
+    
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+    
+    def path(self, ndb_no: str) -> str:
+        """JSON file path for one food"""
+        return os.path.join(self.output_dir, record_filename(ndb_no))
+    
+    def write(self, food_data: Dict[str, Any]) -> None:
+        """Save one record atomically, a crash leaves the old file or the new one"""
+        atomic_write_json(self.path(food_data.get('NDB No', 'unknown')), food_data)
+    
+    def load(self, ndb_no: str) -> Optional[Dict[str, Any]]:
+        """Saved record for ndb_no, None if missing or unreadable"""
+        try:
+            with open(self.path(ndb_no), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return None
+    
+    def has(self, ndb_no: str) -> bool:
+        """True when the food's record exists, parses and belongs to this NDB"""
+        return is_valid_record(self.load(ndb_no), ndb_no)
+    
+    def flush(self) -> None:
+        """Nothing is buffered, every write is already durable"""
+    
+    def close(self) -> None:
+        """Nothing to release"""
+
+
+class NdjsonRecordStore:
+    """Append-only records.ndjson with an offset index by NDB
+    
+    Writes are buffered and appended in batches. flush() fsyncs the data file
+    before the index is rewritten atomically, so the index never points past
+    what is on disk. A newer line for the same NDB supersedes the older one;
+    close() compacts the file once more than half of it is superseded lines.
+    On open, lines appended after the last index save are re-indexed and a
+    torn final line from a crash is cut off. A readonly store (for readers
+    running next to a scrape) indexes in memory and never touches the files.
+    """
+    
+    format = 'ndjson'
+    
+    def __init__(self, output_dir: str, batch_size: int = 50, flush_interval: float = 10.0,
+                 readonly: bool = False):
+        self.output_dir = output_dir
+        self.data_path = os.path.join(output_dir, RECORDS_FILE)
+        self.index_path = os.path.join(output_dir, RECORDS_INDEX_FILE)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.readonly = readonly
+        
+        if not readonly:
+            os.makedirs(output_dir, exist_ok=True)
+        # NDB -> [offset, length] of its newest line
+        self.index: Dict[str, List[int]] = {}
+        self.lines = 0
+        self._pending: List[Dict[str, Any]] = []
+        self._last_flush = time.time()
+        self._lock = threading.RLock()
+        self._open()
+    
+    def _open(self) -> None:
+        """Load the index and catch up with anything appended after it was saved"""
+        indexed_end = 0
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    saved = json.load(f)
+                self.index = saved['index']
+                self.lines = saved.get('lines', len(self.index))
+                indexed_end = saved['size']
+            except Exception as e:
+                print(f"WARNING: Rebuilding unreadable record index ({e})")
+                self.index, self.lines, indexed_end = {}, 0, 0
+        
+        size = os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+        if indexed_end > size:
+            print(f"WARNING: Record index is ahead of {RECORDS_FILE}, rebuilding it")
+            self.index, self.lines, indexed_end = {}, 0, 0
+        if indexed_end < size:
+            self._scan_from(indexed_end)
+    
+    def _scan_from(self, offset: int) -> None:
+        """Index every complete line from offset, truncating a torn last line"""
+        good_end = offset
+        with open(self.data_path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                self.index[record.get('NDB No', 'unknown')] = [good_end, len(line)]
+                self.lines += 1
+                good_end += len(line)
+        
+        if self.readonly:
+            return
+        if good_end < os.path.getsize(self.data_path):
+            print(f"WARNING: Dropping incomplete data at the end of {RECORDS_FILE}")
+            with open(self.data_path, 'r+b') as f:
+                f.truncate(good_end)
+        self._save_index()
+    
+    def _save_index(self) -> None:
+        size = os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+        atomic_write_json(self.index_path, {'size': size, 'lines': self.lines, 'index': self.index}, indent=None)
+    
+    def write(self, food_data: Dict[str, Any]) -> None:
+        """Queue one record, appended at the next batch flush"""
+        with self._lock:
+            self._pending.append(food_data)
+            due = len(self._pending) >= self.batch_size or time.time() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+    
+    def flush(self) -> None:
+        """Append pending records, fsync them, then save the index"""
+        with self._lock:
+            self._last_flush = time.time()
+            if not self._pending:
+                return
+            
+            with open(self.data_path, 'ab') as f:
+                offset = f.tell()
+                for food_data in self._pending:
+                    line = (json.dumps(food_data, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+                    f.write(line)
+                    self.index[food_data.get('NDB No', 'unknown')] = [offset, len(line)]
+                    self.lines += 1
+                    offset += len(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self._pending = []
+            self._save_index()
+    
+    def load(self, ndb_no: str) -> Optional[Dict[str, Any]]:
+        """Newest record for ndb_no, None if it was never saved"""
+        with self._lock:
+            for food_data in reversed(self._pending):
+                if food_data.get('NDB No') == ndb_no:
+                    return food_data
+            entry = self.index.get(ndb_no)
+            if entry is None:
+                return None
+            try:
+                with open(self.data_path, 'rb') as f:
+                    f.seek(entry[0])
+                    return json.loads(f.read(entry[1]))
+            except Exception:
+                return None
+    
+    def has(self, ndb_no: str) -> bool:
+        """True when a record for ndb_no is saved or waiting to be"""
+        with self._lock:
+            return ndb_no in self.index or any(food_data.get('NDB No') == ndb_no for food_data in self._pending)
+    
+    def compact(self) -> None:
+        """Rewrite the file without superseded lines"""
+        with self._lock:
+            self.flush()
+            tmp_path = f"{self.data_path}.tmp"
+            index = {}
+            with open(self.data_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+                for ndb_no, (offset, length) in sorted(self.index.items(), key=lambda item: item[1][0]):
+                    src.seek(offset)
+                    index[ndb_no] = [dst.tell(), length]
+                    dst.write(src.read(length))
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.replace(tmp_path, self.data_path)
+            self.index = index
+            self.lines = len(index)
+            self._save_index()
+    
+    def close(self) -> None:
+        """Flush, and compact when most lines are superseded"""
+        self.flush()
+        if self.lines > 2 * len(self.index):
+            self.compact()
+
+
+def open_record_store(store_format: str, output_dir: str):
+    """Record store for 'files' or 'ndjson'"""
+    if store_format == 'files':
+        return FileRecordStore(output_dir)
+    if store_format == 'ndjson':
+        return NdjsonRecordStore(output_dir)
+    raise ValueError(f"Unknown record store '{store_format}', expected one of {STORE_FORMATS}")
+
+
+class RecordReader:
+    """Saved records in a datasets folder, from records.ndjson, per-food JSON files or both
+    
+    Used by create_csv, analyze_results and check_progress. Records are named by
+    NDB in records.ndjson and by file name otherwise; a JSON file whose food is
+    also in records.ndjson is skipped.
+    """
+    
+    def __init__(self, data_dir: str):
+        self.data_dir = data_dir
+        self.ndjson = None
+        if os.path.exists(os.path.join(data_dir, RECORDS_FILE)):
+            self.ndjson = NdjsonRecordStore(data_dir, readonly=True)
+        
+        in_ndjson = {record_filename(ndb_no) for ndb_no in self.ndjson.index} if self.ndjson else set()
+        self.files = [f for f in os.listdir(data_dir)
+                      if f.endswith('.json') and not f.startswith(('summary', 'run_')) and f not in in_ndjson]
+    
+    @property
+    def layout(self) -> str:
+        """'ndjson', 'files', 'mixed' or 'empty'"""
+        if self.ndjson and self.ndjson.index:
+            return 'mixed' if self.files else 'ndjson'
+        return 'files' if self.files else 'empty'
+    
+    def names(self) -> List[str]:
+        """Every saved record's name, sorted"""
+        names = list(self.ndjson.index) if self.ndjson else []
+        return sorted(names + self.files)
+    
+    def __len__(self) -> int:
+        return (len(self.ndjson.index) if self.ndjson else 0) + len(self.files)
+    
+    def load(self, name: str) -> Dict[str, Any]:
+        """Parsed record by name, raises if it cannot be read"""
+        if self.ndjson and name in self.ndjson.index:
+            data = self.ndjson.load(name)
+            if data is None:
+                raise ValueError(f"unreadable line in {RECORDS_FILE}")
+            return data
+        with open(os.path.join(self.data_dir, name), 'r', encoding='utf-8') as f:
+            return json.load(f)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Per-food refresh schedule for the MyFCD refresh daemon
+Ranks foods by how likely they are to have changed since they were last checked
+"""
+
+import json
+import math
+import os
+import time
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from .run_manifest import atomic_write_json
+
+
+SCHEDULE_FILE = "run_refresh_schedule.json"
+
+DAY = 86400.0
+
+# Before any history, a food is assumed to change about once in this many days
+PRIOR_DAYS = 90.0
+
+# A food published d days ago adds 1 / (PUBLISHED_DAYS + d) changes per day,
+# so new publications are revisited often while they are corrected
+PUBLISHED_DAYS = 30.0
+
+
+def published_age(published: Optional[str], now: float) -> Optional[float]:
+    """Days since a 'Published Date' (YYYY-MM-DD), None when missing or unreadable"""
+    if not published:
+        return None
+    try:
+        day = date.fromisoformat(published[:10])
+    except ValueError:
+        return None
+    return max(0.0, (now - time.mktime(day.timetuple())) / DAY)
+
+
+class RefreshSchedule:
+    """Check history for every listed food, saved in run_refresh_schedule.json
+    
+    A food's change rate is estimated from its own history (changes seen over
+    the days it has been watched, with a prior of one change per PRIOR_DAYS)
+    plus a boost for recent publication. Its priority is the probability that
+    it changed since the last check, 1 - exp(-rate * days since the check).
+    Foods never checked come first, nothing is checked again within
+    min_interval, and anything unchecked for max_interval is due regardless.
+    """
+    
+    def __init__(self, path: str, min_interval: float = 6 * 3600, max_interval: float = 30 * DAY,
+                 save_every: int = 25):
+        self.path = path
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.save_every = save_every
+        self.data = {'version': 1, 'updated': None, 'foods': {}}
+        self._unsaved = 0
+    
+    @classmethod
+    def load(cls, path: str, **options) -> 'RefreshSchedule':
+        """Schedule from disk, a new one when it is missing or unreadable"""
+        schedule = cls(path, **options)
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    schedule.data.update(json.load(f))
+            except Exception as e:
+                print(f"WARNING: Ignoring unreadable refresh schedule ({e})")
+        return schedule
+    
+    @property
+    def foods(self) -> Dict[str, Dict[str, Any]]:
+        return self.data['foods']
+    
+    def sync(self, ndb_nos: List[str], now: Optional[float] = None) -> List[str]:
+        """Start tracking newly listed foods and mark delisted ones, returns the new NDBs"""
+        now = now or time.time()
+        listed = set(ndb_nos)
+        added = []
+        for ndb_no in ndb_nos:
+            if ndb_no not in self.foods:
+                self.foods[ndb_no] = {'first_seen': now, 'checked': None, 'checks': 0, 'changes': 0,
+                                      'failures': 0, 'last_change': None, 'published': None}
+                added.append(ndb_no)
+        for ndb_no, entry in self.foods.items():
+            entry['listed'] = ndb_no in listed
+        return added
+    
+    def change_rate(self, entry: Dict[str, Any], now: float) -> float:
+        """Expected changes per day for one food"""
+        watched = max(0.0, (now - entry['first_seen']) / DAY)
+        rate = (entry['changes'] + 1) / (watched + PRIOR_DAYS)
+        age = published_age(entry.get('published'), now)
+        if age is not None:
+            rate += 1 / (PUBLISHED_DAYS + age)
+        return rate
+    
+    def priority(self, ndb_no: str, now: Optional[float] = None) -> Optional[float]:
+        """Probability the food changed since its last check, None while it is not due"""
+        now = now or time.time()
+        entry = self.foods[ndb_no]
+        if not entry.get('listed', True):
+            return None
+        if entry['checked'] is None:
+            # Never checked: above every checked food, recently published ones first
+            age = published_age(entry.get('published'), now)
+            return 2.0 + (1 / (1 + age) if age is not None else 0.0)
+        
+        elapsed = now - entry['checked']
+        if elapsed < self.min_interval:
+            return None
+        if elapsed >= self.max_interval:
+            return 1.0
+        return 1 - math.exp(-self.change_rate(entry, now) * elapsed / DAY)
+    
+    def plan(self, now: Optional[float] = None, limit: Optional[int] = None) -> List[str]:
+        """Due foods, most likely changed first"""
+        now = now or time.time()
+        ranked = []
+        for ndb_no in self.foods:
+            score = self.priority(ndb_no, now)
+            if score is not None:
+                ranked.append((-score, ndb_no))
+        ranked.sort()
+        return [ndb_no for _, ndb_no in ranked[:limit]]
+    
+    def next_due(self, now: Optional[float] = None) -> Optional[float]:
+        """Seconds until the next listed food is due, None when none are tracked"""
+        now = now or time.time()
+        waits = [max(0.0, entry['checked'] + self.min_interval - now) if entry['checked'] is not None else 0.0
+                 for entry in self.foods.values() if entry.get('listed', True)]
+        return min(waits) if waits else None
+    
+    def record(self, ndb_no: str, changed: Optional[bool], published: Optional[str] = None,
+               now: Optional[float] = None) -> None:
+        """Note one check: changed True/False, or None when the check or scrape failed"""
+        now = now or time.time()
+        entry = self.foods[ndb_no]
+        entry['checked'] = now
+        # The first successful check only establishes the baseline
+        baseline = entry['checks'] == 0
+        if changed is None:
+            entry['failures'] += 1
+        else:
+            entry['checks'] += 1
+            entry['failures'] = 0
+        if changed and not baseline:
+            entry['changes'] += 1
+            entry['last_change'] = now
+        if published:
+            entry['published'] = published
+        
+        self._unsaved += 1
+        if self._unsaved >= self.save_every:
+            self.save()
+    
+    def counts(self, now: Optional[float] = None) -> Dict[str, int]:
+        """Listed, never checked and currently due foods"""
+        now = now or time.time()
+        listed = [ndb_no for ndb_no, entry in self.foods.items() if entry.get('listed', True)]
+        return {
+            'listed': len(listed),
+            'unchecked': sum(1 for ndb_no in listed if self.foods[ndb_no]['checked'] is None),
+            'due': sum(1 for ndb_no in listed if self.priority(ndb_no, now) is not None)
+        }
+    
+    def save(self) -> None:
+        """Persist the schedule atomically"""
+        self.data['updated'] = time.strftime('%Y-%m-%d %H:%M:%S')
+        atomic_write_json(self.path, self.data, indent=None)
+        self._unsaved = 0
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Lightweight Chrome rendering profiles for MyFCD detail pages
+Blocks resources the nutrient table does not need and measures bytes per page
+"""
+
+import threading
+from typing import Callable, Dict, List, Optional
+
+from selenium.webdriver.chrome.options import Options
+
+
+# URL patterns handed to DevTools Network.setBlockedURLs, by resource class.
+# Blocked requests never leave the browser, but <img src> and friends stay in
+# the DOM, so the product image URL is still read from page_source.
+BLOCK_PATTERNS = {
+    'images': ['*.jpg', '*.jpeg', '*.png', '*.gif', '*.webp', '*.svg', '*.ico', '*.bmp',
+               '*.JPG', '*.JPEG', '*.PNG', '*.GIF'],
+    'fonts': ['*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+              '*fonts.googleapis.com*', '*fonts.gstatic.com*', '*use.fontawesome.com*'],
+    'media': ['*.mp4', '*.webm', '*.ogg', '*.mp3', '*.wav', '*.avi', '*.mov'],
+    'analytics': ['*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+                  '*connect.facebook.net*', '*platform.twitter.com*', '*hotjar.com*',
+                  '*addthis.com*', '*sharethis.com*', '*statcounter.com*'],
+    'stylesheets': ['*.css'],
+}
+
+# Profiles are lists of blocked resource classes. Scripts served by the site
+# itself are never blocked, they compute the serving-size columns. Only the
+# third-party scripts on the 'analytics' list are blocked, not every script
+# from another origin: Network.setBlockedURLs takes block patterns only, with
+# no way to allow just the site's own origin, so any other third-party script
+# still loads unless it is added through extra_patterns.
+RENDER_PROFILES = {
+    'full': [],
+    'light': ['images', 'fonts', 'media', 'analytics'],
+    'minimal': ['images', 'fonts', 'media', 'analytics', 'stylesheets'],
+}
+
+# Content settings that never matter for scraping (2 = block)
+CONTENT_SETTING_PREFS = {
+    'profile.default_content_setting_values.notifications': 2,
+    'profile.default_content_setting_values.popups': 2,
+    'profile.default_content_setting_values.geolocation': 2,
+    'profile.default_content_setting_values.media_stream': 2,
+    'profile.default_content_setting_values.plugins': 2,
+    'profile.default_content_setting_values.automatic_downloads': 2,
+}
+
+# Bytes the page actually pulled over the network (cache hits count as 0)
+TRANSFER_SIZE_SCRIPT = """
+var total = 0;
+var nav = performance.getEntriesByType('navigation')[0];
+if (nav) { total += nav.transferSize || 0; }
+performance.getEntriesByType('resource').forEach(function (entry) {
+    total += entry.transferSize || 0;
+});
+return total;
+"""
+
+
+class RenderProfile:
+    """Chrome options, DevTools blocking and per-page byte accounting for one profile
+    
+    Blocking is by URL pattern: resource types by extension, third-party
+    scripts by the known analytics and social hosts plus extra_patterns.
+    """
+    
+    def __init__(self, name: str = 'light', extra_patterns: Optional[List[str]] = None):
+        if name not in RENDER_PROFILES:
+            raise ValueError(f"Unknown render profile '{name}', expected one of {tuple(RENDER_PROFILES)}")
+        
+        self.name = name
+        self.patterns = [pattern for resource in RENDER_PROFILES[name] for pattern in BLOCK_PATTERNS[resource]]
+        if name != 'full':
+            self.patterns.extend(extra_patterns or [])
+        
+        self.pages = 0
+        self.bytes_total = 0
+        self.baseline_full = None
+        self.baseline_blocked = None
+        self._calibrated = False
+        self._lock = threading.Lock()
+    
+    def apply_options(self, chrome_options: Options) -> None:
+        """Add the content-settings prefs to Chrome options before the driver starts"""
+        chrome_options.add_experimental_option('prefs', dict(CONTENT_SETTING_PREFS))
+    
+    def attach(self, driver) -> None:
+        """Turn on DevTools request blocking for a started driver"""
+        if not self.patterns:
+            return
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': self.patterns})
+        except Exception as e:
+            print(f"WARNING: Render profile '{self.name}' could not block requests ({e})")
+    
+    @staticmethod
+    def page_bytes(driver) -> int:
+        """Bytes transferred for the page currently loaded in driver"""
+        return int(driver.execute_script(TRANSFER_SIZE_SCRIPT) or 0)
+    
+    def calibrate(self, driver, url: str, wait: Callable[[], None]) -> None:
+        """Load url once unblocked and once blocked, both uncached, to estimate savings
+        
+        Only the first caller does any work, so a pool of drivers calibrates once.
+        """
+        with self._lock:
+            if self._calibrated or not self.patterns:
+                self._calibrated = True
+                return
+            self._calibrated = True
+        
+        try:
+            driver.execute_cdp_cmd('Network.setCacheDisabled', {'cacheDisabled': True})
+            
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': []})
+            driver.get(url)
+            wait()
+            baseline_full = self.page_bytes(driver)
+            
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': self.patterns})
+            driver.get(url)
+            wait()
+            baseline_blocked = self.page_bytes(driver)
+            
+            with self._lock:
+                self.baseline_full = baseline_full
+                self.baseline_blocked = baseline_blocked
+        except Exception as e:
+            print(f"WARNING: Render profile calibration failed ({e})")
+        finally:
+            try:
+                driver.execute_cdp_cmd('Network.setCacheDisabled', {'cacheDisabled': False})
+                driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': self.patterns})
+            except Exception:
+                pass
+    
+    @property
+    def saved_per_page(self) -> Optional[int]:
+        """Bytes the profile saves on a cold page load, from calibration"""
+        if self.baseline_full is None or self.baseline_blocked is None:
+            return None
+        return max(self.baseline_full - self.baseline_blocked, 0)
+    
+    def record_page(self, driver) -> int:
+        """Add the page currently loaded in driver to the totals, returns its bytes"""
+        try:
+            page_bytes = self.page_bytes(driver)
+        except Exception:
+            return 0
+        self.add_page(page_bytes)
+        return page_bytes
+    
+    def add_page(self, page_bytes: int) -> None:
+        """Add one page measured elsewhere (TRANSFER_SIZE_SCRIPT) to the totals"""
+        with self._lock:
+            self.pages += 1
+            self.bytes_total += page_bytes
+    
+    def stats(self) -> Dict[str, Optional[int]]:
+        """Page count, bytes transferred and calibrated savings"""
+        with self._lock:
+            return {
+                'profile': self.name,
+                'pages': self.pages,
+                'bytes_total': self.bytes_total,
+                'bytes_per_page': self.bytes_total // self.pages if self.pages else 0,
+                'saved_per_page': self.saved_per_page,
+            }
+    
+    def summary(self) -> str:
+        """One-line report for the end of a run"""
+        stats = self.stats()
+        line = (f"Render profile ({stats['profile']}): {stats['pages']} pages, "
+                f"{stats['bytes_per_page'] / 1024:.1f} KB/page transferred")
+        if stats['saved_per_page'] is not None:
+            line += f", ~{stats['saved_per_page'] / 1024:.1f} KB/page saved vs full render"
+        return line
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Persistent run manifest for MyFCD scraping
+Records the listing snapshot and per-food status so an interrupted run can resume
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+
+MANIFEST_FILE = "run_manifest.json"
+
+
+def atomic_write_json(path: str, data: Any, indent: Optional[int] = 2) -> None:
+    """Write JSON to a temp file in the same folder, fsync it and rename over path
+    
+    A crash leaves either the old file or the new one, never a truncated file.
+    Each write has its own temp file, so two writers of one path (a re-leased
+    food saved by two queue workers) never rename each other's half-written data.
+    """
+    folder, name = os.path.split(path)
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=folder or '.', prefix=f".{name}.",
+                                     suffix='.tmp', delete=False) as f:
+        tmp_path = f.name
+        try:
+            json.dump(data, f, indent=indent, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        except BaseException:
+            f.close()
+            os.remove(tmp_path)
+            raise
+    os.replace(tmp_path, path)
+
+
+class RunManifest:
+    """Listing snapshot plus status, attempt count and timestamps for every NDB"""
+    
+    def __init__(self, path: str, save_every: int = 25, save_interval: float = 30.0):
+        self.path = path
+        self.save_every = save_every
+        self.save_interval = save_interval
+        
+        now = time.strftime('%Y-%m-%d %H:%M:%S')
+        self.data = {
+            'version': 1,
+            'source': '',
+            'created': now,
+            'updated': now,
+            'listing': [],
+            'items': {}
+        }
+        
+        self._unsaved = 0
+        self._last_save = time.time()
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def load(cls, path: str) -> Optional['RunManifest']:
+        """Read a manifest from disk, None if it is missing or unreadable"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"WARNING: Ignoring unreadable run manifest ({e})")
+            return None
+        
+        manifest = cls(path)
+        manifest.data.update(data)
+        return manifest
+    
+    @property
+    def listing(self) -> List[Dict[str, str]]:
+        """Food list saved when the run started"""
+        return self.data['listing']
+    
+    def set_listing(self, food_list: List[Dict[str, str]], source: str) -> None:
+        """Snapshot the listing and mark every food pending"""
+        with self._lock:
+            self.data['source'] = source
+            self.data['listing'] = list(food_list)
+            for food_item in food_list:
+                self.data['items'].setdefault(food_item['ndb_no'], {
+                    'status': 'pending',
+                    'attempts': 0,
+                    'first_attempt': None,
+                    'last_attempt': None,
+                    'error': None
+                })
+    
+    def record(self, ndb_no: str, status: str, error: Optional[str] = None, attempted: bool = True) -> None:
+        """Update one food's status ('done', 'failed' or 'pending') and save periodically
+        
+        attempted=False marks foods that were already on disk without counting a new attempt.
+        """
+        now = time.strftime('%Y-%m-%d %H:%M:%S')
+        with self._lock:
+            item = self.data['items'].setdefault(ndb_no, {
+                'status': 'pending', 'attempts': 0, 'first_attempt': None, 'last_attempt': None, 'error': None
+            })
+            item['status'] = status
+            item['error'] = error
+            if attempted:
+                item['attempts'] += 1
+                item['first_attempt'] = item['first_attempt'] or now
+                item['last_attempt'] = now
+            self._unsaved += 1
+            due = self._unsaved >= self.save_every or time.time() - self._last_save >= self.save_interval
+        
+        if due:
+            self.save()
+    
+    def status(self, ndb_no: str) -> Optional[str]:
+        """Current status of one food, None if it is not in the manifest"""
+        item = self.data['items'].get(ndb_no)
+        return item['status'] if item else None
+    
+    def counts(self) -> Dict[str, int]:
+        """Number of foods in each status"""
+        counts = {'pending': 0, 'done': 0, 'failed': 0}
+        with self._lock:
+            for item in self.data['items'].values():
+                counts[item['status']] = counts.get(item['status'], 0) + 1
+        return counts
+    
+    def save(self) -> None:
+        """Persist the manifest atomically"""
+        with self._lock:
+            self.data['updated'] = time.strftime('%Y-%m-%d %H:%M:%S')
+            atomic_write_json(self.path, self.data)
+            self._unsaved = 0
+            self._last_save = time.time()
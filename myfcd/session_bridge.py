@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Selenium to requests session bridge for MyFCD scraping
+One browser visit collects the cookies, user agent and CSRF token the site sets, so HTTP requests can carry them
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import requests
+from bs4 import BeautifulSoup
+
+from .run_manifest import atomic_write_json
+
+
+SESSION_FILE = "run_session.json"
+
+# Responses that mean the site no longer accepts the session
+REJECTED_STATUSES = (401, 403, 419, 440)
+
+# Hidden form fields and meta tags that carry a CSRF token
+CSRF_FIELDS = ('ci_csrf_token', 'csrf_test_name', 'csrf_token', '_token', '_csrf', 'authenticity_token')
+CSRF_META = ('csrf-token', 'csrf_token', '_csrf')
+
+
+def find_csrf(page_source: str) -> Optional[Dict[str, str]]:
+    """CSRF token in a page as {'name', 'value', 'header'}, None when there is none"""
+    soup = BeautifulSoup(page_source, 'html.parser')
+    for name in CSRF_META:
+        meta = soup.find('meta', attrs={'name': name})
+        if meta and meta.get('content'):
+            return {'name': name, 'value': meta['content'], 'header': 'X-CSRF-Token'}
+    for name in CSRF_FIELDS:
+        field = soup.find('input', attrs={'name': name})
+        if field and field.get('value'):
+            return {'name': name, 'value': field['value'], 'header': 'X-CSRF-Token'}
+    return None
+
+
+class SessionBridge:
+    """Browser session state shared by every HTTP request of an edition
+    
+    handshake() opens start_url once in a browser from driver_factory and keeps
+    its cookies, navigator.userAgent and any CSRF token in run_session.json.
+    Each process and thread applies that state to its requests.Session, so the
+    browser is only needed again when the state expires (ttl seconds, or the
+    earliest cookie expiry) or the site rejects it. A lock file makes sure only
+    one process runs the handshake; the others pick up its result from disk.
+    """
+    
+    def __init__(self, path: str, start_url: str, driver_factory: Callable[[], Any],
+                 ttl: float = 1800.0, lock_timeout: float = 120.0):
+        self.path = path
+        self.start_url = start_url
+        self.driver_factory = driver_factory
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.state = None
+        self.handshakes = 0
+        self.refreshes = 0
+        self._lock = threading.Lock()
+        # Sessions that already carry the current state's cookies
+        self._applied = {}
+    
+    def _valid(self, state: Optional[Dict[str, Any]]) -> bool:
+        return bool(state) and state.get('expires', 0) > time.time()
+    
+    def _load(self) -> Optional[Dict[str, Any]]:
+        """State saved by any process, None when missing, unreadable or expired"""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except Exception as e:
+            print(f"WARNING: Ignoring unreadable session file ({e})")
+            return None
+        return state if self._valid(state) else None
+    
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """Hold <path>.lock, taking over a lock left behind by a process that died mid-handshake"""
+        lock_path = f"{self.path}.lock"
+        deadline = time.time() + self.lock_timeout
+        while True:
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.close(fd)
+                break
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(lock_path) > self.lock_timeout:
+                        os.remove(lock_path)
+                        continue
+                except OSError:
+                    continue
+                if time.time() > deadline:
+                    raise TimeoutError(f"session handshake lock {lock_path} held too long")
+                time.sleep(0.5)
+        try:
+            yield
+        finally:
+            try:
+                os.remove(lock_path)
+            except OSError:
+                pass
+    
+    def handshake(self) -> Dict[str, Any]:
+        """Visit start_url in a fresh browser and return the session state it ends up with"""
+        print(f" Session handshake: opening {self.start_url} in Chrome...")
+        driver = self.driver_factory()
+        try:
+            driver.get(self.start_url)
+            cookies = driver.get_cookies()
+            user_agent = driver.execute_script("return navigator.userAgent")
+            csrf = find_csrf(driver.page_source)
+        finally:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        
+        created = time.time()
+        expires = created + self.ttl
+        for cookie in cookies:
+            if cookie.get('expiry'):
+                # A minute early, so no request goes out with a cookie about to lapse
+                expires = min(expires, cookie['expiry'] - 60)
+        self.handshakes += 1
+        print(f" Session handshake: {len(cookies)} cookies{', CSRF token' if csrf else ''}, "
+              f"valid for {max(0, expires - created) / 60:.0f} minutes")
+        return {'created': created, 'expires': expires, 'start_url': self.start_url,
+                'user_agent': user_agent, 'cookies': cookies, 'csrf': csrf}
+    
+    def _renew(self, stale: Optional[Dict[str, Any]]) -> None:
+        """Replace stale state, reusing a newer one another process saved meanwhile"""
+        with self._file_lock():
+            state = self._load()
+            if state is None or (stale and state['created'] <= stale['created']):
+                state = self.handshake()
+                atomic_write_json(self.path, state)
+                try:
+                    os.chmod(self.path, 0o600)
+                except OSError:
+                    pass
+        self.state = state
+    
+    def _apply(self, session: requests.Session) -> None:
+        if self._applied.get(id(session)) == self.state['created']:
+            return
+        for cookie in self.state['cookies']:
+            session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain', ''),
+                                path=cookie.get('path', '/'), secure=cookie.get('secure', False))
+        self._applied[id(session)] = self.state['created']
+    
+    def ensure(self, session: requests.Session) -> Dict[str, Any]:
+        """Make session carry valid browser cookies, returns the state used"""
+        with self._lock:
+            if not self._valid(self.state):
+                self.state = self._load()
+                if self.state is None:
+                    self._renew(None)
+            self._apply(session)
+            return self.state
+    
+    def refresh(self, session: requests.Session, stale: Dict[str, Any]) -> Dict[str, Any]:
+        """Renew the state after the site rejected stale, once however many threads ask"""
+        with self._lock:
+            if self.state is stale or not self._valid(self.state):
+                self.refreshes += 1
+                self._renew(stale)
+            self._apply(session)
+            return self.state
+    
+    @staticmethod
+    def headers(state: Dict[str, Any]) -> Dict[str, str]:
+        """Per-request headers for state: the browser's user agent, referer and CSRF header"""
+        headers = {'Referer': state['start_url']}
+        if state.get('user_agent'):
+            headers['User-Agent'] = state['user_agent']
+        if state.get('csrf'):
+            headers[state['csrf']['header']] = state['csrf']['value']
+        return headers
+    
+    @staticmethod
+    def form_fields(state: Dict[str, Any]) -> Dict[str, str]:
+        """CSRF field for POST bodies, empty when the site has no token"""
+        csrf = state.get('csrf')
+        return {csrf['name']: csrf['value']} if csrf else {}
+    
+    @staticmethod
+    def rejected(status: int) -> bool:
+        """True when a response status means the session was not accepted"""
+        return status in REJECTED_STATUSES
+    
+    def summary(self) -> str:
+        """One-line report for the end of a run"""
+        return (f"Session bridge: {self.handshakes} browser handshakes in this process, "
+                f"{self.refreshes} refreshes after rejection")
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Deterministic sharding of a MyFCD scrape across processes or machines, and merging of the shard outputs
+Every shard lists the whole catalogue and keeps the foods whose NDB hashes to it
+"""
+
+import hashlib
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .failures import RETRY_QUEUE_FILE, RetryQueue
+from .record_store import RecordReader, is_valid_record, open_record_store
+from .run_manifest import MANIFEST_FILE, RunManifest, atomic_write_json
+
+
+MERGE_REPORT_FILE = "run_merge_report.json"
+
+SHARD_DIR_PATTERN = re.compile(r'^shard-(\d+)-of-(\d+)$')
+
+
+def parse_shard(text: str) -> Tuple[int, int]:
+    """'i/N' -> (i, N), shards are numbered 1..N"""
+    match = re.match(r'^\s*(\d+)\s*/\s*(\d+)\s*$', text or '')
+    if not match:
+        raise ValueError(f"shard must look like i/N, got {text!r}")
+    index, count = int(match.group(1)), int(match.group(2))
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"shard {text!r} is out of range, expected 1/N to N/N")
+    return index, count
+
+
+def shard_of(ndb_no: str, count: int) -> int:
+    """Shard 1..count that owns ndb_no, the same on every machine and Python version"""
+    digest = hashlib.sha1(ndb_no.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % count + 1
+
+
+def shard_dir(output_dir: str, index: int, count: int) -> str:
+    """Folder a shard writes to, inside the edition's datasets folder"""
+    return os.path.join(output_dir, f"shard-{index}-of-{count}")
+
+
+def find_shard_dirs(datasets_dir: str) -> Tuple[Dict[int, str], int]:
+    """Shard folders under datasets_dir by index, plus the shard count they agree on"""
+    found = {}
+    counts = set()
+    for entry in sorted(os.listdir(datasets_dir)):
+        match = SHARD_DIR_PATTERN.match(entry)
+        if match and os.path.isdir(os.path.join(datasets_dir, entry)):
+            found[int(match.group(1))] = os.path.join(datasets_dir, entry)
+            counts.add(int(match.group(2)))
+    if len(counts) > 1:
+        raise ValueError(f"shard folders from different splits ({', '.join(map(str, sorted(counts)))} shards), "
+                         f"merge one split at a time")
+    return found, counts.pop() if counts else 0
+
+
+def merge_shards(datasets_dir: str, dest_dir: Optional[str] = None, store: str = 'files') -> Dict[str, Any]:
+    """Combine the shard-i-of-N folders under datasets_dir into one dataset in dest_dir
+    
+    Records, manifests and retry queues are merged. A food saved by more than
+    one shard is an overlap and the copy from the shard that owns it wins. A
+    listed food that no shard saved is a gap. Shards that listed a different
+    catalogue are reported too. Everything is written to run_merge_report.json,
+    which is also returned.
+    """
+    dest_dir = dest_dir or datasets_dir
+    shard_dirs, count = find_shard_dirs(datasets_dir)
+    if not shard_dirs:
+        raise ValueError(f"no shard-i-of-N folders in {datasets_dir}")
+    
+    listing = OrderedDict()
+    listings = {}
+    manifests = {}
+    owners: Dict[str, List[int]] = {}
+    records: Dict[Tuple[int, str], Dict[str, Any]] = {}
+    unreadable = []
+    retry_pending, retry_gave_up = {}, {}
+    
+    for index, path in sorted(shard_dirs.items()):
+        manifest = RunManifest.load(os.path.join(path, MANIFEST_FILE))
+        manifests[index] = manifest
+        if manifest and manifest.listing:
+            listings[index] = sorted(food_item['ndb_no'] for food_item in manifest.listing)
+            for food_item in manifest.listing:
+                listing.setdefault(food_item['ndb_no'], food_item)
+        
+        reader = RecordReader(path)
+        for name in reader.names():
+            try:
+                data = reader.load(name)
+            except Exception as e:
+                unreadable.append(f"shard {index}: {name}: {e}")
+                continue
+            if not is_valid_record(data):
+                unreadable.append(f"shard {index}: {name}: not a valid record")
+                continue
+            owners.setdefault(data['NDB No'], []).append(index)
+            records[(index, data['NDB No'])] = data
+        
+        retry_queue = RetryQueue.load(os.path.join(path, RETRY_QUEUE_FILE))
+        retry_pending.update(retry_queue.pending)
+        retry_gave_up.update(retry_queue.gave_up)
+    
+    # Shards that listed a different catalogue snapshot than the first one
+    reference = next(iter(listings.values()), [])
+    listing_mismatch = [index for index, ndbs in sorted(listings.items()) if ndbs != reference]
+    
+    overlaps = {}
+    chosen = {}
+    for ndb_no, shards in owners.items():
+        owner = shard_of(ndb_no, count)
+        chosen[ndb_no] = owner if owner in shards else shards[0]
+        if len(shards) > 1:
+            overlaps[ndb_no] = {'shards': shards, 'owner': owner, 'kept': chosen[ndb_no]}
+    
+    gaps = {}
+    for ndb_no in listing:
+        if ndb_no in chosen:
+            continue
+        owner = shard_of(ndb_no, count)
+        manifest = manifests.get(owner)
+        status = manifest.status(ndb_no) if manifest else None
+        gaps[ndb_no] = {'shard': owner, 'status': status or ('shard missing' if owner not in shard_dirs else 'not attempted')}
+    
+    # Records, in listing order, then any saved food the listings did not have
+    record_store = open_record_store(store, dest_dir)
+    for ndb_no in list(listing) + [ndb_no for ndb_no in chosen if ndb_no not in listing]:
+        if ndb_no in chosen:
+            record_store.write(records[(chosen[ndb_no], ndb_no)])
+    record_store.close()
+    
+    merged = RunManifest(os.path.join(dest_dir, MANIFEST_FILE))
+    source = next((manifest.data.get('source', '') for manifest in manifests.values() if manifest), '')
+    merged.set_listing(list(listing.values()), source)
+    for ndb_no in listing:
+        manifest = manifests.get(shard_of(ndb_no, count))
+        item = manifest.data['items'].get(ndb_no) if manifest else None
+        if item:
+            merged.data['items'][ndb_no] = dict(item)
+    for ndb_no, index in chosen.items():
+        item = merged.data['items'].setdefault(ndb_no, {'attempts': 0, 'first_attempt': None,
+                                                         'last_attempt': None})
+        item.update(status='done', error=None)
+    merged.save()
+    
+    # Failures still waiting for a retry carry over, unless another shard saved the food
+    retry_queue = RetryQueue(os.path.join(dest_dir, RETRY_QUEUE_FILE))
+    retry_queue.pending = {ndb_no: entry for ndb_no, entry in retry_pending.items() if ndb_no not in chosen}
+    retry_queue.gave_up = {ndb_no: entry for ndb_no, entry in retry_gave_up.items() if ndb_no not in chosen}
+    retry_queue.save()
+    
+    report = {
+        'merged': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'shard_count': count,
+        'shards_found': sorted(shard_dirs),
+        'shards_missing': [index for index in range(1, count + 1) if index not in shard_dirs],
+        'listing_size': len(listing),
+        'listing_mismatch': listing_mismatch,
+        'records': len(chosen),
+        'records_per_shard': {str(index): sum(1 for shards in owners.values() if index in shards)
+                              for index in sorted(shard_dirs)},
+        'overlaps': overlaps,
+        'gaps': gaps,
+        'unreadable': unreadable,
+    }
+    atomic_write_json(os.path.join(dest_dir, MERGE_REPORT_FILE), report)
+    return report
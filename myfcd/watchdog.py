@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Chrome driver watchdog for MyFCD scraping
+Kills drivers that hang mid-page and recycles them after a page budget or when their memory grows too large
+"""
+
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def _descendant_pids(pid: int) -> List[int]:
+    """Child processes of pid, recursively (chromedriver -> Chrome -> renderers)"""
+    if psutil is not None:
+        try:
+            return [child.pid for child in psutil.Process(pid).children(recursive=True)]
+        except psutil.Error:
+            return []
+    
+    # Without psutil, walk /proc where it exists (Linux)
+    if not os.path.isdir('/proc'):
+        return []
+    parents = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as f:
+                # The command name may contain spaces, the parent pid follows its closing paren
+                parents[int(entry)] = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+    
+    found, frontier = [], [pid]
+    while frontier:
+        parent = frontier.pop()
+        children = [child for child, ppid in parents.items() if ppid == parent]
+        found.extend(children)
+        frontier.extend(children)
+    return found
+
+
+def _rss_bytes(pid: int) -> Optional[int]:
+    """Resident memory of one process, None when it cannot be read"""
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.Error:
+            return None
+    try:
+        with open(f'/proc/{pid}/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        return None
+    return None
+
+
+def _driver_pid(driver) -> Optional[int]:
+    """Process id of the chromedriver behind a WebDriver"""
+    try:
+        return driver.service.process.pid
+    except AttributeError:
+        return None
+
+
+def browser_rss(driver) -> Optional[int]:
+    """Resident memory of chromedriver and every Chrome process under it, None if unknown"""
+    pid = _driver_pid(driver)
+    if pid is None:
+        return None
+    sizes = [_rss_bytes(p) for p in [pid] + _descendant_pids(pid)]
+    sizes = [size for size in sizes if size is not None]
+    return sum(sizes) if sizes else None
+
+
+class DriverWatchdog:
+    """Hang detection and recycling for every driver of a run
+    
+    Page work runs inside guard(driver). A monitor thread kills the browser's
+    process tree when a guarded call runs past hang_timeout, so the blocked
+    WebDriver call fails at once instead of after Selenium's own timeouts.
+    After each page, after_page() asks for a recycle once the driver has
+    served max_pages pages or its process tree passes max_rss_mb (checked
+    every rss_every pages, via psutil or /proc; skipped where neither works).
+    """
+    
+    def __init__(self, max_pages: int = 500, max_rss_mb: float = 1500.0, hang_timeout: float = 90.0,
+                 rss_every: int = 10):
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.hang_timeout = hang_timeout
+        self.rss_every = rss_every
+        
+        self.recycled = {'pages': 0, 'memory': 0}
+        self.hangs = 0
+        self.requeued = 0
+        self.peak_rss = 0
+        # id(driver) -> pages served since the driver started
+        self._pages: Dict[int, int] = {}
+        # id(driver) -> (driver, deadline) for calls in progress
+        self._active: Dict[int, tuple] = {}
+        self._killed = set()
+        self._lock = threading.Lock()
+        self._monitor = None
+    
+    def _ensure_monitor(self) -> None:
+        if self._monitor is None or not self._monitor.is_alive():
+            self._monitor = threading.Thread(target=self._watch, name="driver-watchdog", daemon=True)
+            self._monitor.start()
+    
+    def _watch(self) -> None:
+        """Monitor thread: kill every guarded driver that is past its deadline"""
+        while True:
+            time.sleep(min(5.0, max(self.hang_timeout / 4, 0.1)))
+            now = time.time()
+            with self._lock:
+                overdue = [(key, driver) for key, (driver, deadline) in self._active.items() if now > deadline]
+                for key, _ in overdue:
+                    del self._active[key]
+                    self._killed.add(key)
+                    self.hangs += 1
+            for _, driver in overdue:
+                print(f"    WARNING: Browser unresponsive for {self.hang_timeout:.0f}s, killing it")
+                self.kill(driver)
+    
+    @staticmethod
+    def kill(driver) -> None:
+        """Kill chromedriver and all of its Chrome processes"""
+        pid = _driver_pid(driver)
+        if pid is None:
+            return
+        for target in _descendant_pids(pid) + [pid]:
+            try:
+                os.kill(target, signal.SIGKILL if hasattr(signal, 'SIGKILL') else signal.SIGTERM)
+            except OSError:
+                pass
+    
+    @contextmanager
+    def guard(self, driver):
+        """Kill driver if the enclosed WebDriver calls take longer than hang_timeout"""
+        key = id(driver)
+        with self._lock:
+            self._killed.discard(key)
+            self._active[key] = (driver, time.time() + self.hang_timeout)
+            self._ensure_monitor()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active.pop(key, None)
+    
+    def note_requeue(self) -> None:
+        """Count a page retried on a fresh driver after its browser died"""
+        with self._lock:
+            self.requeued += 1
+    
+    def killed(self, driver) -> bool:
+        """True when the watchdog killed driver during its last guarded call"""
+        with self._lock:
+            return id(driver) in self._killed
+    
+    def after_page(self, driver) -> Optional[str]:
+        """Count a served page, returns why driver should be recycled or None"""
+        key = id(driver)
+        with self._lock:
+            pages = self._pages.get(key, 0) + 1
+            self._pages[key] = pages
+        
+        if self.max_pages and pages >= self.max_pages:
+            with self._lock:
+                self.recycled['pages'] += 1
+            return f"served {pages} pages"
+        
+        if self.max_rss_mb and pages % self.rss_every == 0:
+            rss = browser_rss(driver)
+            if rss is not None:
+                with self._lock:
+                    self.peak_rss = max(self.peak_rss, rss)
+                if rss > self.max_rss_mb * 1024 * 1024:
+                    with self._lock:
+                        self.recycled['memory'] += 1
+                    return f"using {rss / 1024 / 1024:.0f}MB"
+        return None
+    
+    def forget(self, driver) -> None:
+        """Drop the counters of a driver that was quit"""
+        key = id(driver)
+        with self._lock:
+            self._pages.pop(key, None)
+            self._killed.discard(key)
+    
+    def summary(self) -> str:
+        """One-line report for the end of a run"""
+        with self._lock:
+            line = (f"Driver watchdog: {self.recycled['pages']} recycled after {self.max_pages} pages, "
+                    f"{self.recycled['memory']} over {self.max_rss_mb:g}MB, {self.hangs} hangs killed, "
+                    f"{self.requeued} pages requeued")
+            if self.peak_rss:
+                line += f", peak browser memory {self.peak_rss / 1024 / 1024:.0f}MB"
+        return line
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+SQLite lease queue for MyFCD scraping
+Any number of worker processes lease foods, heartbeat while they work and ack or nack them; expired leases go back to pending
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional
+
+
+WORK_QUEUE_FILE = "run_work_queue.sqlite"
+
+QUEUE_STATUSES = ('pending', 'leased', 'done', 'failed')
+
+
+def default_worker_id() -> str:
+    """Worker name unique across the machines and processes sharing a queue"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class WorkQueue:
+    """Foods to scrape in a SQLite file, handed out under time-limited leases
+    
+    Every food is pending, leased, done or failed. lease() hands out the
+    oldest due pending foods and stamps them with the worker and an expiry
+    visibility seconds away; heartbeat() pushes the expiry out while the
+    worker is still busy. A lease that expires (the worker died or hung) is
+    reclaimed by the next lease() call and the food goes back to pending.
+    nack() requeues a failed food with exponential backoff until it has used
+    max_attempts, then marks it failed. Status counts live in their own table,
+    kept up to date by triggers, so status() is O(1) however long the queue.
+    Every process opens its own WorkQueue; SQLite's WAL mode and IMMEDIATE
+    transactions keep two workers from leasing the same food.
+    """
+    
+    def __init__(self, path: str, max_attempts: int = 4, base_delay: float = 10.0, max_delay: float = 300.0):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        with self._transaction():
+            # due_at is when a pending food may be leased, or when a lease expires
+            self._db.execute('''
+                CREATE TABLE IF NOT EXISTS items (
+                    ndb_no TEXT PRIMARY KEY,
+                    food_item TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    due_at REAL NOT NULL DEFAULT 0,
+                    lease_owner TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    reclaims INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+            self._db.execute('CREATE INDEX IF NOT EXISTS items_due ON items (status, due_at)')
+            self._db.execute('CREATE TABLE IF NOT EXISTS counts (status TEXT PRIMARY KEY, n INTEGER NOT NULL)')
+            for status in QUEUE_STATUSES:
+                self._db.execute('INSERT OR IGNORE INTO counts VALUES (?, 0)', (status,))
+            self._db.execute('''
+                CREATE TRIGGER IF NOT EXISTS items_insert AFTER INSERT ON items BEGIN
+                    UPDATE counts SET n = n + 1 WHERE status = NEW.status;
+                END
+            ''')
+            self._db.execute('''
+                CREATE TRIGGER IF NOT EXISTS items_update AFTER UPDATE OF status ON items
+                WHEN OLD.status != NEW.status BEGIN
+                    UPDATE counts SET n = n - 1 WHERE status = OLD.status;
+                    UPDATE counts SET n = n + 1 WHERE status = NEW.status;
+                END
+            ''')
+            self._db.execute('''
+                CREATE TRIGGER IF NOT EXISTS items_delete AFTER DELETE ON items BEGIN
+                    UPDATE counts SET n = n - 1 WHERE status = OLD.status;
+                END
+            ''')
+    
+    @contextmanager
+    def _transaction(self):
+        """BEGIN IMMEDIATE ... COMMIT, so concurrent leases serialise on the write lock"""
+        self._db.execute('BEGIN IMMEDIATE')
+        try:
+            yield self._db
+        except BaseException:
+            self._db.execute('ROLLBACK')
+            raise
+        self._db.execute('COMMIT')
+    
+    def seed(self, food_items: Iterable[Dict[str, str]], requeue_failed: bool = False) -> int:
+        """Add foods that are not queued yet, returns how many were added
+        
+        Foods already in the queue keep their status; requeue_failed puts failed
+        ones back to pending with a fresh attempt count.
+        """
+        now = time.time()
+        rows = [(food_item['ndb_no'], json.dumps(food_item, ensure_ascii=False), now) for food_item in food_items]
+        with self._lock, self._transaction() as db:
+            before = db.execute('SELECT SUM(n) FROM counts').fetchone()[0]
+            db.executemany('INSERT OR IGNORE INTO items (ndb_no, food_item, updated_at) VALUES (?, ?, ?)', rows)
+            added = db.execute('SELECT SUM(n) FROM counts').fetchone()[0] - before
+            if requeue_failed:
+                db.execute("UPDATE items SET status = 'pending', due_at = 0, attempts = 0, error = NULL, "
+                           "updated_at = ? WHERE status = 'failed'", (now,))
+        return added
+    
+    def _reclaim(self, db: sqlite3.Connection, now: float) -> int:
+        cursor = db.execute("UPDATE items SET status = 'pending', lease_owner = NULL, due_at = ?, "
+                            "reclaims = reclaims + 1, updated_at = ? WHERE status = 'leased' AND due_at < ?",
+                            (now, now, now))
+        return cursor.rowcount
+    
+    def reclaim(self) -> int:
+        """Return every expired lease to pending, returns how many there were"""
+        with self._lock, self._transaction() as db:
+            return self._reclaim(db, time.time())
+    
+    def lease(self, worker_id: str, count: int = 1, visibility: float = 300.0) -> List[Dict[str, str]]:
+        """Lease up to count due foods for visibility seconds, oldest first
+        
+        Expired leases are reclaimed first, so foods held by dead workers are
+        handed out again.
+        """
+        now = time.time()
+        with self._lock, self._transaction() as db:
+            self._reclaim(db, now)
+            rows = db.execute("SELECT ndb_no, food_item FROM items "
+                              "WHERE status = 'pending' AND due_at <= ? ORDER BY due_at LIMIT ?",
+                              (now, count)).fetchall()
+            db.executemany("UPDATE items SET status = 'leased', lease_owner = ?, due_at = ?, updated_at = ? "
+                           "WHERE ndb_no = ?", [(worker_id, now + visibility, now, row[0]) for row in rows])
+        return [json.loads(food_item) for _, food_item in rows]
+    
+    def heartbeat(self, worker_id: str, ndb_nos: Iterable[str], visibility: float = 300.0) -> List[str]:
+        """Extend worker_id's leases on ndb_nos, returns the ones it still holds"""
+        ndb_nos = list(ndb_nos)
+        if not ndb_nos:
+            return []
+        now = time.time()
+        held = []
+        with self._lock, self._transaction() as db:
+            for ndb_no in ndb_nos:
+                cursor = db.execute("UPDATE items SET due_at = ?, updated_at = ? "
+                                    "WHERE ndb_no = ? AND status = 'leased' AND lease_owner = ?",
+                                    (now + visibility, now, ndb_no, worker_id))
+                if cursor.rowcount:
+                    held.append(ndb_no)
+        return held
+    
+    def ack(self, worker_id: str, ndb_no: str) -> bool:
+        """Mark a food done, returns False if its lease had already been reclaimed
+        
+        The food is marked done either way, its record is saved.
+        """
+        now = time.time()
+        with self._lock, self._transaction() as db:
+            row = db.execute('SELECT status, lease_owner FROM items WHERE ndb_no = ?', (ndb_no,)).fetchone()
+            db.execute("UPDATE items SET status = 'done', lease_owner = NULL, error = NULL, "
+                       "attempts = attempts + 1, updated_at = ? WHERE ndb_no = ? AND status != 'done'",
+                       (now, ndb_no))
+        return bool(row) and row[0] == 'leased' and row[1] == worker_id
+    
+    def nack(self, worker_id: str, ndb_no: str, error: str) -> Optional[str]:
+        """Give a failed food back, returns its new status ('pending' or 'failed')
+        
+        Nothing changes (and None is returned) when worker_id no longer holds the lease.
+        """
+        now = time.time()
+        with self._lock, self._transaction() as db:
+            row = db.execute("SELECT attempts FROM items WHERE ndb_no = ? AND status = 'leased' AND lease_owner = ?",
+                             (ndb_no, worker_id)).fetchone()
+            if row is None:
+                return None
+            attempts = row[0] + 1
+            if attempts >= self.max_attempts:
+                status, due_at = 'failed', now
+            else:
+                status, due_at = 'pending', now + min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+            db.execute('UPDATE items SET status = ?, due_at = ?, lease_owner = NULL, attempts = ?, error = ?, '
+                       'updated_at = ? WHERE ndb_no = ?', (status, due_at, attempts, error, now, ndb_no))
+        return status
+    
+    def release(self, worker_id: str, ndb_nos: Iterable[str]) -> None:
+        """Hand unstarted leases back without counting an attempt (worker shutting down)"""
+        now = time.time()
+        with self._lock, self._transaction() as db:
+            db.executemany("UPDATE items SET status = 'pending', lease_owner = NULL, due_at = ?, updated_at = ? "
+                           "WHERE ndb_no = ? AND status = 'leased' AND lease_owner = ?",
+                           [(now, now, ndb_no, worker_id) for ndb_no in ndb_nos])
+    
+    def status(self) -> Dict[str, int]:
+        """Foods in each status, read from the counts table"""
+        with self._lock:
+            counts = dict(self._db.execute('SELECT status, n FROM counts').fetchall())
+        return {status: counts.get(status, 0) for status in QUEUE_STATUSES}
+    
+    def next_due_in(self) -> Optional[float]:
+        """Seconds until a pending food or an expiring lease can be handed out, None when neither exists"""
+        with self._lock:
+            due = [self._db.execute('SELECT MIN(due_at) FROM items WHERE status = ?', (status,)).fetchone()[0]
+                   for status in ('pending', 'leased')]
+        due = [value for value in due if value is not None]
+        return max(0.0, min(due) - time.time()) if due else None
+    
+    def failures(self) -> List[Dict[str, Any]]:
+        """Failed foods with their last error"""
+        with self._lock:
+            rows = self._db.execute("SELECT ndb_no, attempts, error FROM items WHERE status = 'failed' "
+                                    "ORDER BY ndb_no").fetchall()
+        return [{'ndb_no': ndb_no, 'attempts': attempts, 'error': error} for ndb_no, attempts, error in rows]
+    
+    def close(self) -> None:
+        """Close the database connection"""
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Continuous refresh daemon for one MyFCD edition
+Checks the foods most likely to have changed first, within an hourly request budget, until stopped or a deadline
+"""
+
+import argparse
+import re
+import time
+from datetime import datetime, timedelta
+
+from myfcd.cli import add_scrape_options, build_cache, check_rate_bounds, default_cache_dir, engine_options
+from myfcd.engine import ScraperEngine
+from myfcd.profiles import SITE_PROFILES
+
+
+def deadline_option(text: str) -> float:
+    """argparse type for --deadline: a clock time HH:MM or a duration like 90m or 2h, as an epoch time"""
+    clock = re.fullmatch(r'(\d{1,2}):(\d{2})', text)
+    if clock:
+        now = datetime.now()
+        at = now.replace(hour=int(clock.group(1)), minute=int(clock.group(2)), second=0, microsecond=0)
+        if at <= now:
+            at += timedelta(days=1)
+        return at.timestamp()
+    duration = re.fullmatch(r'(\d+(?:\.\d+)?)\s*([smh])', text)
+    if duration:
+        return time.time() + float(duration.group(1)) * {'s': 1, 'm': 60, 'h': 3600}[duration.group(2)]
+    raise argparse.ArgumentTypeError("expected a clock time (HH:MM) or a duration (e.g. 45m, 2h)")
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Keep a MyFCD edition's records fresh within a request budget")
+    parser.add_argument('--edition', choices=sorted(SITE_PROFILES), default='current',
+                        help="edition to keep fresh (default: current)")
+    parser.add_argument('--budget', type=float, default=120,
+                        help="requests per hour, spread evenly; a re-scrape counts as a second request (default: 120)")
+    parser.add_argument('--deadline', type=deadline_option, default=None,
+                        help="stop at this clock time (HH:MM) or after this long (e.g. 45m, 2h); "
+                             "runs until interrupted otherwise")
+    parser.add_argument('--relist-hours', type=float, default=24,
+                        help="re-read the listing for new and removed foods this often (default: 24)")
+    parser.add_argument('--min-interval-hours', type=float, default=6,
+                        help="never check the same food twice within this many hours (default: 6)")
+    add_scrape_options(parser, cache_dir=None)
+    
+    args = parser.parse_args()
+    if args.shard or args.resume or args.refresh or args.images or args.workers != 1:
+        parser.error("--shard, --resume, --refresh, --images and --workers do not apply to the daemon")
+    check_rate_bounds(parser, args, ceiling=SITE_PROFILES[args.edition].max_rate)
+    if args.cache_dir is None:
+        args.cache_dir = default_cache_dir(SITE_PROFILES[args.edition].output_dir)
+    return args
+
+
+def main():
+    """Run the refresh daemon until the deadline or Ctrl+C"""
+    args = parse_args()
+    profile = SITE_PROFILES[args.edition]
+    
+    print(f"=== MyFCD refresh daemon: {profile.name} ===")
+    scraper = ScraperEngine(profile, cache=build_cache(args), **engine_options(args))
+    scraper.rate.set_bounds(floor=args.min_rate, ceiling=args.max_rate)
+    try:
+        scraper.refresh_daemon(budget=args.budget, deadline=args.deadline, relist_every=args.relist_hours * 3600,
+                               min_interval=args.min_interval_hours * 3600, max_checks=args.max_items,
+                               groups=args.groups, manufacturers=args.manufacturers)
+    except KeyboardInterrupt:
+        print("\n  Daemon stopped, the schedule is saved for the next start")
+        return 0
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
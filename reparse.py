@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Rebuild an edition's records from its page archive
+Runs the current parser over the newest archived page of every food on all cores, without a browser or network
+"""
+
+import argparse
+
+from myfcd.engine import ScraperEngine
+from myfcd.payload_extraction import EXTRACTION_MODES
+from myfcd.profiles import SITE_PROFILES
+from myfcd.record_store import STORE_FORMATS
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Re-parse archived MyFCD detail pages into JSON records")
+    parser.add_argument('--edition', choices=sorted(SITE_PROFILES), default='current',
+                        help="edition to rebuild (default: current)")
+    parser.add_argument('--archive-dir', default=None,
+                        help="page archive folder the scrape used (default: html_archive next to the "
+                             "edition's datasets folder)")
+    parser.add_argument('--output-dir', default=None,
+                        help="write the records here instead of the edition's datasets folder")
+    parser.add_argument('--store', choices=STORE_FORMATS, default='files',
+                        help="record layout to write (default: files)")
+    parser.add_argument('--extraction', choices=EXTRACTION_MODES, default=None,
+                        help="read every page this way (default: the mode each page was scraped with; "
+                             "pages archived before the mode was recorded count as dom)")
+    parser.add_argument('--processes', type=int, default=None,
+                        help="parser processes (default: one per CPU)")
+    return parser.parse_args()
+
+
+def main():
+    """Re-parse the archive and print the result"""
+    args = parse_args()
+    profile = SITE_PROFILES[args.edition]
+    
+    print(f"=== Re-parsing archived {profile.name} pages ===")
+    scraper = ScraperEngine(profile, output_dir=args.output_dir, fetch_mode='http', store=args.store,
+                            archive=True, archive_dir=args.archive_dir)
+    try:
+        counts = scraper.reparse_archive(processes=args.processes, extraction=args.extraction)
+    except KeyboardInterrupt:
+        print("\n  Re-parse interrupted, records written so far are kept")
+        return 1
+    
+    if not counts['pages']:
+        print(f"ERROR: No archived pages in {scraper.archive.dir}, scrape with --archive first")
+        return 1
+    return 0 if not counts['failed'] else 1
+
+
+if __name__ == "__main__":
+    exit(main())
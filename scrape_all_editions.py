@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Scrape several MyFCD editions in one run
+The editions share one Chrome driver pool, HTTP session, rate controller and response cache
+"""
+
+import argparse
+
+from myfcd.cli import add_scrape_options, build_cache, check_rate_bounds, default_cache_dir, engine_options, run_options
+from myfcd.engine import scrape_editions
+from myfcd.profiles import SITE_PROFILES
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Scrape the current, 1997 and Industry MyFCD editions concurrently")
+    parser.add_argument('--editions', default=','.join(SITE_PROFILES),
+                        help=f"comma-separated editions to scrape (default: {','.join(SITE_PROFILES)})")
+    parser.add_argument('--output-root', default=None,
+                        help="write each edition to OUTPUT_ROOT/<edition> instead of its usual datasets folder")
+    parser.add_argument('--drivers', type=int, default=None,
+                        help="Chrome drivers shared by all editions (default: workers x editions)")
+    add_scrape_options(parser, cache_dir=default_cache_dir(SITE_PROFILES['current'].output_dir))
+    args = parser.parse_args()
+    
+    args.editions = [edition.strip() for edition in args.editions.split(',') if edition.strip()]
+    unknown = [edition for edition in args.editions if edition not in SITE_PROFILES]
+    if unknown or not args.editions:
+        parser.error(f"unknown edition(s) {', '.join(unknown)}, expected some of {', '.join(SITE_PROFILES)}")
+    # The editions share one controller, capped by the most conservative profile
+    check_rate_bounds(parser, args, ceiling=min(SITE_PROFILES[edition].max_rate for edition in args.editions))
+    return args
+
+
+def main():
+    """Scrape every requested edition concurrently"""
+    args = parse_args()
+    profiles = [SITE_PROFILES[edition] for edition in args.editions]
+    
+    print("=== Production MyFCD Multi-Edition Scraper ===")
+    for profile in profiles:
+        print(f" {profile.name}: {profile.base_url}")
+    print("=" * 70)
+    
+    try:
+        results = scrape_editions(profiles, output_root=args.output_root, drivers=args.drivers,
+                                  cache=build_cache(args), min_rate=args.min_rate, max_rate=args.max_rate,
+                                  engine_options=engine_options(args), run_options=run_options(args))
+        
+        print("\n" + "=" * 70)
+        for profile in profiles:
+            print(f" {profile.name}: {'completed' if results.get(profile.key) else 'FAILED'}")
+    
+    except KeyboardInterrupt:
+        print("\n  Scraping interrupted by user")
+        print(" Partial results may be available in the output directories")
+        return 1
+    except Exception as e:
+        print(f"\n Error: {e}")
+        return 1
+    
+    return 0 if all(results.get(profile.key) for profile in profiles) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,8 @@
+"""
+Test setup: the myfcd package lives at the repository root
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
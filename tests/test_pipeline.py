@@ -0,0 +1,111 @@
+"""
+Tests for the staged pipeline's error hook and worker gates
+"""
+
+import threading
+
+from myfcd.pipeline import DROP, Pipeline
+
+
+def _collect(results):
+    lock = threading.Lock()
+    
+    def collect(item):
+        with lock:
+            results.append(item)
+    return collect
+
+
+def test_items_pass_through_every_stage():
+    results = []
+    pipeline = Pipeline(report_every=0)
+    pipeline.add_stage('double', [lambda item: item * 2] * 3)
+    pipeline.add_stage('odd', [lambda item: DROP if item % 4 == 0 else item])
+    pipeline.add_stage('write', [_collect(results)])
+    pipeline.run(range(20))
+    assert sorted(results) == [item * 2 for item in range(20) if item * 2 % 4]
+
+
+def test_failed_items_go_to_on_error():
+    results = []
+    errors = []
+    
+    def parse(item):
+        if item % 3 == 0:
+            raise ValueError(f"bad {item}")
+        return item
+    
+    def on_error(stage, item, error):
+        errors.append((stage, item, str(error)))
+        return ('failed', item)
+    
+    pipeline = Pipeline(report_every=0, on_error=on_error)
+    pipeline.add_stage('parse', [parse, parse])
+    pipeline.add_stage('write', [_collect(results)])
+    pipeline.run(range(9))
+    
+    assert sorted(errors) == [('parse', item, f"bad {item}") for item in (0, 3, 6)]
+    assert sorted(result for result in results if isinstance(result, int)) == [1, 2, 4, 5, 7, 8]
+    assert sorted(result for result in results if isinstance(result, tuple)) == \
+        [('failed', 0), ('failed', 3), ('failed', 6)]
+
+
+def test_a_failing_on_error_drops_the_item():
+    results = []
+    
+    def on_error(stage, item, error):
+        raise RuntimeError("hook failed too")
+    
+    pipeline = Pipeline(report_every=0, on_error=on_error)
+    pipeline.add_stage('parse', [lambda item: 1 / item])
+    pipeline.add_stage('write', [_collect(results)])
+    pipeline.run([0, 1, 2])
+    assert sorted(results) == [0.5, 1.0]
+
+
+def test_without_on_error_failed_items_are_dropped():
+    results = []
+    pipeline = Pipeline(report_every=0)
+    pipeline.add_stage('parse', [lambda item: 1 / item])
+    pipeline.add_stage('write', [_collect(results)])
+    pipeline.run([0, 1])
+    assert results == [1.0]
+
+
+def test_gated_handlers_take_no_items_and_the_run_finishes():
+    taken = {1: [], 2: []}
+    
+    def fetcher(number):
+        def fetch(item):
+            taken[number].append(item)
+            return item
+        return fetch
+    
+    results = []
+    pipeline = Pipeline(report_every=0)
+    pipeline.add_stage('fetch', [fetcher(1), fetcher(2)], maxsize=2, gate=lambda number: number == 1)
+    pipeline.add_stage('write', [_collect(results)])
+    pipeline.run(range(10))
+    
+    assert taken[2] == []
+    assert sorted(taken[1]) == list(range(10))
+    assert sorted(results) == list(range(10))
+
+
+def test_source_errors_are_raised_after_the_items_it_produced():
+    results = []
+    
+    def source():
+        yield 1
+        yield 2
+        raise RuntimeError("listing failed")
+    
+    pipeline = Pipeline(report_every=0)
+    pipeline.add_stage('write', [_collect(results)])
+    try:
+        pipeline.run(source())
+    except RuntimeError as e:
+        assert str(e) == "listing failed"
+    else:
+        raise AssertionError("source error was swallowed")
+    assert sorted(results) == [1, 2]
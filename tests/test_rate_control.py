@@ -0,0 +1,120 @@
+"""
+Tests for the AIMD request rate controller and its command line bounds
+"""
+
+import argparse
+import time
+
+import pytest
+
+from myfcd.cli import check_rate_bounds, rate_option
+from myfcd.rate_control import DEFAULT_RATE_FLOOR, RateController
+
+
+def test_rejects_floor_above_ceiling():
+    with pytest.raises(ValueError):
+        RateController(floor=2.0, ceiling=1.0)
+    rate = RateController(initial_rate=1.0, floor=0.2, ceiling=5.0)
+    with pytest.raises(ValueError):
+        rate.set_bounds(ceiling=0.1)
+    with pytest.raises(ValueError):
+        rate.set_bounds(floor=0)
+    assert (rate.floor, rate.ceiling) == (0.2, 5.0)
+
+
+def test_set_bounds_clamps_the_current_rate():
+    rate = RateController(initial_rate=4.0, floor=0.2, ceiling=5.0)
+    rate.set_bounds(ceiling=2.0)
+    assert rate.rate == 2.0
+    rate.set_bounds(floor=3.0, ceiling=4.0)
+    assert rate.rate == 3.0
+
+
+def test_additive_increase_stops_at_the_ceiling():
+    rate = RateController(initial_rate=1.0, ceiling=1.5, increase=0.1)
+    for _ in range(3):
+        rate.record_response('http', 0.1)
+    assert rate.rate == pytest.approx(1.3)
+    for _ in range(10):
+        rate.record_response('http', 0.1)
+    assert rate.rate == 1.5
+    assert rate.peak_rate == 1.5
+
+
+def test_throttling_halves_the_rate_once_per_cooldown():
+    rate = RateController(initial_rate=4.0, floor=0.2, decrease=0.5, cooldown=60.0)
+    rate.record_response('http', 0.1, status=429)
+    rate.record_response('http', 0.1, status=503)
+    assert rate.rate == 2.0
+    assert rate.backoffs == 1
+
+
+def test_back_off_never_goes_below_the_floor():
+    rate = RateController(initial_rate=1.0, floor=0.8, decrease=0.5, cooldown=0.0)
+    for _ in range(3):
+        rate.record_response('http', 0.1, status=429)
+    assert rate.rate == 0.8
+    assert rate.backoffs == 3
+
+
+def test_retry_after_delays_the_next_slot():
+    rate = RateController(initial_rate=5.0, ceiling=5.0)
+    rate.record_response('http', 0.1, status=429, headers={'Retry-After': '30'})
+    assert rate._reserve() > 25
+
+
+def test_latency_spike_backs_off():
+    rate = RateController(initial_rate=2.0, increase=0.0, slow_factor=3.0, cooldown=0.0)
+    for _ in range(5):
+        rate.record_response('render', 1.0)
+    rate.record_response('render', 10.0)
+    assert rate.rate == 1.0
+    # Another kind has its own baseline, a slow render is not a slow static page
+    rate.record_response('http', 10.0)
+    assert rate.backoffs == 1
+
+
+def test_timeouts_back_off_and_other_errors_only_past_the_error_rate():
+    rate = RateController(initial_rate=2.0, cooldown=0.0, max_error_rate=0.5)
+    for _ in range(4):
+        rate.record_response('http', 0.1)
+    rate.record_error('http')
+    assert rate.backoffs == 0
+    rate.record_error('http', timeout=True)
+    assert rate.backoffs == 1
+
+
+def test_active_workers_follow_rate_times_latency():
+    rate = RateController(initial_rate=2.0, increase=0.0)
+    rate.set_max_workers(8)
+    assert rate.active_workers == 8
+    rate.record_response('render', 1.5)
+    assert rate.active_workers == 3
+    assert rate.worker_active(3) and not rate.worker_active(4)
+
+
+def test_acquire_spaces_requests():
+    rate = RateController(initial_rate=20.0, ceiling=20.0)
+    started = time.monotonic()
+    for _ in range(5):
+        rate.acquire()
+    assert time.monotonic() - started >= 0.15
+    assert rate.requests == 5
+
+
+def _parse(*argv):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--min-rate', type=rate_option, default=None)
+    parser.add_argument('--max-rate', type=rate_option, default=None)
+    args = parser.parse_args(argv)
+    check_rate_bounds(parser, args, ceiling=5.0)
+    return args
+
+
+def test_rate_options_reject_bounds_the_controller_cannot_take():
+    assert _parse('--max-rate', '2').max_rate == 2.0
+    for argv in (('--max-rate', '0'), ('--min-rate', '-1'), ('--max-rate', 'fast'),
+                 ('--max-rate', str(DEFAULT_RATE_FLOOR / 2)), ('--min-rate', '6'),
+                 ('--min-rate', '3', '--max-rate', '2')):
+        with pytest.raises(SystemExit):
+            _parse(*argv)
@@ -0,0 +1,97 @@
+"""
+Tests for the record stores and RecordReader over both layouts
+"""
+
+import json
+import os
+
+from myfcd.record_store import (RECORDS_FILE, FileRecordStore, NdjsonRecordStore, RecordReader,
+                                open_record_store, record_filename)
+
+
+def _record(ndb_no, energy='1'):
+    return {'NDB No': ndb_no, 'Description': f"food {ndb_no}", 'Nutrient': [{'name': 'Energy', 'value': energy}]}
+
+
+def test_file_store_round_trip(tmp_path):
+    store = FileRecordStore(str(tmp_path))
+    store.write(_record('R101'))
+    store.write(_record('R101', energy='2'))
+    
+    assert store.load('R101')['Nutrient'][0]['value'] == '2'
+    assert store.has('R101') and not store.has('R102')
+    assert os.listdir(tmp_path) == [record_filename('R101')]
+
+
+def test_file_store_rejects_a_record_of_another_food(tmp_path):
+    store = FileRecordStore(str(tmp_path))
+    with open(store.path('R1'), 'w', encoding='utf-8') as f:
+        json.dump(_record('R2'), f)
+    assert not store.has('R1')
+
+
+def test_ndjson_store_keeps_the_newest_line(tmp_path):
+    store = NdjsonRecordStore(str(tmp_path), batch_size=2)
+    store.write(_record('R1'))
+    assert store.load('R1') is not None
+    store.write(_record('R1', energy='2'))
+    store.write(_record('R2'))
+    store.close()
+    
+    reopened = NdjsonRecordStore(str(tmp_path))
+    assert reopened.load('R1')['Nutrient'][0]['value'] == '2'
+    assert sorted(reopened.index) == ['R1', 'R2']
+
+
+def test_ndjson_store_cuts_a_torn_last_line(tmp_path):
+    store = NdjsonRecordStore(str(tmp_path))
+    store.write(_record('R1'))
+    store.close()
+    with open(tmp_path / RECORDS_FILE, 'ab') as f:
+        f.write(b'{"NDB No": "R2", "Nutr')
+    
+    reopened = NdjsonRecordStore(str(tmp_path))
+    assert sorted(reopened.index) == ['R1']
+    reopened.write(_record('R3'))
+    reopened.close()
+    assert sorted(NdjsonRecordStore(str(tmp_path)).index) == ['R1', 'R3']
+
+
+def test_reader_over_files(tmp_path):
+    store = open_record_store('files', str(tmp_path))
+    for ndb_no in ('R2', 'R1'):
+        store.write(_record(ndb_no))
+    with open(tmp_path / 'run_manifest.json', 'w', encoding='utf-8') as f:
+        json.dump({}, f)
+    
+    reader = RecordReader(str(tmp_path))
+    assert reader.layout == 'files'
+    assert reader.names() == ['R1.json', 'R2.json']
+    assert reader.load('R2.json')['NDB No'] == 'R2'
+
+
+def test_reader_over_ndjson(tmp_path):
+    store = open_record_store('ndjson', str(tmp_path))
+    for ndb_no in ('R2', 'R1'):
+        store.write(_record(ndb_no))
+    store.close()
+    
+    reader = RecordReader(str(tmp_path))
+    assert reader.layout == 'ndjson'
+    assert reader.names() == ['R1', 'R2']
+    assert reader.load('R1')['NDB No'] == 'R1'
+    assert len(reader) == 2
+
+
+def test_reader_over_both_layouts_skips_files_already_in_ndjson(tmp_path):
+    files = FileRecordStore(str(tmp_path))
+    files.write(_record('R1'))
+    files.write(_record('R9'))
+    ndjson = NdjsonRecordStore(str(tmp_path))
+    ndjson.write(_record('R1', energy='2'))
+    ndjson.close()
+    
+    reader = RecordReader(str(tmp_path))
+    assert reader.layout == 'mixed'
+    assert reader.names() == ['R1', 'R9.json']
+    assert reader.load('R1')['Nutrient'][0]['value'] == '2'
@@ -0,0 +1,91 @@
+"""
+Tests for shard assignment and merging shard outputs
+"""
+
+import os
+
+import pytest
+
+from myfcd.failures import RETRY_QUEUE_FILE, RetryQueue
+from myfcd.record_store import FileRecordStore, RecordReader
+from myfcd.run_manifest import MANIFEST_FILE, RunManifest
+from myfcd.sharding import merge_shards, parse_shard, shard_dir, shard_of
+
+
+def _food(ndb_no):
+    return {'ndb_no': ndb_no, 'description': f"food {ndb_no}", 'food_group': 'g', 'detail_url': f"u/{ndb_no}"}
+
+
+def _record(ndb_no, shard):
+    return {'NDB No': ndb_no, 'Description': f"from shard {shard}", 'Nutrient': [{'name': 'Energy'}]}
+
+
+def _shard(datasets_dir, index, count, listing, saved, failed=()):
+    path = shard_dir(datasets_dir, index, count)
+    store = FileRecordStore(path)
+    manifest = RunManifest(os.path.join(path, MANIFEST_FILE))
+    manifest.set_listing([_food(ndb_no) for ndb_no in listing], 'test')
+    for ndb_no in saved:
+        store.write(_record(ndb_no, index))
+        manifest.record(ndb_no, 'done')
+    retry_queue = RetryQueue(os.path.join(path, RETRY_QUEUE_FILE))
+    for ndb_no in failed:
+        manifest.record(ndb_no, 'failed', error='timeout')
+        retry_queue.add(_food(ndb_no), 'timeout', 'page did not load')
+    manifest.save()
+    retry_queue.save()
+
+
+def test_parse_shard():
+    assert parse_shard('2/4') == (2, 4)
+    for text in ('0/4', '5/4', '1/0', 'half'):
+        with pytest.raises(ValueError):
+            parse_shard(text)
+
+
+def test_shard_of_is_stable_and_in_range():
+    owners = [shard_of(f"R{n}", 3) for n in range(300)]
+    assert owners == [shard_of(f"R{n}", 3) for n in range(300)]
+    assert set(owners) == {1, 2, 3}
+
+
+def test_merge_keeps_the_owner_copy_of_an_overlap_and_reports_gaps(tmp_path):
+    listing = [f"R{n}" for n in range(12)]
+    owned = {index: [ndb_no for ndb_no in listing if shard_of(ndb_no, 2) == index] for index in (1, 2)}
+    overlap = owned[2][0]
+    gap = owned[2][1]
+    failed = owned[2][2]
+    _shard(str(tmp_path), 1, 2, listing, owned[1] + [overlap])
+    _shard(str(tmp_path), 2, 2, listing, [ndb_no for ndb_no in owned[2] if ndb_no not in (gap, failed)],
+           failed=[failed])
+    
+    dest = tmp_path / 'merged'
+    report = merge_shards(str(tmp_path), str(dest))
+    
+    assert report['shards_missing'] == []
+    assert report['overlaps'] == {overlap: {'shards': [1, 2], 'owner': 2, 'kept': 2}}
+    assert set(report['gaps']) == {gap, failed}
+    assert report['gaps'][failed]['status'] == 'failed'
+    assert report['gaps'][gap]['status'] == 'pending'
+    assert report['records'] == len(listing) - 2
+    
+    reader = RecordReader(str(dest))
+    assert reader.load(f"{overlap}.json")['Description'] == "from shard 2"
+    assert len(reader) == len(listing) - 2
+    assert set(RetryQueue.load(os.path.join(dest, RETRY_QUEUE_FILE)).pending) == {failed}
+    assert RunManifest.load(os.path.join(dest, MANIFEST_FILE)).status(overlap) == 'done'
+
+
+def test_merge_reports_missing_shards_and_listing_mismatches(tmp_path):
+    _shard(str(tmp_path), 1, 3, ['R1', 'R2'], [])
+    _shard(str(tmp_path), 2, 3, ['R1', 'R2', 'R3'], [])
+    report = merge_shards(str(tmp_path), str(tmp_path / 'merged'))
+    assert report['shards_missing'] == [3]
+    assert report['listing_mismatch'] == [2]
+
+
+def test_merge_refuses_folders_from_different_splits(tmp_path):
+    _shard(str(tmp_path), 1, 2, ['R1'], [])
+    _shard(str(tmp_path), 1, 3, ['R1'], [])
+    with pytest.raises(ValueError):
+        merge_shards(str(tmp_path))
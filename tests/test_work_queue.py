@@ -0,0 +1,81 @@
+"""
+Tests for the SQLite lease queue
+"""
+
+import time
+
+import pytest
+
+from myfcd.work_queue import WorkQueue
+
+
+def _food(ndb_no):
+    return {'ndb_no': ndb_no, 'description': f"food {ndb_no}", 'food_group': 'g', 'detail_url': f"u/{ndb_no}"}
+
+
+@pytest.fixture
+def work_queue(tmp_path):
+    work_queue = WorkQueue(str(tmp_path / 'queue.sqlite'), max_attempts=2, base_delay=0.0)
+    work_queue.seed([_food(f"R{n}") for n in range(3)])
+    yield work_queue
+    work_queue.close()
+
+
+def test_seed_adds_each_food_once(work_queue):
+    assert work_queue.seed([_food('R0'), _food('R3')]) == 1
+    assert work_queue.status() == {'pending': 4, 'leased': 0, 'done': 0, 'failed': 0}
+
+
+def test_two_workers_never_lease_the_same_food(work_queue):
+    first = work_queue.lease('a', count=2)
+    second = work_queue.lease('b', count=2)
+    assert [food['ndb_no'] for food in first] == ['R0', 'R1']
+    assert [food['ndb_no'] for food in second] == ['R2']
+    assert work_queue.lease('c') == []
+
+
+def test_an_expired_lease_goes_to_another_worker(work_queue):
+    [food] = work_queue.lease('a', visibility=0.05)
+    time.sleep(0.1)
+    leased = work_queue.lease('b', count=3)
+    assert food['ndb_no'] in [item['ndb_no'] for item in leased]
+    
+    # The first worker lost the food: no heartbeat or nack, its ack still saves it
+    assert work_queue.heartbeat('a', [food['ndb_no']]) == []
+    assert work_queue.nack('a', food['ndb_no'], 'late') is None
+    assert work_queue.ack('a', food['ndb_no']) is False
+    assert work_queue.status()['done'] == 1
+
+
+def test_heartbeat_keeps_a_lease(work_queue):
+    [food] = work_queue.lease('a', visibility=0.2)
+    for _ in range(3):
+        time.sleep(0.1)
+        assert work_queue.heartbeat('a', [food['ndb_no']], visibility=0.2) == [food['ndb_no']]
+    assert food['ndb_no'] not in [item['ndb_no'] for item in work_queue.lease('b', count=3)]
+    assert work_queue.ack('a', food['ndb_no']) is True
+
+
+def test_reclaim_returns_expired_leases(work_queue):
+    work_queue.lease('a', count=3, visibility=0.05)
+    time.sleep(0.1)
+    assert work_queue.reclaim() == 3
+    assert work_queue.status()['pending'] == 3
+
+
+def test_nack_retries_then_fails(work_queue):
+    food = work_queue.lease('a', count=3)[0]
+    assert work_queue.nack('a', food['ndb_no'], 'timeout') == 'pending'
+    [again] = work_queue.lease('a', count=3)
+    assert again['ndb_no'] == food['ndb_no']
+    assert work_queue.nack('a', food['ndb_no'], 'timeout') == 'failed'
+    assert work_queue.failures() == [{'ndb_no': food['ndb_no'], 'attempts': 2, 'error': 'timeout'}]
+
+
+def test_release_hands_leases_back_without_an_attempt(work_queue):
+    leased = work_queue.lease('a', count=3)
+    work_queue.release('a', [food['ndb_no'] for food in leased])
+    assert work_queue.status()['pending'] == 3
+    [food] = work_queue.lease('b')
+    work_queue.nack('b', food['ndb_no'], 'timeout')
+    assert work_queue.status()['failed'] == 0
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Shared work queue for MyFCD scraping
+Seed the queue from an edition's listing once, then start as many workers as you like and check on them with status
+"""
+
+import argparse
+import os
+
+from myfcd.cli import add_scrape_options, build_cache, check_rate_bounds, default_cache_dir, engine_options, id_list
+from myfcd.engine import ScraperEngine
+from myfcd.profiles import SITE_PROFILES
+from myfcd.work_queue import WORK_QUEUE_FILE, WorkQueue
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Lease-based work queue for elastic MyFCD scraping")
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    seed = commands.add_parser('seed', help="list the edition and add every food to the queue")
+    seed.add_argument('--requeue-failed', action='store_true',
+                      help="put foods that used up their attempts back to pending")
+    seed.add_argument('--groups', type=id_list, default=None, metavar='IDS',
+                      help="queue only these food group IDs, comma-separated")
+    seed.add_argument('--manufacturers', type=id_list, default=None, metavar='IDS',
+                      help="queue only these manufacturer IDs, comma-separated (Industry only)")
+    
+    work = commands.add_parser('work', help="lease foods and scrape them until the queue is drained")
+    work.add_argument('--lease-timeout', type=float, default=300,
+                      help="seconds a lease lasts without a heartbeat before another worker may take "
+                           "the food (default: 300, heartbeats every third of it)")
+    work.add_argument('--prefetch', type=int, default=2,
+                      help="foods leased ahead of the busy workers (default: 2)")
+    add_scrape_options(work, cache_dir=None)
+    
+    commands.add_parser('status', help="print pending, leased, done and failed counts")
+    commands.add_parser('reclaim', help="return expired leases to pending now")
+    
+    for command in commands.choices.values():
+        command.add_argument('--edition', choices=sorted(SITE_PROFILES), default='current',
+                             help="edition whose datasets folder holds the queue (default: current)")
+        command.add_argument('--queue', default=None,
+                             help=f"queue database (default: datasets/{WORK_QUEUE_FILE})")
+    
+    args = parser.parse_args()
+    profile = SITE_PROFILES[args.edition]
+    args.queue = args.queue or os.path.join(profile.output_dir, WORK_QUEUE_FILE)
+    if args.command == 'work':
+        if args.shard or args.resume or args.refresh:
+            parser.error("--shard, --resume and --refresh do not apply to queue workers, the queue tracks progress")
+        check_rate_bounds(parser, args, ceiling=profile.max_rate)
+        if args.cache_dir is None:
+            args.cache_dir = default_cache_dir(profile.output_dir)
+    return args
+
+
+def main():
+    """Run one queue command"""
+    args = parse_args()
+    profile = SITE_PROFILES[args.edition]
+    if args.command != 'seed' and not os.path.exists(args.queue):
+        print(f"ERROR: No queue at {args.queue}, run 'work_queue.py seed --edition {args.edition}' first")
+        return 1
+    work_queue = WorkQueue(args.queue, max_attempts=getattr(args, 'retry_attempts', 4))
+    
+    if args.command == 'seed':
+        print(f"=== Seeding {args.queue} from {profile.base_url} ===")
+        try:
+            food_items = ScraperEngine(profile).get_all_food_items(groups=args.groups,
+                                                                   manufacturers=args.manufacturers)
+        except ValueError as e:
+            print(f"ERROR: {e}")
+            return 1
+        if not food_items:
+            print("ERROR: No food items found")
+            return 1
+        added = work_queue.seed(food_items, requeue_failed=args.requeue_failed)
+        print(f" Added {added} of {len(food_items)} listed foods, the rest were already queued")
+    
+    elif args.command == 'work':
+        print(f"=== MyFCD queue worker: {profile.name} ===")
+        scraper = ScraperEngine(profile, cache=build_cache(args), **engine_options(args))
+        scraper.rate.set_bounds(floor=args.min_rate, ceiling=args.max_rate)
+        try:
+            scraper.scrape_from_queue(work_queue, workers=args.workers, max_items=args.max_items,
+                                      visibility=args.lease_timeout, prefetch=args.prefetch)
+        except KeyboardInterrupt:
+            print("\n  Worker stopped, its unfinished leases are back in the queue")
+            return 1
+        except ValueError as e:
+            print(f"ERROR: {e}")
+            return 1
+    
+    elif args.command == 'reclaim':
+        print(f" Reclaimed {work_queue.reclaim()} expired leases")
+    
+    counts = work_queue.status()
+    print(f" Queue {args.queue}: {counts['pending']} pending, {counts['leased']} leased, "
+          f"{counts['done']} done, {counts['failed']} failed ({sum(counts.values())} total)")
+    if args.command == 'status':
+        for failure in work_queue.failures()[:10]:
+            print(f"   failed {failure['ndb_no']} after {failure['attempts']} attempts: {failure['error']}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())